@@ -9,6 +9,7 @@ from django.contrib import admin, messages
 import tempfile
 import os,csv,json
 from django.core.files import File
+from .catalogue import invalidate_catalogue
 
 # -----------------------------
 # Project Admin
@@ -170,6 +171,9 @@ class ComponentAdmin(admin.ModelAdmin):
                         except Exception as e:
                             messages.warning(request, f"Error saving component '{component_name}': {str(e)}")
                 
+                # Per-row saves already invalidate; make sure the import as a whole does too
+                invalidate_catalogue()
+
                 if success_count > 0:
                     message = f"Successfully processed {success_count} components"
                     if update_count > 0:
@@ -0,0 +1,101 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .models import Component, DeletedComponent
+from .serializers import ComponentSerializer
+
+# Bumped whenever a component changes; cached catalogues of older versions
+# are simply never read again and expire on their own. The version is the
+# time of the last change in microseconds, so it also gives Last-Modified and
+# never repeats across server restarts.
+VERSION_KEY = "components:catalogue:version"
+CATALOGUE_TIMEOUT = 60 * 60 * 24
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def catalogue_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _now(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_catalogue():
+    """Start a new catalogue version (component saved, deleted or imported)."""
+    version = max(_now(), (cache.get(VERSION_KEY) or 0) + 1)
+    cache.set(VERSION_KEY, version, timeout=None)
+    return version
+
+
+def catalogue_etag(user, fields=None):
+    # Every component write bumps the version, so version + user pins the list;
+    # a sparse fieldset is a different representation and gets its own tag
+    if fields:
+        return f'"{catalogue_version()}-{user.pk}-{",".join(fields)}"'
+    return f'"{catalogue_version()}-{user.pk}"'
+
+
+def catalogue_last_modified():
+    """Time of the last catalogue change, in whole seconds since the epoch."""
+    return catalogue_version() // 1_000_000
+
+
+def _serialize(queryset, request):
+    return ComponentSerializer(queryset.order_by("id"), many=True, context={"request": request}).data
+
+
+def default_components(request):
+    """
+    Serialized default components (created_by=None), served from the cache.
+    Keyed by host as well, since svg_url/png_url are absolute URLs.
+    """
+    key = f"components:catalogue:{catalogue_version()}:{request.build_absolute_uri('/')}"
+    data = cache.get(key)
+    if data is None:
+        data = _serialize(Component.objects.filter(created_by__isnull=True), request)
+        cache.set(key, data, timeout=CATALOGUE_TIMEOUT)
+    return data
+
+
+def select_fields(components, fields):
+    """Sparse fieldset: keep only `fields` of each serialized component."""
+    if not fields:
+        return components
+    return [{field: comp[field] for field in fields} for comp in components]
+
+
+def component_catalogue(request):
+    """Default components (cached) merged with the user's private ones, in id order."""
+    private = _serialize(Component.objects.filter(created_by=request.user), request)
+    if not private:
+        return list(default_components(request))
+    return sorted([*default_components(request), *private], key=lambda comp: comp["id"])
+
+
+def component_changes(request, since):
+    """
+    Components visible to the user that changed at or after `since`, plus
+    tombstones of the ones deleted since then. The returned cursor is the
+    `since` to send next time.
+    """
+    cursor = timezone.now()
+    changed = Component.objects.filter(
+        Q(created_by=request.user) | Q(created_by__isnull=True),
+        updated_at__gte=since,
+    )
+    deleted = DeletedComponent.objects.filter(
+        Q(created_by_id=request.user.pk) | Q(created_by_id__isnull=True),
+        deleted_at__gte=since,
+    ).order_by("deleted_at")
+    return {
+        "components": _serialize(changed, request),
+        "deleted": [{"id": row.component_id, "s_no": row.s_no} for row in deleted],
+        "since": cursor.isoformat(),
+    }
+
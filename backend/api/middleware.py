@@ -0,0 +1,33 @@
+import zlib
+
+from django.conf import settings
+from django.http import JsonResponse
+
+# Upper bound for a decompressed request body (guards against gzip bombs)
+MAX_DECOMPRESSED_BYTES = getattr(settings, "GZIP_REQUEST_MAX_BYTES", 64 * 1024 * 1024)
+
+
+class GzipRequestMiddleware:
+    """
+    Accept request bodies sent with Content-Encoding: gzip (the desktop client
+    compresses large canvas saves) by inflating them before the views parse them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.META.get("HTTP_CONTENT_ENCODING", "").lower() == "gzip":
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                body = inflater.decompress(request.read(), MAX_DECOMPRESSED_BYTES)
+            except zlib.error:
+                return JsonResponse({"status": "error", "message": "Invalid gzip request body"}, status=400)
+            if inflater.unconsumed_tail:
+                return JsonResponse({"status": "error", "message": "Request body too large"}, status=413)
+
+            request._body = body
+            request.META["CONTENT_LENGTH"] = str(len(body))
+            del request.META["HTTP_CONTENT_ENCODING"]
+
+        return self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_alter_component_legend_alter_component_suffix'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
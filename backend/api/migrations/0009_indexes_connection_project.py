@@ -0,0 +1,43 @@
+# Generated by Django 4.2.27 on 2026-10-17 07:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def fill_connection_project(apps, schema_editor):
+    Connection = apps.get_model("api", "Connection")
+    CanvasState = apps.get_model("api", "CanvasState")
+    Connection.objects.filter(project__isnull=True).update(
+        project=Subquery(
+            CanvasState.objects.filter(pk=OuterRef("sourceItemId")).values("project")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_project_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connection',
+            name='project',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='connections', to='api.project'),
+        ),
+        migrations.RunPython(fill_connection_project, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='canvasstate',
+            index=models.Index(fields=['project', 'sequence'], name='canvasstate_project_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(fields=['created_by', 's_no'], name='component_owner_sno_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', 'updated_at'], name='project_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce, Now
+
+
+def fill_updated_at(apps, schema_editor):
+    Component = apps.get_model("api", "Component")
+    Component.objects.update(updated_at=Coalesce(F("created_at"), Now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_indexes_connection_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='component',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='DeletedComponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component_id', models.IntegerField()),
+                ('s_no', models.CharField(max_length=10)),
+                ('created_by_id', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
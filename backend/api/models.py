@@ -6,6 +6,13 @@ class Project(models.Model):
     user = models.ForeignKey('auth.User', on_delete=models.CASCADE, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField( auto_now=True)
+    revision = models.PositiveIntegerField(default=0)  # bumped on every write, served as ETag
+
+    class Meta:
+        indexes = [
+            # Project list: filter by user, newest first
+            models.Index(fields=["user", "updated_at"], name="project_user_updated_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -22,10 +29,28 @@ class Component(models.Model):
     grips = models.JSONField(default=list)
     created_by = models.ForeignKey('auth.User', on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Component list: own + default (created_by IS NULL) components by s_no
+            models.Index(fields=["created_by", "s_no"], name="component_owner_sno_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+class DeletedComponent(models.Model):
+    """Tombstone left by a deleted Component so clients can sync the deletion."""
+    component_id = models.IntegerField()
+    s_no = models.CharField(max_length=10)
+    # Plain id rather than a FK: the tombstone must outlive the owner
+    created_by_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.s_no} (deleted)"
+
 class CanvasState(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     component = models.ForeignKey(Component, on_delete=models.CASCADE)
@@ -39,9 +64,22 @@ class CanvasState(models.Model):
     scaleY = models.FloatField(default=1)
     sequence = models.IntegerField()
 
+    class Meta:
+        indexes = [
+            # Canvas load: items of a project in sequence order
+            models.Index(fields=["project", "sequence"], name="canvasstate_project_seq_idx"),
+        ]
+
 class Connection(models.Model):
+    # Denormalized from the endpoints so a project's edges load without a join
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, related_name="connections")
     sourceItemId = models.ForeignKey(CanvasState, on_delete=models.CASCADE, related_name="sources")
     sourceGripIndex = models.IntegerField()
     targetItemId = models.ForeignKey(CanvasState, on_delete=models.CASCADE, related_name="targets")
     targetGripIndex = models.IntegerField()
-    waypoints = models.JSONField()
\ No newline at end of file
+    waypoints = models.JSONField()
+
+    def save(self, *args, **kwargs):
+        if self.project_id is None:
+            self.project_id = self.sourceItemId.project_id
+        super().save(*args, **kwargs)
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ComponentCursorPagination(CursorPagination):
+    """Opt-in paging for the component list (?page_size= / ?cursor=)."""
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
@@ -0,0 +1,444 @@
+import math
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Project, Component, CanvasState, Connection
+
+# Columns the client is allowed to change on a stored canvas item
+ITEM_FIELDS = [
+    "component_id",
+    "label",
+    "x",
+    "y",
+    "width",
+    "height",
+    "rotation",
+    "scaleX",
+    "scaleY",
+    "sequence",
+]
+
+
+class RevisionConflict(Exception):
+    """The client's base revision is not the project's current revision."""
+
+    def __init__(self, current_revision):
+        super().__init__(f"Project is at revision {current_revision}")
+        self.current_revision = current_revision
+
+
+class InvalidCanvasOp(ValueError):
+    """An op in a batch is malformed; nothing from the batch is applied."""
+
+    def __init__(self, index, reason):
+        super().__init__(f"ops[{index}]: {reason}")
+        self.index = index
+
+
+def bump_revision(project, expected=None):
+    """
+    Atomically increment project.revision. If `expected` is given the bump only
+    happens when the stored revision still equals it (compare-and-swap);
+    otherwise RevisionConflict is raised.
+    """
+    rows = Project.objects.filter(pk=project.pk)
+    if expected is not None:
+        rows = rows.filter(revision=expected)
+    # update() skips auto_now, so touch updated_at here as save() would
+    if not rows.update(revision=F("revision") + 1, updated_at=timezone.now()):
+        project.refresh_from_db(fields=["revision"])
+        raise RevisionConflict(project.revision)
+    project.refresh_from_db(fields=["revision", "updated_at"])
+    return project.revision
+
+
+def _as_pk(value):
+    """Client ids may arrive as ints or numeric strings; anything else is unknown."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _component_id(item):
+    # Accept both the flat "component_id" and the nested {"component": {"id": ..}} form
+    comp_id = item.get("component_id")
+    if not comp_id:
+        component = item.get("component")
+        if isinstance(component, dict):
+            comp_id = component.get("id")
+    return comp_id
+
+
+def _item_values(item, comp_id):
+    return {
+        "component_id": comp_id,
+        "label": item.get("label", ""),
+        "x": float(item.get("x", 0)),
+        "y": float(item.get("y", 0)),
+        "width": float(item.get("width", 50)),
+        "height": float(item.get("height", 50)),
+        "rotation": float(item.get("rotation", 0)),
+        "scaleX": float(item.get("scaleX", 1)),
+        "scaleY": float(item.get("scaleY", 1)),
+        "sequence": int(item.get("sequence", 0)),
+    }
+
+
+def _connection_key(source_id, source_grip, target_id, target_grip):
+    return (source_id, source_grip, target_id, target_grip)
+
+
+def _new_connection(project, conn, source_id, target_id):
+    return Connection(
+        project=project,
+        sourceItemId_id=source_id,
+        targetItemId_id=target_id,
+        sourceGripIndex=conn.get("sourceGripIndex", 0),
+        targetGripIndex=conn.get("targetGripIndex", 0),
+        waypoints=conn.get("waypoints", []),
+    )
+
+
+def bulk_insert_items(project, items_data):
+    """
+    INSERT all items with a single bulk_create.
+    Returns the client id -> database id map, resolved in one pass over the
+    created rows (bulk_create sets primary keys on SQLite and PostgreSQL).
+    """
+    pending = []  # (client id, unsaved CanvasState)
+    for item in items_data:
+        comp_id = _component_id(item)
+        if not comp_id:
+            continue
+        pending.append((item.get("id"), CanvasState(project=project, **_item_values(item, comp_id))))
+
+    id_map = {}
+    if pending:
+        created = CanvasState.objects.bulk_create([row for _, row in pending])
+        for (client_id, _), row in zip(pending, created):
+            if client_id is not None:
+                id_map[client_id] = row.id
+    return id_map
+
+
+def bulk_insert_connections(project, connections_data, id_map):
+    """INSERT every connection whose endpoints resolve through id_map."""
+    rows = []
+    for conn in connections_data:
+        real_source_id = id_map.get(conn.get("sourceItemId"))
+        real_target_id = id_map.get(conn.get("targetItemId"))
+        if real_source_id and real_target_id:
+            rows.append(_new_connection(project, conn, real_source_id, real_target_id))
+    if rows:
+        Connection.objects.bulk_create(rows)
+    return rows
+
+
+def replace_canvas_state(project, canvas_data):
+    """
+    Full replace: drop the stored canvas and bulk-write the incoming one.
+    Used when there is nothing to diff against (new projects, first save).
+    """
+    with transaction.atomic():
+        CanvasState.objects.filter(project=project).delete()
+        id_map = bulk_insert_items(project, canvas_data.get("items", []))
+        bulk_insert_connections(project, canvas_data.get("connections", []), id_map)
+    return id_map
+
+
+def sync_canvas_state(project, canvas_data):
+    """
+    Persist an incoming canvas_state by diffing it against the stored rows.
+
+    Items are matched on their id: ids that belong to a stored item of this
+    project are UPDATEd only if a field changed, unknown ids are INSERTed and
+    stored items missing from the payload are DELETEd. Connections are matched
+    on their endpoints (item + grip) and only rewritten when waypoints change.
+
+    Returns a dict mapping every incoming item id to its database id so the
+    client can keep referencing the same rows on the next save.
+    """
+    items_data = canvas_data.get("items", [])
+    connections_data = canvas_data.get("connections", [])
+
+    with transaction.atomic():
+        stored_items = {
+            item.id: item
+            for item in CanvasState.objects.filter(project=project).only("id", *ITEM_FIELDS)
+        }
+
+        if not stored_items:
+            # Nothing to diff against: take the bulk insert path
+            return replace_canvas_state(project, canvas_data)
+
+        id_map = {}  # client id -> database id
+        seen = set()
+        to_update = []
+        to_create = []  # items with ids we don't know yet
+
+        for item in items_data:
+            comp_id = _component_id(item)
+            if not comp_id:
+                continue
+
+            client_id = item.get("id")
+            values = _item_values(item, comp_id)
+            pk = _as_pk(client_id)
+            existing = stored_items.get(pk)
+
+            if existing is not None and pk not in seen:
+                seen.add(pk)
+                id_map[client_id] = pk
+                changed = False
+                for field, value in values.items():
+                    if getattr(existing, field) != value:
+                        setattr(existing, field, value)
+                        changed = True
+                if changed:
+                    to_update.append(existing)
+            else:
+                to_create.append(item)
+
+        removed = [pk for pk in stored_items if pk not in seen]
+        if removed:
+            # Cascades to connections attached to the removed items
+            CanvasState.objects.filter(pk__in=removed).delete()
+
+        if to_update:
+            CanvasState.objects.bulk_update(to_update, ITEM_FIELDS)
+
+        if to_create:
+            id_map.update(bulk_insert_items(project, to_create))
+
+        # Connections: match on endpoints, rewrite waypoints only when changed
+        stored_conns = {}
+        for conn in Connection.objects.filter(project=project):
+            key = _connection_key(
+                conn.sourceItemId_id, conn.sourceGripIndex,
+                conn.targetItemId_id, conn.targetGripIndex,
+            )
+            stored_conns.setdefault(key, []).append(conn)
+
+        conns_to_update = []
+        conns_to_create = []
+
+        for conn in connections_data:
+            real_source_id = id_map.get(conn.get("sourceItemId"))
+            real_target_id = id_map.get(conn.get("targetItemId"))
+            if not (real_source_id and real_target_id):
+                continue
+
+            source_grip = conn.get("sourceGripIndex", 0)
+            target_grip = conn.get("targetGripIndex", 0)
+            waypoints = conn.get("waypoints", [])
+            key = _connection_key(real_source_id, source_grip, real_target_id, target_grip)
+
+            matches = stored_conns.get(key)
+            if matches:
+                existing = matches.pop()
+                if existing.waypoints != waypoints:
+                    existing.waypoints = waypoints
+                    conns_to_update.append(existing)
+            else:
+                conns_to_create.append(_new_connection(project, conn, real_source_id, real_target_id))
+
+        stale = [conn.id for matches in stored_conns.values() for conn in matches]
+        if stale:
+            Connection.objects.filter(pk__in=stale).delete()
+        if conns_to_update:
+            Connection.objects.bulk_update(conns_to_update, ["waypoints"])
+        if conns_to_create:
+            Connection.objects.bulk_create(conns_to_create)
+
+    return id_map
+
+
+# Fields a move_item op may carry besides the id
+MOVE_FIELDS = ["x", "y", "width", "height", "rotation", "label"]
+
+OP_KINDS = {"add_item", "move_item", "delete_item", "add_connection", "update_waypoints", "delete_connection"}
+
+
+# Per op kind: fields that must be numbers when present
+NUMBER_FIELDS = {
+    "add_item": ["x", "y", "width", "height", "rotation", "scaleX", "scaleY", "sequence"],
+    "move_item": ["x", "y", "width", "height", "rotation"],
+    "add_connection": ["sourceGripIndex", "targetGripIndex"],
+}
+INTEGER_FIELDS = {"sequence", "sourceGripIndex", "targetGripIndex"}
+LABEL_MAX_LENGTH = CanvasState._meta.get_field("label").max_length
+
+
+def _is_number(value, integer=False):
+    """Finite JSON number, or a numeric string (whole numbers only if `integer`)."""
+    if isinstance(value, bool):
+        return False
+    if integer and isinstance(value, str):
+        return _as_pk(value) is not None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return False
+    if not math.isfinite(number):
+        return False
+    return number.is_integer() if integer else True
+
+
+def validate_canvas_ops(ops):
+    """
+    Check the shape of every op before any of them is applied.
+    Raises InvalidCanvasOp for the first bad op; returns the component ids
+    referenced by add_item ops (their existence is checked by the caller).
+    """
+    component_ids = set()
+    for index, op in enumerate(ops):
+        if not isinstance(op, dict):
+            raise InvalidCanvasOp(index, "op must be an object")
+        kind = op.get("op")
+        if kind not in OP_KINDS:
+            raise InvalidCanvasOp(index, f"unknown op {kind!r}")
+        if op.get("id") is None:
+            raise InvalidCanvasOp(index, "id is required")
+
+        for field in NUMBER_FIELDS.get(kind, []):
+            if field in op and not _is_number(op[field], integer=field in INTEGER_FIELDS):
+                raise InvalidCanvasOp(index, f"{field} must be a number")
+        if "waypoints" in op and not isinstance(op["waypoints"], list):
+            raise InvalidCanvasOp(index, "waypoints must be a list")
+        if kind in ("add_item", "move_item") and "label" in op:
+            if not isinstance(op["label"], str):
+                raise InvalidCanvasOp(index, "label must be a string")
+            if len(op["label"]) > LABEL_MAX_LENGTH:
+                raise InvalidCanvasOp(index, f"label is longer than {LABEL_MAX_LENGTH} characters")
+
+        if kind == "add_item":
+            comp_id = _as_pk(_component_id(op))
+            if comp_id is None:
+                raise InvalidCanvasOp(index, "component_id is required")
+            component_ids.add(comp_id)
+    return component_ids
+
+
+def apply_canvas_ops(project, base_revision, ops):
+    """
+    Apply a batch of canvas edits on top of `base_revision`.
+
+    Supported ops (ids are row ids, or negative client ids for rows added in
+    the same batch):
+        add_item          {"id", "component_id", "label", "x", "y", ...}
+        move_item         {"id", "x", "y", [width, height, rotation, label]}
+        delete_item       {"id"}
+        add_connection    {"id", "sourceItemId", "sourceGripIndex",
+                           "targetItemId", "targetGripIndex", "waypoints"}
+        update_waypoints  {"id", "waypoints"}
+        delete_connection {"id"}
+
+    The batch is folded into one bulk statement per kind. Ops on rows that no
+    longer exist are ignored. A malformed op, or an add_item naming a component
+    that doesn't exist, or an add_connection whose endpoints don't resolve
+    rejects the whole batch with InvalidCanvasOp.
+    Returns (new revision, id_map) where id_map has "items" and "connections"
+    dicts of client id -> row id.
+    """
+    component_ids = validate_canvas_ops(ops)
+    if component_ids:
+        known = set(Component.objects.filter(pk__in=component_ids).values_list("id", flat=True))
+        for index, op in enumerate(ops):
+            if op["op"] == "add_item" and _as_pk(_component_id(op)) not in known:
+                raise InvalidCanvasOp(index, f"component {_component_id(op)} does not exist")
+
+    new_items = {}      # client id -> add_item op (merged with later moves)
+    moved = {}          # row id -> field updates
+    deleted = set()     # row ids
+    new_conns = {}      # client id -> (op index, add_connection op)
+    waypoints = {}      # connection row id -> waypoints
+    deleted_conns = set()
+
+    for index, op in enumerate(ops):
+        kind = op.get("op")
+        client_id = op.get("id")
+
+        if kind == "add_item":
+            new_items[client_id] = dict(op)
+        elif kind == "move_item":
+            fields = {f: op[f] for f in MOVE_FIELDS if f in op}
+            if client_id in new_items:
+                new_items[client_id].update(fields)
+            elif _as_pk(client_id) is not None:
+                moved.setdefault(_as_pk(client_id), {}).update(fields)
+        elif kind == "delete_item":
+            if new_items.pop(client_id, None) is None and _as_pk(client_id) is not None:
+                deleted.add(_as_pk(client_id))
+                moved.pop(_as_pk(client_id), None)
+        elif kind == "add_connection":
+            new_conns[client_id] = (index, dict(op))
+        elif kind == "update_waypoints":
+            if client_id in new_conns:
+                new_conns[client_id][1]["waypoints"] = op.get("waypoints", [])
+            elif _as_pk(client_id) is not None:
+                waypoints[_as_pk(client_id)] = op.get("waypoints", [])
+        elif kind == "delete_connection":
+            if new_conns.pop(client_id, None) is None and _as_pk(client_id) is not None:
+                deleted_conns.add(_as_pk(client_id))
+                waypoints.pop(_as_pk(client_id), None)
+
+    with transaction.atomic():
+        revision = bump_revision(project, expected=base_revision)
+
+        project_items = CanvasState.objects.filter(project=project)
+        project_conns = Connection.objects.filter(project=project)
+
+        if deleted_conns:
+            project_conns.filter(pk__in=deleted_conns).delete()
+        if deleted:
+            project_items.filter(pk__in=deleted).delete()
+
+        item_map = bulk_insert_items(project, new_items.values())
+
+        if moved:
+            rows = project_items.in_bulk(list(moved))
+            for pk, row in rows.items():
+                for field, value in moved[pk].items():
+                    setattr(row, field, value if field == "label" else float(value))
+            if rows:
+                CanvasState.objects.bulk_update(rows.values(), MOVE_FIELDS)
+
+        # Endpoints may reference rows added above or already stored ones
+        referenced = set()
+        for _, conn in new_conns.values():
+            for key in ("sourceItemId", "targetItemId"):
+                if conn.get(key) not in item_map and _as_pk(conn.get(key)) is not None:
+                    referenced.add(_as_pk(conn.get(key)))
+        existing = set(project_items.filter(pk__in=referenced).values_list("id", flat=True))
+
+        def resolve(item_id):
+            if item_id in item_map:
+                return item_map[item_id]
+            pk = _as_pk(item_id)
+            return pk if pk in existing else None
+
+        conn_map = {}
+        pending = []
+        for client_id, (index, conn) in new_conns.items():
+            source_id = resolve(conn.get("sourceItemId"))
+            target_id = resolve(conn.get("targetItemId"))
+            if not (source_id and target_id):
+                # Raised inside the transaction, so the revision bump is undone too
+                raise InvalidCanvasOp(index, "unknown item")
+            pending.append((client_id, _new_connection(project, conn, source_id, target_id)))
+        if pending:
+            created = Connection.objects.bulk_create([row for _, row in pending])
+            for (client_id, _), row in zip(pending, created):
+                if client_id is not None:
+                    conn_map[client_id] = row.id
+
+        if waypoints:
+            rows = project_conns.in_bulk(list(waypoints))
+            for pk, row in rows.items():
+                row.waypoints = waypoints[pk]
+            if rows:
+                Connection.objects.bulk_update(rows.values(), ["waypoints"])
+
+    return revision, {"items": item_map, "connections": conn_map}
@@ -15,6 +15,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             "user",
             "created_at",
             "updated_at",
+            "revision",
         )
 
 
@@ -145,3 +146,111 @@ class ConnectionSerializer(serializers.ModelSerializer):
             "waypoints",
         ]
 
+
+# ---------------------------------------------------------------------------
+# Fast read path for project canvases
+# ---------------------------------------------------------------------------
+ITEM_VALUE_FIELDS = (
+    "id", "project_id", "component_id", "label",
+    "x", "y", "width", "height", "rotation", "scaleX", "scaleY", "sequence",
+)
+COMPONENT_VALUE_FIELDS = ("id", "s_no", "parent", "name", "svg", "png", "object", "legend", "suffix", "grips")
+CONNECTION_VALUE_FIELDS = ("id", "sourceItemId_id", "sourceGripIndex", "targetItemId_id", "targetGripIndex", "waypoints")
+
+
+def _file_url(field_name, name):
+    # Same value DRF's FileField emits without a request: the storage URL or None
+    if not name:
+        return None
+    return Component._meta.get_field(field_name).storage.url(name)
+
+
+def component_metadata(component_ids):
+    """Component info keyed by id, in the flattened form canvas items carry."""
+    metadata = {}
+    rows = Component.objects.filter(id__in=component_ids).values_list(*COMPONENT_VALUE_FIELDS)
+    for comp_id, s_no, parent, name, svg, png, obj, legend, suffix, grips in rows:
+        metadata[comp_id] = {
+            "s_no": s_no,
+            "parent": parent,
+            "name": name,
+            "svg": _file_url("svg", svg),
+            "png": _file_url("png", png),
+            "object": obj,
+            "legend": legend,
+            "suffix": suffix,
+            "grips": grips,
+        }
+    return metadata
+
+
+def serialize_canvas_state(project, compact=False):
+    """
+    Build the canvas_state payload for a project without DRF field machinery.
+
+    Produces exactly what CanvasStateSerializer / ConnectionSerializer return,
+    but from values_list() tuples, with component metadata looked up once per
+    distinct component instead of once per item.
+
+    With compact=True the component info is not repeated on every item: it is
+    returned once per component in a "components" table keyed by id, and items
+    only carry their component_id.
+    """
+    item_rows = list(
+        CanvasState.objects
+        .filter(project=project)
+        .order_by("sequence", "id")
+        .values_list(*ITEM_VALUE_FIELDS)
+    )
+    metadata = component_metadata({row[2] for row in item_rows})
+
+    items = []
+    for (item_id, project_id, comp_id, label,
+         x, y, width, height, rotation, scale_x, scale_y, sequence) in item_rows:
+        item = {
+            "id": item_id,
+            "project": project_id,
+            "component_id": comp_id,
+            "label": label,
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "rotation": rotation,
+            "scaleX": scale_x,
+            "scaleY": scale_y,
+            "sequence": sequence,
+        }
+        if not compact:
+            item.update(metadata[comp_id])
+        items.append(item)
+
+    connections = [
+        {
+            "id": conn_id,
+            "sourceItemId": source_id,
+            "sourceGripIndex": source_grip,
+            "targetItemId": target_id,
+            "targetGripIndex": target_grip,
+            "waypoints": waypoints,
+        }
+        for conn_id, source_id, source_grip, target_id, target_grip, waypoints in (
+            Connection.objects
+            .filter(project=project)
+            .values_list(*CONNECTION_VALUE_FIELDS)
+        )
+    ]
+
+    canvas_state = {
+        "items": items,
+        "connections": connections,
+        # Sequence counter (next available)
+        "sequence_counter": item_rows[-1][-1] + 1 if item_rows else 0,
+    }
+    if compact:
+        # JSON object keys are strings; use them here too so both ends agree
+        canvas_state["format"] = "compact"
+        canvas_state["components"] = {
+            str(comp_id): {"id": comp_id, **info} for comp_id, info in metadata.items()
+        }
+    return canvas_state
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Component, DeletedComponent
+from .catalogue import invalidate_catalogue
+
+
+@receiver(post_save, sender=Component)
+@receiver(post_delete, sender=Component)
+def component_changed(sender, **kwargs):
+    invalidate_catalogue()
+
+
+@receiver(post_delete, sender=Component)
+def component_deleted(sender, instance, **kwargs):
+    # Tombstone for clients syncing with ?since=
+    DeletedComponent.objects.create(
+        component_id=instance.id,
+        s_no=instance.s_no,
+        created_by_id=instance.created_by_id,
+    )
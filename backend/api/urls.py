@@ -12,11 +12,13 @@ urlpatterns = [
 
     # Component endpoints
     path('components/', views.ComponentListView.as_view(), name='component-list'),
+    path('components/version/', views.ComponentCatalogueVersionView.as_view(), name='component-version'),
     path('components/<int:id>/', views.ComponentDetailView.as_view(), name='component-detail'),
 
   
     # Project endpoints
     path('project/', views.ProjectListCreateView.as_view(), name='project-list'),
     path('project/<int:id>/', views.ProjectDetailView.as_view(), name='project-detail'),
+    path('project/<int:id>/canvas/ops/', views.ProjectCanvasOpsView.as_view(), name='project-canvas-ops'),
   ]
 
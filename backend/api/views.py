@@ -1,7 +1,21 @@
 from django.shortcuts import render
 from django.http import Http404
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .models import Component, Project, CanvasState, Connection
-from .serializers import ComponentSerializer, ProjectSerializer,CanvasStateSerializer, ConnectionSerializer
+from .serializers import ComponentSerializer, ProjectSerializer,CanvasStateSerializer, ConnectionSerializer, serialize_canvas_state
+from .catalogue import (
+    component_catalogue, component_changes, select_fields, catalogue_etag, catalogue_last_modified,
+)
+from .pagination import ComponentCursorPagination
+from .persistence import (
+    sync_canvas_state, replace_canvas_state, apply_canvas_ops, bump_revision, RevisionConflict,
+    InvalidCanvasOp,
+)
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework.decorators import api_view, permission_classes
@@ -72,10 +86,56 @@ class ComponentListView(generics.ListCreateAPIView):
         )
 
     def list(self, request, *args, **kwargs):
-        # ... (list method remains same) ...
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True, context={'request': request})
-        return Response({"components": serializer.data}, status=status.HTTP_200_OK)
+        # ?fields=id,s_no: sparse fieldset
+        fields = None
+        if request.query_params.get("fields"):
+            fields = [f.strip() for f in request.query_params["fields"].split(",") if f.strip()]
+            unknown = [f for f in fields if f not in self.get_serializer().fields]
+            if unknown:
+                return Response({"status": "error", "message": f"Unknown fields: {', '.join(unknown)}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        # ?since=<timestamp>: only what changed (and tombstones of what was deleted)
+        since_param = request.query_params.get("since")
+        if since_param:
+            try:
+                since = parse_datetime(since_param)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({"status": "error", "message": "Invalid since timestamp"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since, datetime.timezone.utc)
+            changes = component_changes(request, since)
+            changes["components"] = select_fields(changes["components"], fields)
+            return Response(changes, status=status.HTTP_200_OK)
+
+        # ?page_size= / ?cursor=: cursor pagination (the default stays one unpaginated list)
+        if "cursor" in request.query_params or "page_size" in request.query_params:
+            paginator = ComponentCursorPagination()
+            page = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+            data = self.get_serializer(page, many=True, context={'request': request}).data
+            return Response({
+                "components": select_fields(data, fields),
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+            }, status=status.HTTP_200_OK)
+
+        etag = catalogue_etag(request.user, fields)
+        last_modified = catalogue_last_modified()
+
+        # Client copy is current: 304 without touching the catalogue
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        # Default components come from the versioned cache; only the user's own are queried
+        components = select_fields(component_catalogue(request), fields)
+        response = Response({"components": components}, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
 
     def create(self, request, *args, **kwargs):
         # ... (create method remains same) ...
@@ -89,6 +149,22 @@ class ComponentListView(generics.ListCreateAPIView):
             status=status.HTTP_201_CREATED
         )
 
+class ComponentCatalogueVersionView(generics.GenericAPIView):
+    """Cheap check for whether the component list changed since the last download."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        etag = catalogue_etag(request.user)
+        last_modified = catalogue_last_modified()
+        response = Response({
+            "status": "success",
+            "version": etag.strip('"'),
+            "last_modified": http_date(last_modified),
+        }, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
 class ComponentDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ComponentSerializer
     permission_classes = [IsAuthenticated]
@@ -137,7 +213,8 @@ class ProjectListCreateView(generics.ListCreateAPIView):
     serializer_class = ProjectSerializer
 
     def get_queryset(self):
-        return Project.objects.filter(user=self.request.user)
+        # Most recently edited first (served by the (user, updated_at) index)
+        return Project.objects.filter(user=self.request.user).order_by("-updated_at")
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -152,11 +229,46 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         serializer.is_valid(raise_exception=True)
         # Don't pass user here
         project = serializer.save()
+
+        # Initial canvas, if any, goes through the bulk insert path
+        canvas_data = request.data.get("canvas_state")
+        if canvas_data:
+            replace_canvas_state(project, canvas_data)
+
         return Response({
             "message": "Project created",
             "project": self.get_serializer(project).data
         }, status=status.HTTP_201_CREATED)
 
+def revision_etag(revision, canvas_format=None):
+    """ETag of a project revision; each canvas format gets its own tag ("5", "5-compact")."""
+    if canvas_format:
+        return f'"{revision}-{canvas_format}"'
+    return f'"{revision}"'
+
+
+def revision_from_etag(value, canvas_format=None):
+    """
+    Parse a revision out of an ETag header value ("5", W/"5" or "5-compact");
+    None if absent/invalid. With canvas_format ("" for the full form) only a
+    tag for that representation counts; a list of tags is searched in order.
+    """
+    if not value:
+        return None
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        revision, _, tag_format = tag.strip('"').partition("-")
+        if canvas_format is not None and tag_format != canvas_format:
+            continue
+        try:
+            return int(revision)
+        except ValueError:
+            continue
+    return None
+
+
 class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
@@ -178,113 +290,75 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     # -----------------------------
     def retrieve(self, request, *args, **kwargs):
         project = self.get_object()
+        # ?canvas_format=compact returns component info once per component;
+        # the two formats are different representations with their own ETags
+        canvas_format = "compact" if request.query_params.get("canvas_format") == "compact" else ""
+        etag = revision_etag(project.revision, canvas_format)
+
+        # Client copy is current: no body needed ("*" matches any existing project)
+        if_none_match = (request.headers.get("If-None-Match") or "").strip()
+        current = if_none_match == "*" or revision_from_etag(if_none_match, canvas_format) == project.revision
+        if request.method == "GET" and current:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response["ETag"] = etag
+            return response
 
         # Project detail
-        project_data = ProjectSerializer(project).data
-
-        # Canvas items (nodes)
-        canvas_items = (
-            CanvasState.objects
-            .filter(project=project)
-            .select_related("component")
-            .order_by("sequence")
-        )
-
-        items_data = CanvasStateSerializer(canvas_items, many=True).data
-
-        # Connections (edges)
-        connections = Connection.objects.filter(
-            sourceItemId__project=project
-        )
-
-        connections_data = ConnectionSerializer(connections, many=True).data
-
-        # Sequence counter (next available)
-        sequence_counter = (
-            canvas_items.last().sequence + 1
-            if canvas_items.exists()
-            else 0
-        )
-        response_data = project_data
+        response_data = ProjectSerializer(project).data
         response_data["status"] = "success"
-        response_data["canvas_state"] = {
-                "items": items_data,
-                "connections": connections_data,
-                "sequence_counter": sequence_counter
-            }
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        # Canvas items (nodes) and connections (edges) via the fast read path
+        response_data["canvas_state"] = serialize_canvas_state(project, compact=bool(canvas_format))
+
+        response = Response(response_data, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        return response
 
     # UPDATE (project only)
     def update(self, request, *args, **kwargs):
         project = self.get_object()
         
-        # 1. Update project metadata (standard DRF)
         partial = kwargs.pop('partial', False)
         serializer = self.get_serializer(project, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        
-        # 2. Handle canvas_state manually
+
         canvas_data = request.data.get("canvas_state")
-        
-        if canvas_data:
-            from django.db import transaction
-            from .models import CanvasState, Connection 
-            
+        id_map = None
+
+        # With If-Match the write only goes through if the client saw the latest revision
+        if_match = request.headers.get("If-Match")
+        expected = None
+        if if_match and if_match.strip() != "*":
+            expected = revision_from_etag(if_match)
+            if expected is None:
+                expected = -1  # unparseable tag can never match
+
+        try:
             with transaction.atomic():
-                # A. Clear existing state
-                CanvasState.objects.filter(project=project).delete()
-                
-                # B. Re-create Items
-                items_data = canvas_data.get("items", [])
-                connections_data = canvas_data.get("connections", [])
-                
-                id_map = {} # old_id -> new_instance_id
-
-                for item in items_data:
-                    old_id = item.get("id")
-                    comp_id = item.get("component_id")
-                    
-                    if not comp_id:
-                         continue
-                         
-                    new_item = CanvasState.objects.create(
-                        project=project,
-                        component_id=comp_id,
-                        label=item.get("label", ""),
-                        x=item.get("x", 0),
-                        y=item.get("y", 0),
-                        width=item.get("width", 50),
-                        height=item.get("height", 50),
-                        rotation=item.get("rotation", 0),
-                        scaleX=item.get("scaleX", 1),
-                        scaleY=item.get("scaleY", 1),
-                        sequence=item.get("sequence", 0),
-                    )
-                    
-                    if old_id is not None:
-                        id_map[old_id] = new_item.id
-
-                # C. Re-create Connections
-                for conn in connections_data:
-                    source_old_id = conn.get("sourceItemId")
-                    target_old_id = conn.get("targetItemId")
-                    
-                    real_source_id = id_map.get(source_old_id)
-                    real_target_id = id_map.get(target_old_id)
-                    
-                    if real_source_id and real_target_id:
-                        Connection.objects.create(
-                            sourceItemId_id=real_source_id,
-                            targetItemId_id=real_target_id,
-                            sourceGripIndex=conn.get("sourceGripIndex", 0),
-                            targetGripIndex=conn.get("targetGripIndex", 0),
-                            waypoints=conn.get("waypoints", [])
-                        )
+                # 1. Claim the next revision
+                bump_revision(project, expected=expected)
+
+                # 2. Update project metadata (standard DRF)
+                self.perform_update(serializer)
+
+                # 3. Handle canvas_state manually (diffed against stored rows)
+                if canvas_data:
+                    id_map = sync_canvas_state(project, canvas_data)
+        except RevisionConflict as exc:
+            response = Response({
+                "status": "error",
+                "message": "Project was changed by another save",
+                "revision": exc.current_revision
+            }, status=status.HTTP_412_PRECONDITION_FAILED)
+            response["ETag"] = revision_etag(exc.current_revision)
+            return response
 
         # Return the updated project with new canvas state
-        return self.retrieve(request, *args, **kwargs)
+        response = self.retrieve(request, *args, **kwargs)
+        if id_map is not None:
+            # Lets the client keep stable item ids across saves
+            response.data["id_map"] = {str(k): v for k, v in id_map.items()}
+        return response
 
 
 
@@ -299,3 +373,61 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
             "status": "success",
             "message": "Project deleted successfully"
         }, status=status.HTTP_200_OK)
+
+
+class ProjectCanvasOpsView(generics.GenericAPIView):
+    """
+    Apply a batch of canvas edits instead of re-sending the whole canvas.
+
+    POST /api/project/<id>/canvas/ops/
+    {"base_revision": 4, "ops": [{"op": "move_item", "id": 12, "x": 10, "y": 20}, ...]}
+    """
+    permission_classes = [IsAuthenticated]
+    lookup_field = "id"
+
+    def get_queryset(self):
+        return Project.objects.filter(user=self.request.user)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Http404):
+            return Response({
+                "status": "error",
+                "message": "Project not found"
+            }, status=status.HTTP_404_NOT_FOUND)
+        return super().handle_exception(exc)
+
+    def post(self, request, *args, **kwargs):
+        project = self.get_object()
+
+        base_revision = request.data.get("base_revision")
+        ops = request.data.get("ops")
+        if isinstance(base_revision, bool) or not isinstance(base_revision, int) or not isinstance(ops, list):
+            return Response({
+                "status": "error",
+                "message": "base_revision and a list of ops are required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            revision, id_map = apply_canvas_ops(project, base_revision, ops)
+        except InvalidCanvasOp as exc:
+            return Response({
+                "status": "error",
+                "message": str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except RevisionConflict as exc:
+            return Response({
+                "status": "error",
+                "message": "Canvas was changed by another save",
+                "revision": exc.current_revision
+            }, status=status.HTTP_409_CONFLICT)
+
+        response = Response({
+            "status": "success",
+            "revision": revision,
+            "id_map": {
+                kind: {str(k): v for k, v in mapping.items()}
+                for kind, mapping in id_map.items()
+            }
+        }, status=status.HTTP_200_OK)
+        response["ETag"] = revision_etag(revision)
+        return response
@@ -15,6 +15,12 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
+    if sys.argv[1:2] == ['runserver']:
+        # The development server writes headers and body separately; with Nagle
+        # on, every response on a keep-alive connection stalls on the client's
+        # delayed ACK (~40 ms). Production servers set TCP_NODELAY themselves.
+        from django.core.servers.basehttp import WSGIRequestHandler
+        WSGIRequestHandler.disable_nagle_algorithm = True
     execute_from_command_line(sys.argv)
 
 
@@ -0,0 +1,135 @@
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from api.models import Component, Project, CanvasState, Connection
+from api.persistence import replace_canvas_state, sync_canvas_state
+from api.serializers import CanvasStateSerializer, ConnectionSerializer, serialize_canvas_state
+
+
+def build_canvas(component, count, id_offset=0):
+    """Chain of `count` items with a connection between each neighbour."""
+    items = [
+        {
+            "id": -(i + 1) - id_offset,
+            "component_id": component.id,
+            "label": f"P{i:05d}",
+            "x": (i % 100) * 60,
+            "y": (i // 100) * 60,
+            "width": 50,
+            "height": 50,
+            "sequence": i + 1,
+        }
+        for i in range(count)
+    ]
+    connections = [
+        {
+            "sourceItemId": items[i]["id"],
+            "sourceGripIndex": 1,
+            "targetItemId": items[i + 1]["id"],
+            "targetGripIndex": 0,
+            "waypoints": [],
+        }
+        for i in range(count - 1)
+    ]
+    return {"items": items, "connections": connections}
+
+
+class CanvasSaveBenchmark(TestCase):
+    """
+    Save timings for growing diagrams. The query count assertions catch a
+    regression back to per-row INSERTs; timings are printed for comparison.
+    """
+
+    SIZES = (100, 1000, 10000)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="bench", password="bench")
+        self.component = Component.objects.create(s_no="001", name="Pump", object="Pump", grips=[])
+
+    def _run(self, label, save, project, canvas):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            id_map = save(project, canvas)
+            elapsed = time.perf_counter() - start
+        print(f"\n[BENCH] {label}: {len(canvas['items'])} items in {elapsed * 1000:.1f} ms "
+              f"({len(ctx.captured_queries)} queries)")
+        return id_map, ctx.captured_queries
+
+    def test_full_replace(self):
+        for size in self.SIZES:
+            project = Project.objects.create(name=f"bench-{size}", user=self.user)
+            canvas = build_canvas(self.component, size)
+
+            id_map, queries = self._run("full replace", replace_canvas_state, project, canvas)
+
+            self.assertEqual(len(id_map), size)
+            self.assertEqual(CanvasState.objects.filter(project=project).count(), size)
+            self.assertEqual(Connection.objects.filter(sourceItemId__project=project).count(), size - 1)
+            # bulk_create batches: far fewer statements than rows
+            self.assertLess(len(queries), 10 + size // 50)
+
+    def test_incremental_edit(self):
+        for size in self.SIZES:
+            project = Project.objects.create(name=f"bench-edit-{size}", user=self.user)
+            canvas = build_canvas(self.component, size)
+            id_map = replace_canvas_state(project, canvas)
+
+            # Re-key to stored ids and move a handful of items
+            for item in canvas["items"]:
+                item["id"] = id_map[item["id"]]
+            for conn in canvas["connections"]:
+                conn["sourceItemId"] = id_map[conn["sourceItemId"]]
+                conn["targetItemId"] = id_map[conn["targetItemId"]]
+            for item in canvas["items"][:5]:
+                item["x"] += 10
+
+            _, queries = self._run("5-item edit", sync_canvas_state, project, canvas)
+
+            writes = [q for q in queries if q["sql"].startswith(("INSERT", "DELETE"))]
+            self.assertEqual(writes, [])
+
+
+class CanvasRetrieveBenchmark(TestCase):
+    """Project canvas read: DRF model serializers vs the values_list() fast path."""
+
+    SIZES = (1000, 10000)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="bench", password="bench")
+        self.components = [
+            Component.objects.create(s_no=f"{i:03d}", name=f"Comp {i}", object="Pump", grips=[{"x": 0, "y": 50}])
+            for i in range(20)
+        ]
+
+    def _serializer_path(self, project):
+        items = CanvasState.objects.filter(project=project).select_related("component").order_by("sequence", "id")
+        connections = Connection.objects.filter(sourceItemId__project=project)
+        return {
+            "items": CanvasStateSerializer(items, many=True).data,
+            "connections": ConnectionSerializer(connections, many=True).data,
+        }
+
+    def _time(self, label, size, read):
+        start = time.perf_counter()
+        result = read()
+        elapsed = time.perf_counter() - start
+        print(f"\n[BENCH] {label}: {size} items in {elapsed * 1000:.1f} ms")
+        return result, elapsed
+
+    def test_retrieve(self):
+        for size in self.SIZES:
+            project = Project.objects.create(name=f"read-{size}", user=self.user)
+            canvas = build_canvas(self.components[0], size)
+            for i, item in enumerate(canvas["items"]):
+                item["component_id"] = self.components[i % len(self.components)].id
+            replace_canvas_state(project, canvas)
+
+            slow, _ = self._time("model serializers", size, lambda: self._serializer_path(project))
+            fast, _ = self._time("fast read path", size, lambda: serialize_canvas_state(project))
+
+            self.assertEqual(fast["items"], slow["items"])
+            self.assertEqual(fast["connections"], slow["connections"])
+
@@ -0,0 +1,85 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from api.models import Component, Project, CanvasState, Connection
+from api.persistence import replace_canvas_state
+from api.serializers import serialize_canvas_state
+from tests.test_benchmarks import build_canvas
+
+
+def query_plan(queryset):
+    """SQLite EXPLAIN QUERY PLAN for a queryset, as one string."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return " | ".join(row[-1] for row in cursor.fetchall())
+
+
+@skipUnless(connection.vendor == "sqlite", "query plans are checked on SQLite")
+class HotQueryPlanTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="planner", password="testpass")
+        self.component = Component.objects.create(s_no="001", name="Pump", object="Pump", grips=[])
+        self.project = Project.objects.create(name="Plant", user=self.user)
+        replace_canvas_state(self.project, build_canvas(self.component, 20))
+
+    def test_canvas_items_use_project_sequence_index(self):
+        plan = query_plan(CanvasState.objects.filter(project=self.project).order_by("sequence"))
+
+        self.assertIn("canvasstate_project_seq_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_connections_load_without_join(self):
+        plan = query_plan(Connection.objects.filter(project=self.project))
+
+        self.assertIn("api_connection_project_id", plan)
+        self.assertNotIn("api_canvasstate", plan)
+
+    def test_component_list_uses_owner_index(self):
+        plan = query_plan(Component.objects.filter(Q(created_by=self.user) | Q(created_by__isnull=True)))
+
+        self.assertIn("component_owner_sno_idx", plan)
+
+    def test_project_list_uses_user_updated_index(self):
+        plan = query_plan(Project.objects.filter(user=self.user).order_by("-updated_at"))
+
+        self.assertIn("project_user_updated_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class ConnectionProjectTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="edges", password="testpass")
+        self.component = Component.objects.create(s_no="001", name="Pump", object="Pump", grips=[])
+        self.project = Project.objects.create(name="Plant", user=self.user)
+
+    def test_bulk_paths_set_project(self):
+        replace_canvas_state(self.project, build_canvas(self.component, 5))
+
+        self.assertEqual(Connection.objects.filter(project=self.project).count(), 4)
+        self.assertFalse(Connection.objects.filter(project__isnull=True).exists())
+
+    def test_save_fills_project_from_source_item(self):
+        a, b = [
+            CanvasState.objects.create(project=self.project, component=self.component, label=label,
+                                       x=0, y=0, width=50, height=50, sequence=i)
+            for i, label in enumerate(["A", "B"])
+        ]
+        conn = Connection.objects.create(sourceItemId=a, sourceGripIndex=0, targetItemId=b,
+                                         targetGripIndex=0, waypoints=[])
+
+        self.assertEqual(conn.project_id, self.project.id)
+
+    def test_canvas_read_query_count_is_constant(self):
+        replace_canvas_state(self.project, build_canvas(self.component, 200))
+
+        with CaptureQueriesContext(connection) as ctx:
+            serialize_canvas_state(self.project)
+
+        # items, components, connections; no join to canvas items for edges
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertNotIn("api_canvasstate", ctx.captured_queries[-1]["sql"])
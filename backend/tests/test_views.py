@@ -1,3 +1,7 @@
+import gzip
+import json
+from datetime import timedelta
+
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
@@ -5,6 +9,10 @@ from django.urls import reverse
 from django.test import TestCase
 from api.models import Component, Project, CanvasState, Connection
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.utils import timezone
 
 
 class RegisterAPITest(APITestCase):
@@ -333,3 +341,499 @@ class ProjectAPITest(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CanvasDiffSaveAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="canvasuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+        self.project = Project.objects.create(name="Plant", user=self.user)
+        self.pump = Component.objects.create(s_no="001", name="Pump", object="Pump", grips=[])
+        self.valve = Component.objects.create(s_no="002", name="Valve", object="Valve", grips=[])
+        self.url = reverse("project-detail", args=[self.project.id])
+
+    def _item(self, item_id, component, x, sequence):
+        return {
+            "id": item_id,
+            "component_id": component.id,
+            "label": f"Item {sequence}",
+            "x": x,
+            "y": 100,
+            "width": 50,
+            "height": 50,
+            "rotation": 0,
+            "sequence": sequence,
+        }
+
+    def _save(self, items, connections=()):
+        data = {"name": "Plant", "canvas_state": {"items": items, "connections": list(connections)}}
+        return self.client.put(self.url, data, format="json")
+
+    def test_first_save_returns_id_map(self):
+        response = self._save(
+            [self._item(-1, self.pump, 10, 1), self._item(-2, self.valve, 200, 2)],
+            [{"sourceItemId": -1, "sourceGripIndex": 0, "targetItemId": -2, "targetGripIndex": 1, "waypoints": []}],
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        id_map = response.data["id_map"]
+        self.assertEqual(set(id_map), {"-1", "-2"})
+        self.assertEqual(CanvasState.objects.filter(project=self.project).count(), 2)
+        conn = Connection.objects.get(sourceItemId__project=self.project)
+        self.assertEqual(conn.sourceItemId_id, id_map["-1"])
+        self.assertEqual(conn.targetItemId_id, id_map["-2"])
+
+    def test_resave_keeps_rows_and_only_touches_changes(self):
+        first = self._save(
+            [self._item(-1, self.pump, 10, 1), self._item(-2, self.valve, 200, 2)],
+            [{"sourceItemId": -1, "sourceGripIndex": 0, "targetItemId": -2, "targetGripIndex": 1, "waypoints": []}],
+        ).data["id_map"]
+        pump_id, valve_id = first["-1"], first["-2"]
+        conn_id = Connection.objects.get(sourceItemId__project=self.project).id
+
+        # Move the pump, drop the valve, add a new valve
+        response = self._save(
+            [self._item(pump_id, self.pump, 40, 1), self._item(-3, self.valve, 300, 2)],
+            [{"sourceItemId": pump_id, "sourceGripIndex": 0, "targetItemId": -3, "targetGripIndex": 1, "waypoints": []}],
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = CanvasState.objects.filter(project=self.project)
+        self.assertEqual(items.count(), 2)
+        self.assertEqual(items.get(id=pump_id).x, 40)
+        self.assertFalse(items.filter(id=valve_id).exists())
+        new_valve_id = response.data["id_map"]["-3"]
+        conn = Connection.objects.get(sourceItemId__project=self.project)
+        self.assertNotEqual(conn.id, conn_id)
+        self.assertEqual(conn.targetItemId_id, new_valve_id)
+
+    def test_unchanged_save_does_not_rewrite_rows(self):
+        first = self._save(
+            [self._item(-1, self.pump, 10, 1), self._item(-2, self.valve, 200, 2)],
+            [{"sourceItemId": -1, "sourceGripIndex": 0, "targetItemId": -2, "targetGripIndex": 1,
+              "waypoints": [{"x": 1, "y": 2}]}],
+        ).data["id_map"]
+        items = [self._item(first["-1"], self.pump, 10, 1), self._item(first["-2"], self.valve, 200, 2)]
+        conns = [{"sourceItemId": first["-1"], "sourceGripIndex": 0, "targetItemId": first["-2"],
+                  "targetGripIndex": 1, "waypoints": [{"x": 1, "y": 2}]}]
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._save(items, conns)
+
+        writes = [q["sql"] for q in ctx.captured_queries
+                  if q["sql"].startswith(("INSERT", "DELETE")) or
+                  (q["sql"].startswith("UPDATE") and "api_project" not in q["sql"])]
+        self.assertEqual(writes, [])
+
+    def test_create_project_with_canvas_state(self):
+        data = {
+            "name": "Fresh",
+            "canvas_state": {
+                "items": [self._item(-1, self.pump, 10, 1), self._item(-2, self.valve, 200, 2)],
+                "connections": [{"sourceItemId": -1, "sourceGripIndex": 0, "targetItemId": -2,
+                                 "targetGripIndex": 1, "waypoints": []}],
+            },
+        }
+        response = self.client.post(reverse("project-list"), data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        project = Project.objects.get(id=response.data["project"]["id"])
+        self.assertEqual(CanvasState.objects.filter(project=project).count(), 2)
+        self.assertEqual(Connection.objects.filter(sourceItemId__project=project).count(), 1)
+
+
+class CanvasOpsAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="opsuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+        self.project = Project.objects.create(name="Plant", user=self.user)
+        self.pump = Component.objects.create(s_no="001", name="Pump", object="Pump", grips=[])
+        self.item = CanvasState.objects.create(
+            project=self.project, component=self.pump, label="P01",
+            x=0, y=0, width=50, height=50, sequence=1,
+        )
+        self.url = reverse("project-canvas-ops", args=[self.project.id])
+
+    def test_ops_apply_and_bump_revision(self):
+        ops = [
+            {"op": "add_item", "id": -1, "component_id": self.pump.id, "label": "P02",
+             "x": 100, "y": 0, "width": 50, "height": 50, "sequence": 2},
+            {"op": "move_item", "id": self.item.id, "x": 30, "y": 40},
+            {"op": "add_connection", "id": -5, "sourceItemId": self.item.id, "sourceGripIndex": 1,
+             "targetItemId": -1, "targetGripIndex": 0, "waypoints": []},
+        ]
+        response = self.client.post(self.url, {"base_revision": 0, "ops": ops}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["revision"], 1)
+        new_id = response.data["id_map"]["items"]["-1"]
+        conn_id = response.data["id_map"]["connections"]["-5"]
+
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.x, self.item.y), (30, 40))
+        conn = Connection.objects.get(id=conn_id)
+        self.assertEqual((conn.sourceItemId_id, conn.targetItemId_id), (self.item.id, new_id))
+
+        # Follow-up batch on top of the new revision
+        ops = [
+            {"op": "update_waypoints", "id": conn_id, "waypoints": [{"x": 1, "y": 1}]},
+            {"op": "delete_item", "id": self.item.id},
+        ]
+        response = self.client.post(self.url, {"base_revision": 1, "ops": ops}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["revision"], 2)
+        self.assertEqual(list(CanvasState.objects.filter(project=self.project).values_list("id", flat=True)), [new_id])
+        self.assertFalse(Connection.objects.filter(id=conn_id).exists())
+
+    def test_ops_save_touches_updated_at(self):
+        # Project lists are ordered by updated_at, so an ops save must move it
+        earlier = timezone.now() - timedelta(days=1)
+        Project.objects.filter(pk=self.project.pk).update(updated_at=earlier)
+        ops = [{"op": "move_item", "id": self.item.id, "x": 30, "y": 40}]
+
+        response = self.client.post(self.url, {"base_revision": 0, "ops": ops}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.project.refresh_from_db()
+        self.assertGreater(self.project.updated_at, earlier)
+
+    def test_stale_base_revision_is_rejected(self):
+        self.project.revision = 3
+        self.project.save()
+        ops = [{"op": "delete_item", "id": self.item.id}]
+
+        response = self.client.post(self.url, {"base_revision": 2, "ops": ops}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["revision"], 3)
+        self.assertTrue(CanvasState.objects.filter(id=self.item.id).exists())
+
+    def test_missing_base_revision(self):
+        response = self.client.post(self.url, {"ops": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {"base_revision": "abc", "ops": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_ops_are_rejected(self):
+        add = {"op": "add_item", "id": -1, "component_id": self.pump.id, "x": 0, "y": 0}
+        bad_ops = {
+            "non-numeric move": {"op": "move_item", "id": self.item.id, "x": "left", "y": 0},
+            "non-finite move": {"op": "move_item", "id": self.item.id, "x": "nan", "y": 0},
+            "non-numeric add": dict(add, width=[]),
+            "fractional sequence": dict(add, sequence=1.5),
+            "unknown component": dict(add, component_id=999999),
+            "missing component": {"op": "add_item", "id": -1, "x": 0, "y": 0},
+            "bad grip index": {"op": "add_connection", "id": -5, "sourceItemId": self.item.id,
+                               "sourceGripIndex": "top", "targetItemId": self.item.id},
+            "bad waypoints": {"op": "update_waypoints", "id": 1, "waypoints": "none"},
+            "long label": dict(add, label="P" * 101),
+            "non-string label": {"op": "move_item", "id": self.item.id, "x": 0, "y": 0, "label": 5},
+            "unknown endpoint": {"op": "add_connection", "id": -5, "sourceItemId": self.item.id,
+                                 "sourceGripIndex": 0, "targetItemId": -9, "targetGripIndex": 0},
+            "missing endpoint": {"op": "add_connection", "id": -5, "sourceItemId": self.item.id,
+                                 "sourceGripIndex": 0, "targetItemId": 999999, "targetGripIndex": 0},
+            "unknown op": {"op": "rotate_item", "id": self.item.id},
+            "missing id": {"op": "delete_item"},
+            "not an object": "delete_item",
+        }
+        for name, op in bad_ops.items():
+            with self.subTest(name):
+                # A valid op ahead of the bad one must not be applied either
+                ops = [{"op": "move_item", "id": self.item.id, "x": 5, "y": 5}, op]
+                response = self.client.post(self.url, {"base_revision": 0, "ops": ops}, format="json")
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertTrue(response.data["message"].startswith("ops[1]: "))
+
+        self.item.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertEqual((self.item.x, self.item.y), (0, 0))
+        self.assertEqual(self.project.revision, 0)
+        self.assertEqual(CanvasState.objects.filter(project=self.project).count(), 1)
+
+    def test_numeric_strings_are_accepted(self):
+        ops = [
+            {"op": "add_item", "id": -1, "component_id": str(self.pump.id), "x": "10.5", "y": 0,
+             "sequence": "2"},
+            {"op": "move_item", "id": self.item.id, "x": "30", "y": 40.5},
+        ]
+        response = self.client.post(self.url, {"base_revision": 0, "ops": ops}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.x, self.item.y), (30, 40.5))
+        added = CanvasState.objects.get(id=response.data["id_map"]["items"]["-1"])
+        self.assertEqual((added.x, added.sequence), (10.5, 2))
+
+
+class ProjectRevisionAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="etaguser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Plant", user=self.user)
+        self.url = reverse("project-detail", args=[self.project.id])
+
+    def test_retrieve_sets_etag_and_honours_if_none_match(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], '"0"')
+        self.assertEqual(response.data["revision"], 0)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"0"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], '"0"')
+
+    def test_compact_format_has_its_own_etag(self):
+        compact_url = self.url + "?canvas_format=compact"
+        response = self.client.get(compact_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], '"0-compact"')
+
+        # A cached full copy does not validate the compact one, and vice versa
+        response = self.client.get(compact_url, HTTP_IF_NONE_MATCH='"0"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"0-compact"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(compact_url, HTTP_IF_NONE_MATCH='W/"0-compact"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], '"0-compact"')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"0-compact", "0"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Either tag is fine as a write precondition: both name the revision
+        response = self.client.put(self.url, {"name": "Renamed"}, format="json", HTTP_IF_MATCH='"0-compact"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(compact_url, HTTP_IF_NONE_MATCH='"0-compact"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], '"1-compact"')
+
+    def test_update_bumps_revision(self):
+        response = self.client.put(self.url, {"name": "Renamed"}, format="json", HTTP_IF_MATCH='"0"')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], '"1"')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"0"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_stale_if_match_is_rejected(self):
+        self.client.put(self.url, {"name": "First"}, format="json")
+
+        response = self.client.put(self.url, {"name": "Second"}, format="json", HTTP_IF_MATCH='"0"')
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.data["revision"], 1)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, "First")
+
+
+class CanvasRetrieveAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="readuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        svg = SimpleUploadedFile("pump.svg", b"<svg></svg>", content_type="image/svg+xml")
+        self.pump = Component.objects.create(s_no="001", name="Pump", object="Pump", svg=svg, grips=[{"x": 0, "y": 50}])
+        self.valve = Component.objects.create(s_no="002", name="Valve", object="Valve", grips=[])
+        self.project = Project.objects.create(name="Plant", user=self.user)
+        self.url = reverse("project-detail", args=[self.project.id])
+
+        items = [
+            CanvasState.objects.create(project=self.project, component=comp, label=f"I{i}", width=50, height=50,
+                                       x=i * 10, y=5, sequence=i + 1)
+            for i, comp in enumerate([self.pump, self.valve, self.pump])
+        ]
+        Connection.objects.create(sourceItemId=items[0], sourceGripIndex=0, targetItemId=items[1],
+                                  targetGripIndex=0, waypoints=[[1, 2]])
+        Connection.objects.create(sourceItemId=items[1], sourceGripIndex=1, targetItemId=items[2],
+                                  targetGripIndex=1, waypoints=[])
+
+    def test_fast_path_matches_model_serializers(self):
+        from api.serializers import CanvasStateSerializer, ConnectionSerializer
+
+        items = CanvasState.objects.filter(project=self.project).select_related("component").order_by("sequence")
+        connections = Connection.objects.filter(sourceItemId__project=self.project)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        canvas_state = response.data["canvas_state"]
+        self.assertEqual(canvas_state["items"], CanvasStateSerializer(items, many=True).data)
+        self.assertEqual(canvas_state["connections"], ConnectionSerializer(connections, many=True).data)
+        self.assertEqual(canvas_state["sequence_counter"], 4)
+        self.assertEqual(list(canvas_state["items"][0]), list(CanvasStateSerializer(items[0]).data))
+
+    def test_component_metadata_is_fetched_once(self):
+        from api.serializers import serialize_canvas_state
+
+        with CaptureQueriesContext(connection) as ctx:
+            serialize_canvas_state(self.project)
+
+        # items, distinct components, connections
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_compact_format_lists_each_component_once(self):
+        full = self.client.get(self.url).data["canvas_state"]
+
+        response = self.client.get(self.url, {"canvas_format": "compact"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        canvas_state = response.data["canvas_state"]
+        self.assertEqual(canvas_state["format"], "compact")
+        self.assertEqual(set(canvas_state["components"]), {str(self.pump.id), str(self.valve.id)})
+        self.assertEqual(canvas_state["connections"], full["connections"])
+        # Re-joining items with the table gives back the full payload
+        for compact_item, full_item in zip(canvas_state["items"], full["items"]):
+            self.assertNotIn("grips", compact_item)
+            info = dict(canvas_state["components"][str(compact_item["component_id"])])
+            info.pop("id")
+            self.assertEqual({**compact_item, **info}, full_item)
+
+
+class ComponentCatalogueCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="libuser", password="testpass")
+        self.other = User.objects.create_user(username="otheruser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("component-list")
+        self.pump = Component.objects.create(s_no="001", name="Pump", object="Pump", grips=[])
+        self.valve = Component.objects.create(s_no="002", name="Valve", object="Valve", grips=[])
+        self.valve_id = self.valve.id
+
+    def test_default_catalogue_is_served_from_cache(self):
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c["name"] for c in response.data["components"]], ["Pump", "Valve"])
+        # Only the user's private components are queried
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_private_components_are_merged_per_user(self):
+        Component.objects.create(s_no="900", name="Mine", object="Mine", grips=[], created_by=self.user)
+        Component.objects.create(s_no="901", name="Theirs", object="Theirs", grips=[], created_by=self.other)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual([c["name"] for c in response.data["components"]], ["Pump", "Valve", "Mine"])
+
+    def test_save_and_delete_invalidate_catalogue(self):
+        self.client.get(self.url)
+
+        self.pump.name = "Centrifugal Pump"
+        self.pump.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["components"][0]["name"], "Centrifugal Pump")
+
+        self.valve.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data["components"]), 1)
+
+    def test_list_honours_etag_and_last_modified(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Component.objects.create(s_no="003", name="Tank", object="Tank", grips=[])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_version_endpoint_matches_list_etag(self):
+        version = self.client.get(reverse("component-version"))
+        listing = self.client.get(self.url)
+
+        self.assertEqual(version.status_code, status.HTTP_200_OK)
+        self.assertEqual(f'"{version.data["version"]}"', listing["ETag"])
+        self.assertEqual(version["ETag"], listing["ETag"])
+
+        self.client.force_authenticate(user=self.other)
+        self.assertNotEqual(self.client.get(reverse("component-version"))["ETag"], listing["ETag"])
+
+    def test_since_returns_changes_and_tombstones(self):
+        cursor = self.client.get(self.url, {"since": "2000-01-01T00:00:00Z"}).data["since"]
+
+        self.pump.name = "Centrifugal Pump"
+        self.pump.save()
+        self.valve.delete()
+        Component.objects.create(s_no="901", name="Theirs", object="Theirs", grips=[], created_by=self.other)
+
+        response = self.client.get(self.url, {"since": cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c["name"] for c in response.data["components"]], ["Centrifugal Pump"])
+        self.assertEqual(response.data["deleted"], [{"id": self.valve_id, "s_no": "002"}])
+
+        response = self.client.get(self.url, {"since": response.data["since"]})
+        self.assertEqual(response.data["components"], [])
+        self.assertEqual(response.data["deleted"], [])
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get(self.url, {"since": "yesterday"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(self.url, {"fields": "id,s_no"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["components"], [
+            {"id": self.pump.id, "s_no": "001"},
+            {"id": self.valve.id, "s_no": "002"},
+        ])
+        self.assertNotEqual(response["ETag"], self.client.get(self.url)["ETag"])
+
+        response = self.client.get(self.url, {"fields": "id,secret"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pagination(self):
+        Component.objects.create(s_no="003", name="Tank", object="Tank", grips=[])
+
+        response = self.client.get(self.url, {"page_size": 2, "fields": "s_no"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["components"], [{"s_no": "001"}, {"s_no": "002"}])
+        self.assertIsNone(response.data["previous"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["components"], [{"s_no": "003"}])
+        self.assertIsNone(response.data["next"])
+
+
+class GzipRequestAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="gzipuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Plant", user=self.user)
+        self.url = reverse("project-detail", args=[self.project.id])
+
+    def test_gzipped_json_body_is_accepted(self):
+        body = gzip.compress(json.dumps({"name": "Compressed"}).encode("utf-8"))
+
+        response = self.client.generic("PUT", self.url, body, content_type="application/json",
+                                       HTTP_CONTENT_ENCODING="gzip")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "Compressed")
+
+    def test_invalid_gzip_body_is_rejected(self):
+        response = self.client.generic("PUT", self.url, b"not gzip", content_type="application/json",
+                                       HTTP_CONTENT_ENCODING="gzip")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -24,6 +24,8 @@ def main():
 
 
     app = QApplication(sys.argv)
+    # Names the per-user data dir (local canvas journal)
+    app.setApplicationName("ChemicalPFD")
     QApplication.setStyle('Fusion')
     load_stylesheet(app)
 
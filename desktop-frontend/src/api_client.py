@@ -1,27 +1,88 @@
+import gzip
+import json
+import threading
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import src.app_state as app_state
 
 DEFAULT_TIMEOUT = 5  # seconds
+UPLOAD_TIMEOUT = 30  # seconds, multipart symbol uploads
+GZIP_MIN_BYTES = 16 * 1024  # JSON bodies larger than this are sent gzipped
 
 
 class ApiError(Exception):
     pass
 
 
+# ---------------------- SESSION ----------------------
+# One pooled keep-alive session for every backend call. Safe methods are
+# retried with backoff on connection errors and 502/503/504; writes are not,
+# since a retried PUT/POST could be applied twice.
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                # requests already decodes gzip responses; make the ask explicit
+                session.headers["Accept-Encoding"] = "gzip, deflate"
+                _session = session
+    return _session
+
+
+def _request(method, path, authenticated=True, headers=None, json_body=None, **kwargs):
+    """
+    Send a request to the backend through the shared session.
+    The single place the Authorization header is added; large JSON bodies
+    are gzipped.
+    """
+    url = path if path.startswith("http") else f"{app_state.BACKEND_BASE_URL}{path}"
+    headers = dict(headers or {})
+
+    if authenticated and app_state.access_token:
+        headers["Authorization"] = f"Bearer {app_state.access_token}"
+
+    if json_body is not None:
+        body = json.dumps(json_body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+        if len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        kwargs["data"] = body
+
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().request(method, url, headers=headers, **kwargs)
+
+
 def login(username: str, password: str):
     """
     Call Django /api/auth/login/ (JWT) and return access, refresh.
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/auth/login/"
-
     try:
-        resp = requests.post(
-            url,
-            json={
+        resp = _request(
+            "POST",
+            "/api/auth/login/",
+            authenticated=False,
+            json_body={
                 "username": username,
                 "password": password,
             },
-            timeout=DEFAULT_TIMEOUT,
         )
     except requests.RequestException as e:
         raise ApiError(f"Could not reach server: {e}")
@@ -47,17 +108,16 @@ def register(username: str, email: str, password: str):
     """
     Call Django /api/auth/register/ and return JSON if needed.
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/auth/register/"
-
     try:
-        resp = requests.post(
-            url,
-            json={
+        resp = _request(
+            "POST",
+            "/api/auth/register/",
+            authenticated=False,
+            json_body={
                 "username": username,
                 "email": email,
                 "password": password,
             },
-            timeout=DEFAULT_TIMEOUT,
         )
     except requests.RequestException as e:
         raise ApiError(f"Could not reach server: {e}")
@@ -82,21 +142,36 @@ def register(username: str, email: str, password: str):
     raise ApiError(msg)
 
 
-def get_components():
-    url = f"{app_state.BACKEND_BASE_URL}/api/components/"
+# fields -> (ETag, components) of the last /api/components/ download
+_components_cache = {}
+
+
+def get_components(fields=None):
+    """
+    Fetch the component catalogue.
+    `fields` (e.g. ("id", "s_no")) asks for a sparse fieldset instead of full records.
+    Revalidates the last download with If-None-Match; a 304 reuses it without a body.
+    """
+    cache_key = tuple(fields or ())
+    cached = _components_cache.get(cache_key)
     try:
         headers = {}
-        if app_state.access_token:
-            headers["Authorization"] = f"Bearer {app_state.access_token}"
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        params = {"fields": ",".join(fields)} if fields else None
         
-        resp = requests.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        resp = _request("GET", "/api/components/", headers=headers, params=params)
+        if resp.status_code == 304 and cached:
+            return cached[1]
         if resp.status_code == 200:
             data = resp.json()
 
             if isinstance(data, dict) and "components" in data:
-                return data["components"]
+                data = data["components"]
 
             if isinstance(data, list):
+                if resp.headers.get("ETag"):
+                    _components_cache[cache_key] = (resp.headers["ETag"], data)
                 return data
 
             print("[API WARNING] Unexpected component format:", data)
@@ -107,14 +182,47 @@ def get_components():
     return []
 
 
+def get_component_changes(since):
+    """
+    Components changed at or after `since` (ISO timestamp) plus tombstones of
+    deleted ones: {"components": [...], "deleted": [{"id", "s_no"}], "since": cursor}.
+    GET /api/components/?since=<timestamp>
+    """
+    try:
+        resp = _request("GET", "/api/components/", params={"since": since})
+        if resp.status_code == 200:
+            data = resp.json()
+            if isinstance(data, dict) and "components" in data:
+                return data
+            print("[API WARNING] Unexpected component format:", data)
+        else:
+            print(f"[API ERROR] Failed to fetch component changes: {resp.status_code}")
+    except Exception as e:
+        print(f"[API ERROR] Failed to fetch component changes: {e}")
+    return None
+
+
+def get_components_version():
+    """
+    Current catalogue version for this user, or None if it can't be fetched.
+    GET /api/components/version/
+    """
+    try:
+        resp = _request("GET", "/api/components/version/")
+        if resp.status_code == 200:
+            return resp.json().get("version")
+        print(f"[API ERROR] Failed to fetch component version: {resp.status_code}")
+    except Exception as e:
+        print(f"[API ERROR] Failed to fetch component version: {e}")
+    return None
+
+
 def post_component(data, files):
     """
     Upload a new component (symbol) to backend.
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/components/"
-
     try:
-        response = requests.post(url, data=data, files=files)
+        response = _request("POST", "/api/components/", data=data, files=files, timeout=UPLOAD_TIMEOUT)
         return response
     except Exception as e:
         print("[API ERROR] POST failed:", e)
@@ -126,14 +234,8 @@ def get_projects():
     Fetch list of all projects
     GET /api/project/
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/project/"
-    headers = {}
-    
-    if app_state.access_token:
-        headers["Authorization"] = f"Bearer {app_state.access_token}"
-    
     try:
-        resp = requests.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        resp = _request("GET", "/api/project/")
         
         if resp.status_code == 200:
             data = resp.json()
@@ -150,22 +252,32 @@ def get_projects():
     return []
 
 
+# project id -> (ETag, project JSON) of the last copy we received
+_project_cache = {}
+
+
 def get_project(project_id):
     """
     Fetch a single project by ID
     GET /api/project/<id>/
+    Revalidates a cached copy with If-None-Match; a 304 reuses it without a body.
+    Asks for the compact canvas format (component info listed once per component).
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/project/{project_id}/"
     headers = {}
-    
-    if app_state.access_token:
-        headers["Authorization"] = f"Bearer {app_state.access_token}"
+    cached = _project_cache.get(project_id)
+    if cached:
+        headers["If-None-Match"] = cached[0]
     
     try:
-        resp = requests.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        resp = _request("GET", f"/api/project/{project_id}/", headers=headers, params={"canvas_format": "compact"})
         
-        if resp.status_code == 200:
-            return resp.json()
+        if resp.status_code == 304 and cached:
+            return cached[1]
+        elif resp.status_code == 200:
+            data = resp.json()
+            if resp.headers.get("ETag"):
+                _project_cache[project_id] = (resp.headers["ETag"], data)
+            return data
         else:
             print(f"[API ERROR] Failed to fetch project: {resp.status_code}")
             
@@ -181,12 +293,6 @@ def create_project(name, description="", canvas_state=None):
     POST /api/project/
     Returns the created project data including ID
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/project/"
-    headers = {}
-    
-    if app_state.access_token:
-        headers["Authorization"] = f"Bearer {app_state.access_token}"
-    
     payload = {
         "name": name,
         "description": description
@@ -196,7 +302,7 @@ def create_project(name, description="", canvas_state=None):
         payload["canvas_state"] = canvas_state
     
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=DEFAULT_TIMEOUT)
+        resp = _request("POST", "/api/project/", json_body=payload)
         
         if resp.status_code in (200, 201):
             data = resp.json()
@@ -212,16 +318,16 @@ def create_project(name, description="", canvas_state=None):
     return None
 
 
-def update_project(project_id, name=None, description=None, canvas_state=None):
+def update_project(project_id, name=None, description=None, canvas_state=None, revision=None):
     """
     Update an existing project on the backend
     PUT /api/project/<id>/
+    When `revision` is given the write is conditional (If-Match); if the
+    project moved on, the 412 response JSON (status "error") is returned.
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/project/{project_id}/"
     headers = {}
-    
-    if app_state.access_token:
-        headers["Authorization"] = f"Bearer {app_state.access_token}"
+    if revision is not None:
+        headers["If-Match"] = f'"{revision}"'
     
     # Build payload with only provided fields
     payload = {}
@@ -233,9 +339,15 @@ def update_project(project_id, name=None, description=None, canvas_state=None):
         payload["canvas_state"] = canvas_state
     
     try:
-        resp = requests.put(url, headers=headers, json=payload, timeout=DEFAULT_TIMEOUT)
+        resp = _request("PUT", f"/api/project/{project_id}/", headers=headers, json_body=payload)
         
         if resp.status_code == 200:
+            data = resp.json()
+            if resp.headers.get("ETag"):
+                _project_cache[project_id] = (resp.headers["ETag"], data)
+            return data
+        elif resp.status_code == 412:
+            print(f"[API ERROR] Project {project_id} was changed by another save")
             return resp.json()
         else:
             print(f"[API ERROR] Failed to update project: {resp.status_code}")
@@ -247,19 +359,40 @@ def update_project(project_id, name=None, description=None, canvas_state=None):
     return None
 
 
+def post_canvas_ops(project_id, base_revision, ops):
+    """
+    Send a batch of canvas edits
+    POST /api/project/<id>/canvas/ops/
+    Returns the response JSON on success or revision conflict (status "error"),
+    None on any other failure.
+    """
+    payload = {
+        "base_revision": base_revision,
+        "ops": ops
+    }
+    
+    try:
+        resp = _request("POST", f"/api/project/{project_id}/canvas/ops/", json_body=payload)
+        
+        if resp.status_code in (200, 409):
+            return resp.json()
+        else:
+            print(f"[API ERROR] Failed to apply canvas ops: {resp.status_code}")
+            print(f"[API ERROR] Response: {resp.text}")
+            
+    except Exception as e:
+        print(f"[API ERROR] Failed to apply canvas ops: {e}")
+    
+    return None
+
+
 def delete_project(project_id):
     """
     Delete a project
     DELETE /api/project/<id>/
     """
-    url = f"{app_state.BACKEND_BASE_URL}/api/project/{project_id}/"
-    headers = {}
-    
-    if app_state.access_token:
-        headers["Authorization"] = f"Bearer {app_state.access_token}"
-    
     try:
-        resp = requests.delete(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        resp = _request("DELETE", f"/api/project/{project_id}/")
         
         if resp.status_code == 200:
             return resp.json()
@@ -269,4 +402,4 @@ def delete_project(project_id):
     except Exception as e:
         print(f"[API ERROR] Failed to delete project: {e}")
     
-    return None
\ No newline at end of file
+    return None
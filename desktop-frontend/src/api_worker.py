@@ -0,0 +1,129 @@
+"""
+Background execution for blocking api_client calls.
+
+run_async() runs a function on a shared thread pool and hands its result back
+on the UI thread through Qt signals, so the window keeps repainting and
+accepting input while a request is in flight.
+"""
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QCoreApplication, QEventLoop, pyqtSignal, Qt
+from PyQt5.QtWidgets import QProgressDialog
+
+# A few requests at a time is plenty: saves, loads and the project list
+_pool = QThreadPool()
+_pool.setMaxThreadCount(4)
+
+# Tasks in flight; keeps their signal objects alive until they finish
+_running = set()
+
+
+class _TaskSignals(QObject):
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+class ApiTask(QRunnable):
+    """
+    One background call. Create it on the UI thread; its signals are then
+    delivered there. cancel() drops the result: the request itself is left to
+    finish (or time out) but no callback runs for it.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = _TaskSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            if not self.cancelled:
+                self.signals.failed.emit(str(e))
+        else:
+            if not self.cancelled:
+                self.signals.succeeded.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+def _guarded(task, callback):
+    """Run a callback on the UI thread unless the task was cancelled meanwhile."""
+    def deliver(*args):
+        if task.cancelled:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            # The widget may have been closed while the request was running
+            traceback.print_exc()
+    return deliver
+
+
+def run_async(fn, *args, on_success=None, on_error=None, on_finished=None, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the API worker pool.
+    on_success(result) / on_error(message) run on the UI thread; on_finished()
+    runs in both cases, even after cancel(). Returns the ApiTask.
+    """
+    task = ApiTask(fn, *args, **kwargs)
+    if on_success:
+        task.signals.succeeded.connect(_guarded(task, on_success))
+    if on_error:
+        task.signals.failed.connect(_guarded(task, on_error))
+    if on_finished:
+        task.signals.finished.connect(on_finished)
+    task.signals.finished.connect(lambda: _running.discard(task))
+
+    _running.add(task)
+    _pool.start(task)
+    return task
+
+
+def busy_dialog(parent, text, task):
+    """
+    Non-modal progress dialog for a task: busy indicator plus a Cancel button
+    that cancels it. Closes itself when the task finishes.
+    """
+    dialog = QProgressDialog(text, "Cancel", 0, 0, parent)
+    dialog.setWindowTitle("Please wait")
+    dialog.setWindowModality(Qt.NonModal)
+    dialog.setMinimumDuration(0)
+    dialog.setAutoClose(False)
+    dialog.setAutoReset(False)
+    dialog.canceled.connect(task.cancel)
+    task.signals.finished.connect(dialog.close)
+    task.signals.finished.connect(dialog.deleteLater)
+    dialog.show()
+    return dialog
+
+
+def wait_for_all(timeout_ms=-1):
+    """Block until the pool is idle (used on shutdown and in tests)."""
+    return _pool.waitForDone(timeout_ms)
+
+
+def wait_while(predicate, timeout_ms=10000):
+    """
+    Keep the event loop turning until predicate() is false, so results of
+    background calls get applied (e.g. let an in-flight save land before a
+    canvas closes). Returns False on timeout.
+    """
+    deadline = time.monotonic() + timeout_ms / 1000
+    while predicate():
+        if time.monotonic() > deadline:
+            return False
+        QCoreApplication.processEvents(QEventLoop.AllEvents, 50)
+        time.sleep(0.01)
+    return True
+
@@ -0,0 +1,87 @@
+"""
+Write-behind autosave for backend projects.
+
+Every undo stack change restarts a short debounce timer, so a burst of edits
+(a drag, a multi-delete, typing a label) turns into a single save. Saves go
+through CanvasWidget.save_file, i.e. the non-blocking ops save, and at most
+one is in flight per canvas: changes made meanwhile are picked up by the next
+save once the current one lands.
+"""
+import time
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer
+
+# Quiet period after the last edit before saving
+AUTOSAVE_DELAY_MS = 2000
+# Continuous editing still saves at least this often
+AUTOSAVE_MAX_DELAY_S = 30
+# Back-off after a failed save (server down, network error)
+AUTOSAVE_RETRY_MS = 15000
+
+
+class AutoSaver(QObject):
+    """Debounced background saver attached to one CanvasWidget."""
+
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.enabled = True
+        self._first_change = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+        canvas.undo_stack.indexChanged.connect(self.schedule)
+
+    def schedule(self, *_):
+        """Note a change; (re)start the debounce timer."""
+        # The undo stack still signals while the canvas is being torn down
+        if sip.isdeleted(self.canvas):
+            return
+        if not self.enabled or not self.canvas.project_id:
+            return
+        if getattr(self.canvas, "_is_loading", False):
+            return
+
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        if now - self._first_change >= AUTOSAVE_MAX_DELAY_S:
+            self._timer.start(0)
+        else:
+            self._timer.start(AUTOSAVE_DELAY_MS)
+
+    def cancel(self):
+        self._timer.stop()
+        self._first_change = None
+
+    def flush(self):
+        """Save now if there is anything to save and no save is running."""
+        canvas = self.canvas
+        if not self.enabled or not canvas.project_id:
+            return
+        if canvas.save_in_flight:
+            # The in-flight save re-checks for leftovers when it lands
+            return
+        if canvas.undo_stack.isClean():
+            self._first_change = None
+            return
+
+        self._first_change = None
+        print(f"[AUTOSAVE] Saving project {canvas.project_id}")
+        canvas.save_file(on_done=self._saved)
+
+    def _saved(self, result):
+        canvas = self.canvas
+        if result:
+            # Edits made during the save are still unsaved
+            if not canvas.undo_stack.isClean():
+                self.schedule()
+        elif canvas.save_conflict:
+            # Retrying would only conflict again; the user has to reload
+            print(f"[AUTOSAVE] Paused for project {canvas.project_id}: revision conflict")
+            self.enabled = False
+        else:
+            self._timer.start(AUTOSAVE_RETRY_MS)
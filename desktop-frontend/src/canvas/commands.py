@@ -25,13 +25,17 @@ class AddCommand(QUndoCommand):
     def redo(self):
         if self.component not in self.canvas.components:
             self.canvas.components.append(self.component)
+            self.canvas.component_index.insert(self.component)
             self.component.show()
+            self.canvas.mark_dirty(self.component)
             self.canvas.update()
 
     def undo(self):
         if self.component in self.canvas.components:
             self.canvas.components.remove(self.component)
+            self.canvas.component_index.remove(self.component)
             self.component.hide()
+            self.canvas.mark_dirty(self.component)
             self.canvas.update()
 
 class AddConnectionCommand(QUndoCommand):
@@ -44,11 +48,15 @@ class AddConnectionCommand(QUndoCommand):
     def redo(self):
         if self.connection not in self.canvas.connections:
             self.canvas.connections.append(self.connection)
+            self.canvas.link_connection(self.connection)
+            self.canvas.mark_dirty(self.connection)
             self.canvas.update()
 
     def undo(self):
         if self.connection in self.canvas.connections:
             self.canvas.connections.remove(self.connection)
+            self.canvas.unlink_connection(self.connection)
+            self.canvas.mark_dirty(self.connection)
             self.canvas.update()
 
 class DeleteCommand(QUndoCommand):
@@ -60,23 +68,37 @@ class DeleteCommand(QUndoCommand):
         self.setText(f"Delete {len(components)} items")
 
     def redo(self):
+        # One pass over each canvas list, however many items go
+        doomed = set(self.connections)
+        kept = [conn for conn in self.canvas.connections if conn not in doomed]
+        if len(kept) != len(self.canvas.connections):
+            self.canvas.connections[:] = kept
         for conn in self.connections:
-            if conn in self.canvas.connections:
-                self.canvas.connections.remove(conn)
-        for comp in self.components:
-            if comp in self.canvas.components:
-                self.canvas.components.remove(comp)
+            self.canvas.unlink_connection(conn)
+
+        doomed = set(self.components)
+        present = [comp for comp in self.canvas.components if comp in doomed]
+        if present:
+            self.canvas.components[:] = [comp for comp in self.canvas.components if comp not in doomed]
+            for comp in present:
+                self.canvas.component_index.remove(comp)
                 comp.hide()
+        self.canvas.mark_dirty(*self.components, *self.connections)
         self.canvas.update()
 
     def undo(self):
+        present = set(self.canvas.components)
         for comp in self.components:
-            if comp not in self.canvas.components:
+            if comp not in present:
                 self.canvas.components.append(comp)
+                self.canvas.component_index.insert(comp)
                 comp.show()
+        present = set(self.canvas.connections)
         for conn in self.connections:
-            if conn not in self.canvas.connections:
+            if conn not in present:
                 self.canvas.connections.append(conn)
+                self.canvas.link_connection(conn)
+        self.canvas.mark_dirty(*self.components, *self.connections)
         self.canvas.update()
 
 class MoveCommand(QUndoCommand):
@@ -92,6 +114,8 @@ class MoveCommand(QUndoCommand):
         canvas = self.component.parent()
         z = canvas.zoom_level if hasattr(canvas, "zoom_level") else 1.0
         self.component.update_visuals(z)
+        if hasattr(canvas, "mark_dirty"):
+            canvas.mark_dirty(self.component)
         canvas.update()
 
     def undo(self):
@@ -99,6 +123,8 @@ class MoveCommand(QUndoCommand):
         canvas = self.component.parent()
         z = canvas.zoom_level if hasattr(canvas, "zoom_level") else 1.0
         self.component.update_visuals(z)
+        if hasattr(canvas, "mark_dirty"):
+            canvas.mark_dirty(self.component)
         canvas.update()
 
 
@@ -121,6 +147,15 @@ def open_project(canvas, filename):
 
 def handle_close_event(canvas, event):
     """Handles window close event with unsaved changes check."""
+    # Push out a pending autosave and let it land, so the prompt reflects
+    # what's actually stored
+    if hasattr(canvas, "autosaver"):
+        canvas.autosaver.flush()
+        canvas.autosaver.cancel()
+    if getattr(canvas, "save_in_flight", False):
+        from src.api_worker import wait_while
+        wait_while(lambda: canvas.save_in_flight)
+
     if canvas.is_modified:
         reply = QMessageBox.question(
             canvas, 'Save Changes?',
@@ -166,6 +201,8 @@ def handle_close_event(canvas, event):
                     event.ignore()
                     
         elif reply == QMessageBox.Discard:
+            if hasattr(canvas, "journal"):
+                canvas.journal.discard()
             # Delete if it was a new unsaved project ---
             if hasattr(canvas, 'is_new_project') and canvas.is_new_project and canvas.project_id:
                 print(f"[CLOSE] Discarding new project {canvas.project_id}. Deleting from backend...")
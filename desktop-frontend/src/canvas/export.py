@@ -10,10 +10,11 @@ from PyQt5.QtWidgets import QWidget, QLabel
 from PyQt5.QtPrintSupport import QPrinter
 from src.canvas import painter as canvas_painter
 from src.canvas import resources
+from src.canvas.spatial import ComponentIndex
 from src.component_widget import ComponentWidget
 from src.connection import Connection
 import src.app_state as app_state
-from src.api_client import update_project, get_components
+from src.api_client import update_project, get_components, post_canvas_ops
 
 # ---------------------- CANVAS STATE SERIALIZATION ----------------------
 # ✅ Module-level cache
@@ -31,13 +32,19 @@ def get_component_id_map():
     if _component_cache and _cache_timestamp and (now - _cache_timestamp < 300):
         return _component_cache
     
-    backend_components = get_components()
+    # Only the two columns we need, not the full records
+    backend_components = get_components(fields=("id", "s_no"))
     _component_cache = {str(c.get('s_no', '')): c.get('id') 
                         for c in backend_components if c.get('s_no')}
     _cache_timestamp = now
     
     return _component_cache
 
+def _item_client_id(comp, index):
+    """Id sent for a component: its stored row id, else a negative placeholder."""
+    backend_id = getattr(comp, "backend_id", None)
+    return backend_id if backend_id else -(index + 1)
+
 def serialize_canvas_state(canvas):
     """
     Convert canvas components and connections to backend-compatible format.
@@ -64,12 +71,12 @@ def serialize_canvas_state(canvas):
                 missing_snos.add(s_no)
             continue
         
-        # KEY CHANGE: Start ID from 1 instead of 0
+        # Stable id: the stored row id, or a negative placeholder for new items.
         # The backend rejects '0' because it evaluates to False/Empty.
-        safe_id = i + 1
+        safe_id = _item_client_id(comp, i)
         
         item = {
-            "id": safe_id,    # Sends 1, 2, 3... (Backend accepts this)
+            "id": safe_id,
             "component_id": component_backend_id,
             "component": {
                 "id": component_backend_id
@@ -82,20 +89,19 @@ def serialize_canvas_state(canvas):
             "rotation": float(c_dict["rotation"]),
             "scaleX": 1.0,
             "scaleY": 1.0,
-            "sequence": safe_id # Keep sequence matching ID for clarity
+            "sequence": i + 1
         }
         items.append(item)
-        comp_map[comp] = safe_id  # Store the 1-based ID for connection mapping
+        comp_map[comp] = safe_id  # Store the item ID for connection mapping
     
     connections = []
     for i, conn in enumerate(canvas.connections):
-        # Resolve component using the safe_id (1-based)
-        start_id = comp_map.get(conn.start_component, -1)
-        end_id = comp_map.get(conn.end_component, -1)
-        
         # Skip connections if the components attached were skipped
-        if start_id == -1 or end_id == -1:
+        # (placeholder ids are negative, so -1 is a real item here)
+        if conn.start_component not in comp_map or conn.end_component not in comp_map:
             continue
+        start_id = comp_map[conn.start_component]
+        end_id = comp_map[conn.end_component]
         
         connection_data = {
             "id": i + 1, # Good practice to make connection IDs 1-based too
@@ -116,35 +122,278 @@ def serialize_canvas_state(canvas):
         "sequence_counter": len(items)
     }
 
+def _connection_client_id(conn, index):
+    """Id sent for a connection: its stored row id, else a negative placeholder."""
+    backend_id = getattr(conn, "backend_id", None)
+    return backend_id if backend_id else -(index + 1)
+
+def _apply_connection_ids(canvas, connections_data):
+    """Match saved connections back to canvas connections by their endpoints."""
+    by_endpoints = {}
+    for d in connections_data or []:
+        key = (d.get("sourceItemId"), d.get("sourceGripIndex"), d.get("targetItemId"), d.get("targetGripIndex"))
+        by_endpoints.setdefault(key, []).append(d.get("id"))
+
+    for conn in canvas.connections:
+        end = conn.end_component
+        key = (
+            getattr(conn.start_component, "backend_id", None), conn.start_grip_index,
+            getattr(end, "backend_id", None), conn.end_grip_index,
+        )
+        ids = by_endpoints.get(key)
+        conn.backend_id = ids.pop() if ids else None
+
+def _build_canvas_ops(canvas):
+    """
+    Turn the objects touched by undo-stack commands since the last save into
+    a compact op list for the canvas ops endpoint.
+    Returns (ops, added, removed): added maps placeholder ids to the objects
+    they stand for, removed lists objects whose rows get deleted.
+    """
+    dirty = set(canvas.dirty_objects)
+    # Moving or removing a component drags its pipes along
+    for conn in canvas.connections:
+        if conn.start_component in dirty or conn.end_component in dirty:
+            dirty.add(conn)
+
+    comp_index = {c: i for i, c in enumerate(canvas.components)}
+    conn_index = {c: i for i, c in enumerate(canvas.connections)}
+    sno_to_id = get_component_id_map() if dirty else {}
+
+    delete_conns, delete_items, add_items, move_items, add_conns, waypoints = [], [], [], [], [], []
+    added = {"items": {}, "connections": {}}
+    removed = []
+
+    for obj in dirty:
+        present = obj in comp_index or obj in conn_index
+        if not present:
+            if getattr(obj, "backend_id", None):
+                op = "delete_item" if isinstance(obj, ComponentWidget) else "delete_connection"
+                (delete_items if op == "delete_item" else delete_conns).append({"op": op, "id": obj.backend_id})
+                removed.append(obj)
+
+    for i, comp in enumerate(canvas.components):
+        if comp not in dirty:
+            continue
+        c_dict = comp.to_dict()
+        geometry = {
+            "label": comp.config.get("default_label", ""),
+            "x": float(c_dict["x"]),
+            "y": float(c_dict["y"]),
+            "width": float(c_dict["width"]),
+            "height": float(c_dict["height"]),
+            "rotation": float(c_dict["rotation"]),
+        }
+        if comp.backend_id:
+            move_items.append({"op": "move_item", "id": comp.backend_id, **geometry})
+            continue
+
+        component_backend_id = sno_to_id.get(str(comp.config.get("s_no", "")))
+        if not component_backend_id:
+            print(f"[EXPORT ERROR] Component '{comp.config.get('name')}' not found in DB. Skipping.")
+            continue
+        temp_id = _item_client_id(comp, i)
+        added["items"][temp_id] = comp
+        add_items.append({
+            "op": "add_item",
+            "id": temp_id,
+            "component_id": component_backend_id,
+            "scaleX": 1.0,
+            "scaleY": 1.0,
+            "sequence": i + 1,
+            **geometry,
+        })
+
+    for i, conn in enumerate(canvas.connections):
+        if conn not in dirty:
+            continue
+        points = [{"x": float(p.x()), "y": float(p.y())} for p in conn.path]
+        if conn.backend_id:
+            waypoints.append({"op": "update_waypoints", "id": conn.backend_id, "waypoints": points})
+            continue
+
+        start_comp, end_comp = conn.start_component, conn.end_component
+        if start_comp not in comp_index or end_comp not in comp_index:
+            continue
+        start = _item_client_id(start_comp, comp_index[start_comp])
+        end = _item_client_id(end_comp, comp_index[end_comp])
+        # Endpoints must be stored rows or items added in this same batch
+        if (start < 0 and start not in added["items"]) or (end < 0 and end not in added["items"]):
+            continue
+        temp_id = _connection_client_id(conn, i)
+        added["connections"][temp_id] = conn
+        add_conns.append({
+            "op": "add_connection",
+            "id": temp_id,
+            "sourceItemId": start,
+            "sourceGripIndex": conn.start_grip_index,
+            "targetItemId": end,
+            "targetGripIndex": conn.end_grip_index,
+            "waypoints": points,
+        })
+
+    ops = delete_conns + delete_items + add_items + move_items + add_conns + waypoints
+    return ops, added, removed
+
+def prepare_canvas_save(canvas, full=False):
+    """
+    Snapshot everything a save needs from the canvas (UI thread).
+
+    Uses the ops endpoint when the canvas revision is known (and `full` is not
+    forced), otherwise the whole serialized canvas. The dirty set moves into
+    the plan, so edits made while the save is in flight stay dirty for the next
+    one; finish_canvas_save() puts it back if the save fails.
+    """
+    plan = {
+        "project_id": canvas.project_id,
+        "project_name": canvas.project_name,
+        "revision": getattr(canvas, "project_revision", None),
+        "undo_index": canvas.undo_stack.index(),
+        "dirty": set(canvas.dirty_objects),
+        "ops": None,
+        "canvas_state": None,
+    }
+
+    if plan["revision"] is not None and not full:
+        plan["ops"], plan["added"], plan["removed"] = _build_canvas_ops(canvas)
+    else:
+        plan["canvas_state"] = serialize_canvas_state(canvas)
+        # Placeholder ids sent for items, to adopt the ids the backend assigns
+        plan["item_ids"] = {_item_client_id(comp, i): comp for i, comp in enumerate(canvas.components)}
+
+    canvas.dirty_objects.clear()
+    return plan
+
+def send_canvas_save(plan):
+    """Network half of a save. Touches no widgets, so it can run off the UI thread."""
+    if plan["ops"] is not None:
+        if not plan["ops"]:
+            return {"status": "success", "revision": plan["revision"]}
+        print(f"[EXPORT] Sending {len(plan['ops'])} canvas ops on revision {plan['revision']}")
+        return post_canvas_ops(plan["project_id"], plan["revision"], plan["ops"])
+
+    canvas_state = plan["canvas_state"]
+    print(f"[EXPORT] Saving {len(canvas_state['items'])} items and {len(canvas_state['connections'])} connections")
+
+    return update_project(
+        project_id=plan["project_id"],
+        name=plan["project_name"],
+        canvas_state=canvas_state,
+        revision=plan["revision"]
+    )
+
+def finish_canvas_save(canvas, plan, result):
+    """
+    Apply the backend's answer to a save (UI thread).
+    Returns the response dict on success and None otherwise; a save rejected
+    because the backend holds a newer revision sets canvas.save_conflict.
+    """
+    if not result or result.get("status") != "success":
+        # Not saved: the snapshot's edits are still pending
+        canvas.dirty_objects |= plan["dirty"]
+        if result:
+            print(f"[EXPORT] Revision conflict (server at {result.get('revision')})")
+            canvas.save_conflict = True
+        else:
+            print(f"[EXPORT ERROR] Failed to save canvas state")
+        return None
+
+    if plan["ops"] is not None:
+        id_map = result.get("id_map", {})
+        for temp_id, comp in plan["added"]["items"].items():
+            comp.backend_id = id_map.get("items", {}).get(str(temp_id), comp.backend_id)
+        for temp_id, conn in plan["added"]["connections"].items():
+            conn.backend_id = id_map.get("connections", {}).get(str(temp_id), conn.backend_id)
+        for obj in plan["removed"]:
+            obj.backend_id = None
+        # Rows cascade-deleted with their items
+        for obj in plan["dirty"]:
+            if isinstance(obj, Connection) and obj not in canvas.connections:
+                obj.backend_id = None
+        print(f"[EXPORT] Canvas changes saved to project {plan['project_id']}")
+    else:
+        id_map = result.get("id_map") or {}
+        for client_id, comp in plan["item_ids"].items():
+            comp.backend_id = id_map.get(str(client_id), comp.backend_id)
+        _apply_connection_ids(canvas, (result.get("canvas_state") or {}).get("connections"))
+        print(f"[EXPORT] Canvas saved successfully to project {plan['project_id']}")
+
+    canvas.project_revision = result.get("revision")
+    return result
+
+def _needs_full_save(canvas, plan, result):
+    # Ops request failed outright (not a conflict): retry as a full save
+    return result is None and plan["ops"] is not None and not canvas.save_conflict
+
 def save_canvas_state(canvas):
     """
-    Save canvas state to backend via UPDATE API.
-    This is called every time the canvas is modified.
+    Save canvas state to backend.
+    Sends only the edits since the last save when the canvas revision is known,
+    otherwise PUTs the whole canvas via UPDATE API. Saves based on a stale
+    revision are rejected by the backend; canvas.save_conflict is then set.
+    Blocks until done; see save_canvas_state_async for the UI.
     """
     if not canvas.project_id:
         print("[EXPORT ERROR] No project ID. Cannot save.")
         return None
-    
-    canvas_state = serialize_canvas_state(canvas)
-    
-    # Debug output
-    print(f"[EXPORT] Saving {len(canvas_state['items'])} items and {len(canvas_state['connections'])} connections")
-    if canvas_state['items']:
-        print(f"[EXPORT] First item: {canvas_state['items'][0]}")
-    
-    result = update_project(
-        project_id=canvas.project_id,
-        name=canvas.project_name,
-        canvas_state=canvas_state
-    )
-    
+
+    canvas.save_conflict = False
+    plan = prepare_canvas_save(canvas)
+    result = finish_canvas_save(canvas, plan, send_canvas_save(plan))
+
+    if _needs_full_save(canvas, plan, result):
+        print("[EXPORT] Falling back to full canvas save")
+        plan = prepare_canvas_save(canvas, full=True)
+        result = finish_canvas_save(canvas, plan, send_canvas_save(plan))
+
     if result:
-        print(f"[EXPORT] Canvas saved successfully to project {canvas.project_id}")
-    else:
-        print(f"[EXPORT ERROR] Failed to save canvas state")
-    
+        canvas.mark_saved(plan["undo_index"])
     return result
 
+def save_canvas_state_async(canvas, on_done=None, full=False):
+    """
+    Non-blocking save_canvas_state: the canvas is snapshotted on the UI thread,
+    the request runs on the API worker pool and the result is applied back on
+    the UI thread, so the canvas stays editable meanwhile. on_done(result)
+    receives what save_canvas_state would have returned. Returns the ApiTask.
+    """
+    from src.api_worker import run_async
+
+    def done(result):
+        canvas.save_in_flight = False
+        if on_done:
+            on_done(result)
+
+    if not canvas.project_id:
+        print("[EXPORT ERROR] No project ID. Cannot save.")
+        done(None)
+        return None
+
+    canvas.save_in_flight = True
+    canvas.save_conflict = False
+
+    def with_id_map(_sno_to_id):
+        # s_no -> id map is cached now; the snapshot doesn't touch the network
+        plan = prepare_canvas_save(canvas, full=full)
+
+        def finished(response):
+            result = finish_canvas_save(canvas, plan, response)
+            if _needs_full_save(canvas, plan, result):
+                print("[EXPORT] Falling back to full canvas save")
+                save_canvas_state_async(canvas, on_done, full=True)
+                return
+            if result:
+                canvas.mark_saved(plan["undo_index"])
+            done(result)
+
+        def failed(message):
+            finish_canvas_save(canvas, plan, None)
+            done(None)
+
+        return run_async(send_canvas_save, plan, on_success=finished, on_error=failed)
+
+    return run_async(get_component_id_map, on_success=with_id_map, on_error=lambda message: done(None))
+
 def load_canvas_from_project(canvas, project_data):
     """
     Load canvas from backend project data.
@@ -154,18 +403,24 @@ def load_canvas_from_project(canvas, project_data):
         # Block auto-save during load
         canvas._is_loading = True
         canvas_state = project_data.get("canvas_state")
+        canvas.project_revision = project_data.get("revision")
+        canvas.dirty_objects.clear()
         if not canvas_state:
             print("[LOAD] No canvas_state in project data")
             return True # Empty project is valid
         
         items_data = canvas_state.get("items", [])
         conns_data = canvas_state.get("connections", [])
+        # Compact format: component info lives in a table keyed by component id
+        components_table = canvas_state.get("components") or {}
         
         print(f"[LOAD] Loading {len(items_data)} items and {len(conns_data)} connections")
 
         # Clear existing canvas
         canvas.components = []
         canvas.connections = []
+        canvas.adjacency = {}
+        canvas.component_index = ComponentIndex()
         for c in canvas.children():
             if isinstance(c, (ComponentWidget, QLabel)):
                 c.deleteLater()
@@ -174,8 +429,8 @@ def load_canvas_from_project(canvas, project_data):
         id_map = {}
         
         for d in items_data:
-            # Get component data from nested structure
-            component_data = d.get("component", {})
+            # Get component data from nested structure or the compact table
+            component_data = d.get("component") or components_table.get(str(d.get("component_id")), {})
             
             # Try to find SVG path
             s_no = d.get("s_no") or component_data.get("s_no", "")
@@ -220,12 +475,14 @@ def load_canvas_from_project(canvas, project_data):
             
             comp.logical_rect = QRectF(x, y, w, h)
             comp.rotation_angle = float(d.get("rotation", 0))
+            comp.backend_id = d.get("id")
             
             # Apply visuals
             comp.update_visuals(canvas.zoom_level)
             comp.show()
             
             canvas.components.append(comp)
+            canvas.component_index.insert(comp)
             id_map[d.get("id")] = comp
         
         # Load Connections
@@ -241,11 +498,13 @@ def load_canvas_from_project(canvas, project_data):
                 eg = d.get("targetGripIndex", 0)
                 
                 conn = Connection(start_comp, sg, "right")
+                conn.backend_id = d.get("id")
                 if end_comp:
                     conn.set_end_grip(end_comp, eg, "left")
                 
                 conn.update_path(canvas.components, canvas.connections)
                 canvas.connections.append(conn)
+                canvas.link_connection(conn)
         
         canvas.update()
         return True
@@ -264,8 +523,16 @@ def load_canvas_from_project(canvas, project_data):
 def get_content_rect(canvas, padding=50):
     """Calculates the bounding rectangle of all canvas content."""
     content_rect = QRectF()
+    scene = getattr(canvas, "scene_mode", False)
+    z = getattr(canvas, "zoom_level", 1.0)
     for comp in canvas.components:
-        content_rect = content_rect.united(QRectF(comp.geometry()))
+        if scene:
+            # Widget geometry isn't maintained in scene mode
+            r = comp.logical_rect
+            geometry = QRectF(int(r.x() * z), int(r.y() * z), int(r.width() * z), int(r.height() * z))
+        else:
+            geometry = QRectF(comp.geometry())
+        content_rect = content_rect.united(geometry)
         
     for conn in canvas.connections:
         if not conn.path: continue
@@ -278,8 +545,14 @@ def get_content_rect(canvas, padding=50):
     content_rect.adjust(-padding, -padding, padding, padding)
     return content_rect
 
-def render_to_image(canvas, rect, scale=1.0):
-    """Renders the specified canvas area to a QImage."""
+def render_to_image(canvas, rect, scale=1.0, scene=None):
+    """
+    Renders the specified canvas area to a QImage. With scene=True components
+    are drawn directly instead of through their widgets (default: the
+    canvas' own mode).
+    """
+    if scene is None:
+        scene = getattr(canvas, "scene_mode", False)
     img_size = rect.size().toSize() * scale
     image = QImage(img_size, QImage.Format_ARGB32)
     image.fill(Qt.white)
@@ -299,15 +572,19 @@ def render_to_image(canvas, rect, scale=1.0):
         if hasattr(canvas, 'zoom_level'):
             z = canvas.zoom_level
             painter.scale(z, z)
-        canvas_painter.draw_connections(painter, canvas.connections, canvas.components)
+        canvas_painter.draw_connections(painter, canvas.connections, canvas.components,
+                                        obstacles=getattr(canvas, 'component_index', None))
         painter.restore()
         
         # Draw Components
-        for comp in canvas.components:
-            painter.save()
-            painter.translate(comp.pos())
-            comp.render(painter, QPoint(), QRegion(), QWidget.DrawChildren)
-            painter.restore()
+        if scene:
+            canvas_painter.draw_components(painter, canvas.components, getattr(canvas, 'zoom_level', 1.0))
+        else:
+            for comp in canvas.components:
+                painter.save()
+                painter.translate(comp.pos())
+                comp.render(painter, QPoint(), QRegion(), QWidget.DrawChildren)
+                painter.restore()
     finally:
         painter.end()
     return image
@@ -606,6 +883,11 @@ def load_from_pfd(canvas, filename):
         
         canvas.components = []
         canvas.connections = []
+        canvas.adjacency = {}
+        canvas.component_index = ComponentIndex()
+        # Nothing here is stored on the backend yet: next save sends everything
+        canvas.project_revision = None
+        canvas.dirty_objects.clear()
         for c in canvas.children():
             if isinstance(c, (ComponentWidget, QLabel)): c.deleteLater()
             
@@ -658,6 +940,7 @@ def load_from_pfd(canvas, filename):
             comp.update_visuals(canvas.zoom_level)
             comp.show()
             canvas.components.append(comp)
+            canvas.component_index.insert(comp)
             
             comp_id = d.get("id")
             if comp_id is not None:
@@ -686,6 +969,7 @@ def load_from_pfd(canvas, filename):
                 
                 c.update_path(canvas.components, canvas.connections)
                 canvas.connections.append(c)
+                canvas.link_connection(c)
                 
         canvas.update()
         return True
@@ -0,0 +1,359 @@
+"""
+Local crash-safe journal of unsaved canvas edits.
+
+Each undo stack step appends the state of the components/connections it
+touched (one small row per object) to a SQLite database in the user's data
+directory. A successful backend save truncates the project's journal, so it
+only ever holds what the backend doesn't have yet. If the app dies, the next
+time the project is opened the latest row per object is replayed on top of
+the backend state.
+
+Rows are keyed per object, so compaction simply drops every row but the
+newest one for each key; replay cost is bounded by the number of objects
+edited, not by the number of edits.
+"""
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QRectF, QStandardPaths
+from PyQt5.QtWidgets import QMessageBox
+
+from src.component_widget import ComponentWidget
+from src.connection import Connection
+from src.canvas import resources
+
+JOURNAL_FILE = "canvas_journal.sqlite3"
+# Compact a project's journal after this many appended rows
+COMPACT_EVERY = 500
+
+
+def default_journal_path():
+    data_dir = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+    if not data_dir:
+        data_dir = os.path.join(os.path.expanduser("~"), ".chemical-pfd")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, JOURNAL_FILE)
+
+
+class JournalStore:
+    """Append-only rows per project: (seq, key, kind, data)."""
+
+    def __init__(self, path=None):
+        self.path = path or default_journal_path()
+        self.db = sqlite3.connect(self.path, isolation_level=None)
+        # WAL + NORMAL: an append is one sequential write, and survives the
+        # app crashing (only an OS crash can lose the last few rows)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS journal_project_key_idx ON journal (project_id, key, seq);
+            CREATE TABLE IF NOT EXISTS journal_base (
+                project_id INTEGER PRIMARY KEY,
+                revision INTEGER,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self._appended = {}
+
+    def append(self, project_id, revision, rows):
+        """rows: iterable of (key, kind, data dict), written in one transaction."""
+        rows = [(project_id, key, kind, json.dumps(data, default=str)) for key, kind, data in rows]
+        if not rows:
+            return
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT INTO journal (project_id, key, kind, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO journal_base (project_id, revision, updated_at) VALUES (?, ?, ?)",
+                (project_id, revision, time.time()),
+            )
+
+        self._appended[project_id] = self._appended.get(project_id, 0) + len(rows)
+        if self._appended[project_id] >= COMPACT_EVERY:
+            self.compact(project_id)
+
+    def compact(self, project_id):
+        """Keep only the newest row per object."""
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.execute(
+                """DELETE FROM journal WHERE project_id = ? AND seq NOT IN (
+                       SELECT MAX(seq) FROM journal WHERE project_id = ? GROUP BY key)""",
+                (project_id, project_id),
+            )
+        self._appended[project_id] = 0
+
+    def load(self, project_id):
+        """(base revision, [(key, kind, data)] newest per object, oldest first)."""
+        base = self.db.execute(
+            "SELECT revision FROM journal_base WHERE project_id = ?", (project_id,)
+        ).fetchone()
+        rows = self.db.execute(
+            """SELECT key, kind, data FROM journal WHERE seq IN (
+                   SELECT MAX(seq) FROM journal WHERE project_id = ? GROUP BY key)
+               ORDER BY seq""",
+            (project_id,),
+        ).fetchall()
+        return (base[0] if base else None), [(key, kind, json.loads(data)) for key, kind, data in rows]
+
+    def clear(self, project_id):
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.execute("DELETE FROM journal WHERE project_id = ?", (project_id,))
+            self.db.execute("DELETE FROM journal_base WHERE project_id = ?", (project_id,))
+        self._appended.pop(project_id, None)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = JournalStore()
+    return _store
+
+
+# ---------------------- RECORDING ----------------------
+
+def journal_key(obj):
+    """Stable row key for a component/connection (kept across save and replay)."""
+    key = getattr(obj, "_journal_key", None)
+    if key is None:
+        key = obj._journal_key = uuid.uuid4().hex
+    return key
+
+
+def _item_row(comp, present):
+    c_dict = comp.to_dict()
+    return {
+        "present": present,
+        "backend_id": comp.backend_id,
+        "x": c_dict["x"],
+        "y": c_dict["y"],
+        "width": c_dict["width"],
+        "height": c_dict["height"],
+        "rotation": c_dict["rotation"],
+        "svg": c_dict["svg_path"],
+        "config": c_dict["config"],
+    }
+
+
+def _connection_row(conn, present):
+    start, end = conn.start_component, conn.end_component
+    return {
+        "present": present,
+        "backend_id": conn.backend_id,
+        "source": journal_key(start) if start else None,
+        "sourceBackendId": getattr(start, "backend_id", None),
+        "sourceGripIndex": conn.start_grip_index,
+        "start_side": conn.start_side,
+        "target": journal_key(end) if end else None,
+        "targetBackendId": getattr(end, "backend_id", None),
+        "targetGripIndex": conn.end_grip_index,
+        "end_side": conn.end_side,
+        "path_offset": conn.path_offset,
+        "start_adjust": conn.start_adjust,
+        "end_adjust": conn.end_adjust,
+    }
+
+
+class JournalRecorder(QObject):
+    """Writes the objects touched by each undo stack step to the journal."""
+
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.pending = set()
+        canvas.undo_stack.indexChanged.connect(self.flush)
+
+    def note(self, objects):
+        self.pending.update(objects)
+
+    def flush(self, *_):
+        if sip.isdeleted(self.canvas):
+            return
+        canvas = self.canvas
+        if not self.pending or not canvas.project_id or getattr(canvas, "_is_loading", False):
+            self.pending.clear()
+            return
+
+        self._append(self.pending)
+        self.pending.clear()
+
+    def _append(self, objects):
+        canvas = self.canvas
+        components = set(canvas.components)
+        connections = set(canvas.connections)
+        rows = []
+        for obj in objects:
+            if isinstance(obj, ComponentWidget):
+                rows.append((journal_key(obj), "item", _item_row(obj, obj in components)))
+            elif isinstance(obj, Connection):
+                rows.append((journal_key(obj), "connection", _connection_row(obj, obj in connections)))
+        try:
+            get_store().append(canvas.project_id, canvas.project_revision, rows)
+        except sqlite3.Error as e:
+            # The journal is a safety net; never let it break editing
+            print(f"[JOURNAL ERROR] {e}")
+
+    def saved(self):
+        """The backend caught up: restart the journal from what's still dirty."""
+        canvas = self.canvas
+        if not canvas.project_id:
+            return
+        try:
+            get_store().clear(canvas.project_id)
+        except sqlite3.Error as e:
+            print(f"[JOURNAL ERROR] {e}")
+            return
+        if canvas.dirty_objects:
+            self._append(canvas.dirty_objects)
+
+    def discard(self):
+        """Drop the project's journal (changes discarded on purpose)."""
+        self.pending.clear()
+        if self.canvas.project_id:
+            try:
+                get_store().clear(self.canvas.project_id)
+            except sqlite3.Error as e:
+                print(f"[JOURNAL ERROR] {e}")
+
+
+# ---------------------- RECOVERY ----------------------
+
+def replay_journal(canvas, rows):
+    """
+    Apply journal rows (newest per object) on top of the loaded backend state.
+    Recovered objects are marked dirty so the next save sends them.
+    Returns the number of objects restored.
+    """
+    items_by_backend = {c.backend_id: c for c in canvas.components if c.backend_id}
+    conns_by_backend = {c.backend_id: c for c in canvas.connections if c.backend_id}
+    by_key = {}
+    touched = []
+
+    for key, kind, d in rows:
+        if kind != "item":
+            continue
+        comp = items_by_backend.get(d.get("backend_id")) if d.get("backend_id") else None
+        if not d.get("present"):
+            if comp in canvas.components:
+                canvas.components.remove(comp)
+                comp.hide()
+                touched.append(comp)
+            continue
+
+        if comp is None:
+            svg_path = d.get("svg")
+            if not svg_path or not os.path.exists(svg_path):
+                config = d.get("config") or {}
+                svg_path = resources.find_svg_path(config.get("name") or config.get("object", ""), canvas.base_dir)
+            if not svg_path:
+                print(f"[JOURNAL] SVG not found for recovered item {key}")
+                continue
+            comp = ComponentWidget(svg_path, canvas, config=d.get("config") or {})
+            comp.backend_id = d.get("backend_id")
+            canvas.components.append(comp)
+            comp.show()
+
+        comp.logical_rect = QRectF(float(d["x"]), float(d["y"]), float(d["width"]), float(d["height"]))
+        comp.rotation_angle = float(d.get("rotation", 0))
+        comp.update_visuals(canvas.zoom_level)
+        comp._journal_key = key
+        by_key[key] = comp
+        touched.append(comp)
+
+    def endpoint(key, backend_id):
+        return by_key.get(key) or items_by_backend.get(backend_id)
+
+    for key, kind, d in rows:
+        if kind != "connection":
+            continue
+        conn = conns_by_backend.get(d.get("backend_id")) if d.get("backend_id") else None
+        if not d.get("present"):
+            if conn in canvas.connections:
+                canvas.connections.remove(conn)
+                touched.append(conn)
+            continue
+
+        start = endpoint(d.get("source"), d.get("sourceBackendId"))
+        end = endpoint(d.get("target"), d.get("targetBackendId"))
+        if start not in canvas.components:
+            print(f"[JOURNAL] Skipping recovered connection {key}: source item missing")
+            continue
+        if conn is None:
+            conn = Connection(start, d.get("sourceGripIndex", 0), d.get("start_side") or "right")
+            conn.backend_id = d.get("backend_id")
+            canvas.connections.append(conn)
+        conn.start_component = start
+        conn.start_grip_index = d.get("sourceGripIndex", 0)
+        conn.start_side = d.get("start_side") or conn.start_side
+        if end in canvas.components:
+            conn.set_end_grip(end, d.get("targetGripIndex", 0), d.get("end_side") or "left")
+        conn.path_offset = d.get("path_offset", 0.0)
+        conn.start_adjust = d.get("start_adjust", 0.0)
+        conn.end_adjust = d.get("end_adjust", 0.0)
+        conn._journal_key = key
+        touched.append(conn)
+
+    # Items and endpoints were changed in place
+    canvas.rebuild_indexes()
+    for conn in canvas.connections:
+        conn.update_path(canvas.components, canvas.connections)
+
+    canvas.dirty_objects.update(touched)
+    canvas.update()
+    return len(touched)
+
+
+def offer_recovery(parent, canvas):
+    """
+    After a backend project was loaded into canvas: if the journal holds
+    changes that never reached the backend, ask to restore them.
+    """
+    if not canvas.project_id:
+        return False
+    try:
+        store = get_store()
+        base_revision, rows = store.load(canvas.project_id)
+    except sqlite3.Error as e:
+        print(f"[JOURNAL ERROR] {e}")
+        return False
+    if not rows:
+        return False
+
+    text = f"{len(rows)} unsaved change(s) to this project were recovered from the last session."
+    if base_revision is not None and canvas.project_revision not in (None, base_revision):
+        text += "\nThe project has been saved elsewhere since then; restoring may overwrite those changes."
+    reply = QMessageBox.question(
+        parent, "Recover Unsaved Changes?",
+        text + "\nRestore them?",
+        QMessageBox.Yes | QMessageBox.No,
+        QMessageBox.Yes
+    )
+    if reply != QMessageBox.Yes:
+        store.clear(canvas.project_id)
+        return False
+
+    restored = replay_journal(canvas, rows)
+    print(f"[JOURNAL] Restored {restored} object(s) for project {canvas.project_id}")
+    store.compact(canvas.project_id)
+    # Not on the backend yet: show as modified and let autosave pick it up
+    canvas.undo_stack.resetClean()
+    if hasattr(canvas, "autosaver"):
+        canvas.autosaver.schedule()
+    return True
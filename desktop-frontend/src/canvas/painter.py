@@ -1,5 +1,7 @@
 from PyQt5.QtGui import QColor, QPen, QBrush
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QSize
+
+from src.connection import refresh_connection_paths
 
 def draw_grid(painter, width, height, theme="light"):
     dot_color = QColor(90, 90, 90) if theme == "dark" else QColor(180, 180, 180)
@@ -10,12 +12,15 @@ def draw_grid(painter, width, height, theme="light"):
         for y in range(0, height, grid_spacing):
             painter.drawPoint(x, y)
 
-def draw_connections(painter, connections, components, theme="light", zoom=1.0):
+def draw_connections(painter, connections, components, theme="light", zoom=1.0, index=None,
+                     obstacles=None, searches=None):
+    """Returns how many routes are still waiting for an obstacle search (see refresh_connection_paths)."""
+    # Re-route only what moved; routes and jumps are cached on the connections
+    pending = refresh_connection_paths(connections, components, index=index,
+                                       obstacles=obstacles, searches=searches)
+
     # Draw all finished connections
     for conn in connections:
-        # Update path with Jump Logic
-        conn.update_path(components, connections)
-
         # Render Connection (Line + Arrow + Jumps)
         conn.paint(painter, theme=theme, zoom=zoom)
 
@@ -25,6 +30,19 @@ def draw_connections(painter, connections, components, theme="light", zoom=1.0):
             painter.setPen(Qt.NoPen)
             for pt in conn.path:
                 painter.drawEllipse(pt, 4, 4)
+    return pending
+
+def draw_components(painter, components, zoom=1.0):
+    """
+    Scene mode: draw components the way their widgets would paint them.
+    The painter is in visual (zoomed) canvas coordinates, like child widgets.
+    """
+    for comp in components:
+        r = comp.logical_rect
+        painter.save()
+        painter.translate(int(r.x() * zoom), int(r.y() * zoom))
+        comp.paint_symbol(painter, QSize(int(r.width() * zoom), int(r.height() * zoom)))
+        painter.restore()
 
 def draw_active_connection(painter, active_connection, theme="light"):
     if active_connection:
@@ -0,0 +1,72 @@
+"""
+Uniform-grid index over component rects.
+
+Clicks and snapping only need the few components around one point; the index
+files each component under the grid cells its logical rect covers, so a
+lookup reads one cell instead of scanning every component. Grips lie inside
+their component's rect, so snap targets are found through it too.
+
+Kept up to date by the undo commands and loaders (insert/remove) and by
+ComponentWidget.update_visuals whenever a component's rect changes (move).
+"""
+import math
+
+
+class ComponentIndex:
+    CELL = 200.0  # logical px
+
+    def __init__(self, components=()):
+        self.cells = {}
+        # component -> cells it is filed under
+        self.entries = {}
+        for comp in components:
+            self.insert(comp)
+
+    def _cells(self, left, top, right, bottom):
+        size = self.CELL
+        for cx in range(math.floor(left / size), math.floor(right / size) + 1):
+            for cy in range(math.floor(top / size), math.floor(bottom / size) + 1):
+                yield (cx, cy)
+
+    def insert(self, comp):
+        if comp in self.entries:
+            self.remove(comp)
+        rect = comp.logical_rect
+        cells = list(self._cells(rect.left(), rect.top(), rect.right(), rect.bottom()))
+        self.entries[comp] = cells
+        for cell in cells:
+            self.cells.setdefault(cell, {})[comp] = None
+
+    def remove(self, comp):
+        for cell in self.entries.pop(comp, ()):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.pop(comp, None)
+                if not bucket:
+                    del self.cells[cell]
+
+    def move(self, comp):
+        """Re-file a component after its rect changed (no-op if not indexed)."""
+        if comp in self.entries:
+            self.insert(comp)
+
+    def within(self, rect):
+        """Components whose rect intersects rect (e.g. the area being painted)."""
+        found = {}
+        for cell in self._cells(rect.left(), rect.top(), rect.right(), rect.bottom()):
+            for comp in self.cells.get(cell, ()):
+                if comp not in found and comp.logical_rect.intersects(rect):
+                    found[comp] = None
+        return found
+
+    def near(self, pos, margin=0.0):
+        """Components whose rect, grown by margin, contains pos."""
+        x, y = pos.x(), pos.y()
+        found = {}
+        for cell in self._cells(x - margin, y - margin, x + margin, y + margin):
+            for comp in self.cells.get(cell, ()):
+                if comp in found:
+                    continue
+                if comp.logical_rect.adjusted(-margin, -margin, margin, margin).contains(pos):
+                    found[comp] = None
+        return list(found)
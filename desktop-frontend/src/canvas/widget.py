@@ -1,16 +1,26 @@
 import os
 from PyQt5 import QtWidgets, QtGui
-from PyQt5.QtCore import Qt, QPoint, QPointF, QRectF, QSize
+from PyQt5.QtCore import Qt, QPoint, QPointF, QRectF, QSize, QTimer
 from PyQt5.QtWidgets import QWidget, QLabel, QUndoStack
 from PyQt5.QtWidgets import QWidget, QLabel, QUndoStack, QVBoxLayout, QHBoxLayout, QPushButton, QFrame, QSizePolicy
 from PyQt5.QtGui import QPainter, QColor, QPalette
 
-from src.connection import Connection
+from src.connection import Connection, SegmentIndex, refresh_connection_paths
+from src.router import SEARCHES_PER_FRAME
 from src.component_widget import ComponentWidget
 import src.app_state as app_state
 from src.canvas import resources, painter
 from src.canvas.commands import AddCommand, DeleteCommand, MoveCommand, AddConnectionCommand
+from src.canvas.autosave import AutoSaver
+from src.canvas.journal import JournalRecorder
+from src.canvas.spatial import ComponentIndex
 
+# Window title suffixes for CanvasWidget.save_status
+SAVE_STATUS_TITLES = {
+    "saving": " (saving...)",
+    "failed": " (save failed)",
+    "conflict": " (save conflict)",
+}
 
 
 class CanvasWidget(QWidget):
@@ -37,6 +47,20 @@ class CanvasWidget(QWidget):
         self.connections = []
         self.active_connection = None
 
+        # component -> {attached connection: None} (insertion-ordered set),
+        # kept in step with self.connections by the undo commands and loaders
+        self.adjacency = {}
+        # Jump-detection index kept between paints; also serves connection
+        # hit tests. Component rects are indexed for snapping.
+        self.segment_index = SegmentIndex()
+        self.component_index = ComponentIndex()
+
+        # Scene mode: component widgets stay hidden and the canvas draws and
+        # hit-tests components itself (see set_scene_mode)
+        self.scene_mode = False
+        self.scene_drag = None
+        self._scene_hovered = None
+
         # PROJECT TRACKING
         self.project_id = None
         self.project_name = None
@@ -46,7 +70,21 @@ class CanvasWidget(QWidget):
         
         self.file_path = None
         self.is_modified = False
+
+        # Backend sync: revision the canvas was loaded/saved at (None = unknown,
+        # next save must send the full canvas) and objects touched since then
+        self.project_revision = None
+        self.dirty_objects = set()
+        self.save_conflict = False
+        self.save_in_flight = False
+        # on_done callbacks of saves requested while one was in flight
+        self._queued_saves = []
+        # None, or a key of SAVE_STATUS_TITLES shown next to the title
+        self.save_status = None
         self.undo_stack.cleanChanged.connect(self.on_undo_stack_changed)
+        self.autosaver = AutoSaver(self)
+        # Local crash journal of edits the backend doesn't have yet
+        self.journal = JournalRecorder(self)
 
         # Configs
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -62,6 +100,11 @@ class CanvasWidget(QWidget):
         theme_manager.theme_changed.connect(self.update_canvas_theme)
         self.update_canvas_theme()
     
+    def mark_dirty(self, *objects):
+        """Record components/connections changed since the last backend save."""
+        self.dirty_objects.update(objects)
+        self.journal.note(objects)
+
     def expand_to_contain(self, rect):
         """Expand logical size if rect is outside current bounds."""
         margin = 500 # Expansion chunk
@@ -88,12 +131,31 @@ class CanvasWidget(QWidget):
         new_h = int(self.logical_size.height() * self.zoom_level)
         self.setFixedSize(new_w, new_h)
         
-        # Update all components
-        for comp in self.components:
-            comp.update_visuals(self.zoom_level)
+        # Update all components (scene mode just repaints at the new scale)
+        if not self.scene_mode:
+            for comp in self.components:
+                comp.update_visuals(self.zoom_level)
             
         self.update()
 
+    def set_scene_mode(self, enabled):
+        """
+        Switch between one child widget per component and the lightweight
+        scene mode, where the canvas paints all components in one pass.
+        """
+        if enabled == self.scene_mode:
+            return
+        self.scene_mode = enabled
+        for comp in self.components:
+            comp.hover_port = None
+            if enabled:
+                comp.hide()
+            else:
+                # Widget geometry wasn't kept up to date meanwhile
+                comp.update_visuals(self.zoom_level)
+                comp.show()
+        self.update()
+
     def zoom_in(self):
         self.zoom_level *= 1.1
         self.apply_zoom()
@@ -220,6 +282,10 @@ class CanvasWidget(QWidget):
 
     # ---------------------- SELECTION + CONNECTION LOGIC ----------------------
     def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.scene_mode:
+            if self.scene_press(event):
+                return
+
         if event.button() == Qt.LeftButton:
             self.deselect_all()
             
@@ -227,16 +293,7 @@ class CanvasWidget(QWidget):
             logical_pos = self.get_logical_pos(event.pos())
 
             # Connection hit test
-            hit_connection = None
-            hit_index = -1
-            for conn in self.connections:
-                # CONNECTION HIT TEST uses LOGICAL coordinates
-                # Ensure connection class is updated or we pass logical logic
-                idx = conn.hit_test(logical_pos)
-                if idx != -1:
-                    hit_connection = conn
-                    hit_index = idx
-                    break
+            hit_connection, hit_index = self.connection_at(logical_pos)
 
             if hit_connection:
                 # Drag logic for connection
@@ -309,6 +366,9 @@ class CanvasWidget(QWidget):
             # But sticky notes might? No, they are widgets.
             return super().mouseMoveEvent(event)
 
+        if self.scene_mode and self.scene_move(event, logical_pos):
+            return super().mouseMoveEvent(event)
+
         if hasattr(self, "drag_connection") and self.drag_connection:
             delta = logical_pos - self.drag_start_pos
             sens_sq = self.drag_sensitivity.x()**2 + self.drag_sensitivity.y()**2
@@ -328,59 +388,146 @@ class CanvasWidget(QWidget):
         if not self.active_connection:
             return
 
-        snap = False
+        # Don't snap to start component
+        best_grip = self.snap_target(pos, exclude=self.active_connection.start_component)
+        if best_grip:
+            self.active_connection.set_snap_target(best_grip[0], best_grip[1], best_grip[2])
+        else:
+            self.active_connection.clear_snap_target()
+            self.active_connection.current_pos = pos 
+
+        self.active_connection.update_path(self.components, self.connections)
+        self.update()
+
+    def snap_target(self, pos, exclude=None):
+        """Closest grip near LOGICAL pos as (component, grip index, side), or None."""
         # Find closest grip
         best_dist = 20.0 # Standard tolerance (Logical)
         best_grip = None
 
-        for comp in self.components:
-            # Check bounding box (in logical)
-            if not comp.logical_rect.adjusted(-30, -30, 30, 30).contains(pos):
-                continue
-            
-            # Don't snap to start component
-            if comp == self.active_connection.start_component:
+        for comp in self.component_index.near(pos, 30):
+            if comp == exclude:
                 continue
 
             grips = comp.get_grips()
-            # Grip positions need to be mapped to logical!
-            # comp.get_grip_position returns coordinate relative to Widget (0,0) top left
-            # Widget top-left LOGICAL is comp.logical_rect.topLeft()
-            # So Global Logical Grip = comp.logical_rect.topLeft() + GripOffset
-             
-            for i, _ in enumerate(grips):
-                # We need the logical grip position relative to component 
-                # Since get_grip_position relies on SVG rect which scales...
-                # Actually, comp.get_grip_position() returns pixel offsest at current size
-                # We need to un-scale it to get logical offset.
-                
-                visual_grip_pos = comp.get_grip_position(i) # Visual offset
-                logical_grip_offset = QPointF(visual_grip_pos.x() / self.zoom_level, visual_grip_pos.y() / self.zoom_level)
-                
-                center = comp.logical_rect.topLeft() + logical_grip_offset
-                
+            top_left = comp.logical_rect.topLeft()
+            for i in range(len(grips)):
+                # Logical geometry: valid at any zoom, and in scene mode where
+                # the hidden widgets are never resized or repainted
+                center = top_left + comp.get_logical_grip_position(i)
+
                 dist = (pos - center).manhattanLength()
                 if dist < best_dist:
                     best_dist = dist
                     best_grip = (comp, i, grips[i]["side"])
-                    snap = True
-
-        if snap and best_grip:
-            self.active_connection.set_snap_target(best_grip[0], best_grip[1], best_grip[2])
+        return best_grip
+
+    def connection_at(self, pos, tolerance=5.0):
+        """First connection (in list order) near LOGICAL pos and the segment hit, or (None, -1)."""
+        self.segment_index.sync(self.connections)
+        for ordinal in self.segment_index.ordinals_near(pos.x(), pos.y(), tolerance):
+            conn = self.connections[ordinal]
+            idx = conn.hit_test(pos, tolerance)
+            if idx != -1:
+                return conn, idx
+        return None, -1
+
+    # ---------------------- SCENE MODE INPUT ----------------------
+    # What ComponentWidget's mouse handlers do, for components that have no
+    # visible widget to receive the events.
+    def component_at(self, pos):
+        """Topmost component under LOGICAL pos, or None."""
+        hits = self.component_index.near(pos)
+        if not hits:
+            return None
+        return max(hits, key=self.components.index)
+
+    def grip_at(self, pos):
+        """(component, grip index) of a port under LOGICAL pos, or None."""
+        # Same 10 px (visual) radius as ComponentWidget's hover test
+        radius = 10 / self.zoom_level
+        for comp in self.component_index.near(pos, radius):
+            top_left = comp.logical_rect.topLeft()
+            for idx in range(len(comp.get_grips())):
+                center = top_left + comp.get_logical_grip_position(idx)
+                if (pos - center).manhattanLength() < radius:
+                    return comp, idx
+        return None
+
+    def scene_press(self, event):
+        logical_pos = self.get_logical_pos(event.pos())
 
+        grip = self.grip_at(logical_pos)
+        if grip:
+            comp, idx = grip
+            self.start_connection(comp, idx, comp.get_grips()[idx].get("side", "right"))
+            self.setFocus()
+            event.accept()
+            return True
 
-        if not snap:
-            self.active_connection.clear_snap_target()
-            self.active_connection.current_pos = pos 
+        comp = self.component_at(logical_pos)
+        if comp is None:
+            return False
 
-        self.active_connection.update_path(self.components, self.connections)
+        comp.is_selected = True
+        self.scene_drag = {
+            "last": logical_pos,
+            "start": {c: QPointF(c.logical_rect.topLeft()) for c in self.components if c.is_selected},
+        }
+        self.setFocus()
         self.update()
+        event.accept()
+        return True
+
+    def scene_move(self, event, logical_pos):
+        """Drag the selection or track port hover. True if the event was used."""
+        if self.scene_drag and event.buttons() & Qt.LeftButton:
+            delta = logical_pos - self.scene_drag["last"]
+            self.scene_drag["last"] = logical_pos
+            moved = list(self.scene_drag["start"])
+            for comp in moved:
+                comp.logical_rect.translate(delta.x(), delta.y())
+                comp.update_visuals(self.zoom_level)
+                self.expand_to_contain(comp.logical_rect)
+            # Re-route the attached pipes once for the whole selection
+            self.reroute_components(moved)
+            self.update()
+            return True
+
+        hovered, port = self.grip_at(logical_pos) or (None, None)
+        previous = self._scene_hovered
+        changed = False
+        if previous is not None and previous is not hovered and previous.hover_port is not None:
+            previous.hover_port = None
+            changed = True
+        if hovered is not None and hovered.hover_port != port:
+            hovered.hover_port = port
+            changed = True
+        self._scene_hovered = hovered
+        if changed:
+            self.update()
+        return False
+
+    def scene_release(self):
+        moved_items = [
+            (comp, start, QPointF(comp.logical_rect.topLeft()))
+            for comp, start in self.scene_drag["start"].items()
+            if comp.logical_rect.topLeft() != start
+        ]
+        self.scene_drag = None
+        if moved_items:
+            self.undo_stack.beginMacro("Move Components")
+            for comp, start, end in moved_items:
+                self.undo_stack.push(MoveCommand(comp, start, end))
+            self.undo_stack.endMacro()
 
     def mouseReleaseEvent(self, event):
         # Handle release in LOGICAL coords
         logical_pos = self.get_logical_pos(event.pos())
         self.handle_connection_release(logical_pos)
         self.drag_connection = None
+        if self.scene_drag:
+            self.scene_release()
 
         if hasattr(self, 'drag_item') and self.drag_item:
             if self.drag_item.pos() != self.drag_item_start_pos:
@@ -406,15 +553,8 @@ class CanvasWidget(QWidget):
         to_del_comps = [c for c in self.components if c.is_selected]
         to_del_conns = [c for c in self.connections if c.is_selected]
 
-        attached_conns = []
-        for i in range(len(self.connections) - 1, -1, -1):
-            conn = self.connections[i]
-            if (conn.start_component in to_del_comps or 
-                conn.end_component in to_del_comps):
-                if conn not in to_del_conns and conn not in attached_conns:
-                    attached_conns.append(conn)
-
-        all_conns_to_del = to_del_conns + attached_conns
+        # Pipes attached to deleted components go with them
+        all_conns_to_del = list(dict.fromkeys(to_del_conns + self.attached_connections(to_del_comps)))
 
         if to_del_comps or all_conns_to_del:
             cmd = DeleteCommand(self, to_del_comps, all_conns_to_del)
@@ -439,6 +579,47 @@ class CanvasWidget(QWidget):
             self.active_connection = None
             self.update()
 
+    # ---------------------- ADJACENCY ----------------------
+    def link_connection(self, conn):
+        for comp in (conn.start_component, conn.end_component):
+            if comp is not None:
+                self.adjacency.setdefault(comp, {})[conn] = None
+
+    def unlink_connection(self, conn):
+        for comp in (conn.start_component, conn.end_component):
+            attached = self.adjacency.get(comp)
+            if attached is not None:
+                attached.pop(conn, None)
+                if not attached:
+                    del self.adjacency[comp]
+
+    def rebuild_indexes(self):
+        """Start over from the canvas lists (after they changed in bulk)."""
+        self.adjacency = {}
+        for conn in self.connections:
+            self.link_connection(conn)
+        self.component_index = ComponentIndex(self.components)
+
+    def attached_connections(self, components):
+        """Connections touching any of `components`, without duplicates."""
+        attached = {}
+        for comp in components:
+            attached.update(self.adjacency.get(comp, {}))
+        return list(attached)
+
+    # ---------------------- BATCH ROUTING ----------------------
+    def reroute_components(self, components):
+        """
+        Re-route just the connections attached to `components` (and any whose
+        detour they now block) in one pass, e.g. once per drag step. The next
+        paint then finds every route up to date.
+        """
+        refresh_connection_paths(
+            self.connections, self.components, index=self.segment_index,
+            changed=self.attached_connections(components), moved=components,
+            obstacles=self.component_index, searches=SEARCHES_PER_FRAME,
+        )
+
     # ---------------------- PAINT EVENT ----------------------
     def paintEvent(self, event):
         qp = QPainter(self)
@@ -454,7 +635,25 @@ class CanvasWidget(QWidget):
         painter.draw_grid(qp, logical_w, logical_h, app_state.current_theme)
         
         # Draws connections in logical coords!
-        painter.draw_connections(qp, self.connections, self.components, theme=app_state.current_theme, zoom=self.zoom_level)
+        pending = painter.draw_connections(
+            qp, self.connections, self.components, theme=app_state.current_theme,
+            zoom=self.zoom_level, index=self.segment_index,
+            obstacles=self.component_index, searches=SEARCHES_PER_FRAME,
+        )
+        if pending:
+            # Pipes still drawn with their rule-based route: detour them next frame
+            QTimer.singleShot(0, self.update)
+
+        if self.scene_mode:
+            # Only what's in the repainted area, in stacking order
+            area = QRectF(event.rect())
+            area = QRectF(area.topLeft() / self.zoom_level, area.bottomRight() / self.zoom_level)
+            visible = self.component_index.within(area)
+            qp.save()
+            qp.resetTransform()
+            painter.draw_components(qp, [c for c in self.components if c in visible], self.zoom_level)
+            qp.restore()
+
         painter.draw_active_connection(qp, self.active_connection, theme=app_state.current_theme)
 
     # ---------------------- COMPONENT CREATION ----------------------
@@ -540,47 +739,76 @@ class CanvasWidget(QWidget):
     def on_undo_stack_changed(self, clean):
         """
         Called when undo stack clean state changes.
-        MANUAL SAVE MODE: Only updates the UI ('*') and is_modified flag.
-        Does NOT auto-save to backend.
+        Updates the UI ('*') and is_modified flag; saving to the backend is
+        left to the autosaver (see canvas/autosave.py).
         """
         print(f"[DEBUG] Stack changed: clean={clean}, project_id={self.project_id}")
         self.is_modified = not clean
-        
-        # Update window title to show/hide asterisk
+        self.refresh_title()
+
+    def refresh_title(self):
+        """Show unsaved ('*') and save status markers in the window title."""
         parent = self.parent()
         while parent and not isinstance(parent, QtWidgets.QMdiSubWindow):
             parent = parent.parent()
-        
+
         if parent and hasattr(parent, "setWindowTitle"):
             title = parent.windowTitle()
-            # Clean up any existing asterisk first to prevent double **
+            # Clean up any existing markers first to prevent double **
+            for suffix in SAVE_STATUS_TITLES.values():
+                if title.endswith(suffix):
+                    title = title[:-len(suffix)]
             base_title = title.rstrip("*")
-            
-            if not clean:
-                parent.setWindowTitle(base_title + "*")
-            else:
-                parent.setWindowTitle(base_title)
 
-    def save_file(self, filename=None):
+            if self.is_modified:
+                base_title += "*"
+            parent.setWindowTitle(base_title + SAVE_STATUS_TITLES.get(self.save_status, ""))
+
+    def mark_saved(self, undo_index):
+        """A save of the canvas as it was at undo_index reached the backend."""
+        # Mark as "Not New" (Permanent) ---
+        self.is_new_project = False
+        self.journal.saved()
+        # Edits made while the save was in flight keep the canvas modified
+        if self.undo_stack.index() == undo_index:
+            self.undo_stack.setClean()
+
+    def save_file(self, filename=None, on_done=None):
         """
-        Save canvas to backend. 
+        Save canvas to backend in the background; on_done(result) runs on the
+        UI thread when it completes. A save requested while another one (e.g.
+        an autosave) is running is queued and runs after it lands.
         If filename is provided, it's for local PFD export (legacy support).
         """
         if self.project_id:
             # Save to backend
-            from src.canvas.export import save_canvas_state
+            from src.canvas.export import save_canvas_state_async
             import src.app_state as app_state
             
+            if self.save_in_flight:
+                print(f"[CANVAS] Save of project {self.project_id} queued behind the one in progress")
+                self._queued_saves.append(on_done)
+                return None
+
             app_state.current_project_id = self.project_id
             app_state.current_project_name = self.project_name
-            
-            result = save_canvas_state(self)
-            if result:
-                self.undo_stack.setClean()
-                # Mark as "Not New" (Permanent) ---
-                self.is_new_project = False
-                print(f"[CANVAS] Saved project {self.project_id} to backend")
-            return result
+
+            def done(result):
+                if result:
+                    print(f"[CANVAS] Saved project {self.project_id} to backend")
+                    self.save_status = None
+                else:
+                    self.save_status = "conflict" if self.save_conflict else "failed"
+                self.refresh_title()
+                if on_done:
+                    on_done(result)
+                queued, self._queued_saves = self._queued_saves, []
+                if queued:
+                    self._run_queued_saves(result, queued)
+
+            self.save_status = "saving"
+            self.refresh_title()
+            return save_canvas_state_async(self, on_done=done)
         elif filename:
             # Legacy: Save to local PFD file
             from src.canvas.export import save_to_pfd
@@ -592,6 +820,19 @@ class CanvasWidget(QWidget):
             print("[CANVAS] No project ID or filename for save")
             return False     
            
+    def _run_queued_saves(self, result, callbacks):
+        """Answer saves queued behind the one that just finished with `result`."""
+        def notify(result):
+            for on_done in callbacks:
+                if on_done:
+                    on_done(result)
+
+        if self.save_conflict or (result and self.undo_stack.isClean()):
+            # A conflict would only repeat; a clean stack has nothing left to send
+            notify(result)
+        else:
+            self.save_file(on_done=notify)
+
     def open_file(self, filename):
         """Open local PFD file (legacy support)."""
         from src.canvas.export import load_from_pfd
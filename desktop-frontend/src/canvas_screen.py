@@ -10,6 +10,7 @@ from src.theme import apply_theme_to_screen
 from src.navigation import slide_to_index
 import src.app_state as app_state
 from src.theme_manager import theme_manager
+from src.api_worker import run_async, busy_dialog
 
 class OverlayContainer(QWidget):
     def __init__(self, canvas, scroll_area, parent=None):
@@ -290,6 +291,7 @@ class CanvasScreen(QMainWindow):
         self.mdi_area.setTabsClosable(True)
         self.mdi_area.setTabsMovable(True)
         self.mdi_area.setBackground(QBrush(QColor("#505050")))
+        self.mdi_area.subWindowActivated.connect(self._sync_view_menu)
 
         splitter.addWidget(self.library)
         splitter.addWidget(self.mdi_area)
@@ -318,6 +320,7 @@ class CanvasScreen(QMainWindow):
         self.menu_manager.generate_excel_clicked.connect(self.on_generate_excel)
         self.menu_manager.generate_report_clicked.connect(self.on_generate_report)
         self.menu_manager.add_symbols_clicked.connect(self.open_add_symbol_dialog)
+        self.menu_manager.lightweight_rendering_toggled.connect(self.on_lightweight_rendering)
 
     def apply_mdi_theme(self, theme):
         """Apply theme to MDI area title bar and tabs."""
@@ -376,19 +379,21 @@ class CanvasScreen(QMainWindow):
         if not ok or not project_name.strip():
             return
         
-        # Create project on backend
-        project_data = create_project(name=project_name.strip(), description="")
-        
-        if not project_data:
-            QtWidgets.QMessageBox.critical(
-                self, 
-                "Error", 
-                "Failed to create project on server."
-            )
-            return
+        def created(project_data):
+            if not project_data:
+                QtWidgets.QMessageBox.critical(
+                    self, 
+                    "Error", 
+                    "Failed to create project on server."
+                )
+                return
+            
+            # Create and open the project (Pass True for is_freshly_created)
+            self._create_canvas_for_project(project_data, is_freshly_created=True)
         
-        # Create and open the project (Pass True for is_freshly_created)
-        self._create_canvas_for_project(project_data, is_freshly_created=True)
+        # Create project on backend (in the background)
+        task = run_async(create_project, name=project_name.strip(), description="", on_success=created)
+        busy_dialog(self, "Creating project...", task)
 
     def _create_canvas_for_project(self, project_data, is_freshly_created=False):
         """Helper to create a canvas window for a project (new or existing)"""
@@ -408,6 +413,7 @@ class CanvasScreen(QMainWindow):
 
         # Set flag on canvas ---
         canvas.is_new_project = is_freshly_created
+        canvas.project_revision = project_data.get("revision")
         
         # Load existing canvas state if it exists
         canvas_state = project_data.get("canvas_state")
@@ -439,24 +445,30 @@ class CanvasScreen(QMainWindow):
         self.mdi_area.addSubWindow(sub)
         sub.setWindowTitle(f"{app_state.current_project_name}")
         sub.showMaximized()
+
+        # Offer edits a crashed session never got to save
+        from src.canvas.journal import offer_recovery
+        offer_recovery(self, canvas)
         
     def open_project_from_backend(self, project_id):
         """Load and open a project from backend by ID."""
         from src.api_client import get_project
         
-        # Fetch project data
-        project_data = get_project(project_id)
-        
-        if not project_data:
-            QtWidgets.QMessageBox.critical(
-                self,
-                "Error",
-                f"Failed to load project (ID: {project_id})"
-            )
-            return
+        def loaded(project_data):
+            if not project_data:
+                QtWidgets.QMessageBox.critical(
+                    self,
+                    "Error",
+                    f"Failed to load project (ID: {project_id})"
+                )
+                return
+            
+            # Existing project -> is_freshly_created=False
+            self._create_canvas_for_project(project_data, is_freshly_created=False)
         
-        # Existing project -> is_freshly_created=False
-        self._create_canvas_for_project(project_data, is_freshly_created=False)
+        # Fetch project data (in the background)
+        task = run_async(get_project, project_id, on_success=loaded)
+        busy_dialog(self, "Loading project...", task)
 
     def showEvent(self, event):
         """Handle show event - check if there's a pending project to load."""
@@ -495,6 +507,19 @@ class CanvasScreen(QMainWindow):
         if active_sub and isinstance(active_sub, CanvasSubWindow):
             active_sub.get_canvas().delete_selected_components()
 
+    def _sync_view_menu(self, sub):
+        """Show the active canvas' rendering mode in the View menu."""
+        if sub and isinstance(sub, CanvasSubWindow):
+            action = self.menu_manager.lightweight_action
+            action.blockSignals(True)
+            action.setChecked(sub.get_canvas().scene_mode)
+            action.blockSignals(False)
+
+    def on_lightweight_rendering(self, enabled):
+        active_sub = self.mdi_area.currentSubWindow()
+        if active_sub and isinstance(active_sub, CanvasSubWindow):
+            active_sub.get_canvas().set_scene_mode(enabled)
+
     def on_undo(self):
         active_sub = self.mdi_area.currentSubWindow()
         if active_sub and isinstance(active_sub, CanvasSubWindow):
@@ -567,36 +592,30 @@ class CanvasScreen(QMainWindow):
             )
             return
         
-        from src.canvas.export import save_canvas_state
-        
-        try:
-            result = save_canvas_state(canvas)
-            
+        def saved(result):
             if result:
-                # Mark as saved
-                canvas.undo_stack.setClean()
-
-                # Update flag on canvas ---
-                canvas.is_new_project = False
-
                 QtWidgets.QMessageBox.information(
                     self, 
                     "Success", 
                     f"Project '{canvas.project_name}' saved successfully."
                 )
+            elif canvas.save_conflict:
+                QtWidgets.QMessageBox.warning(
+                    self,
+                    "Save Conflict",
+                    "This project was changed by another save.\n"
+                    "Reopen it to get the latest version before saving again."
+                )
             else:
                 QtWidgets.QMessageBox.critical(
                     self,
                     "Error",
                     "Failed to save project to server."
                 )
-                
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(
-                self, 
-                "Error", 
-                f"Failed to save project:\n{str(e)}"
-            )
+
+        # Saves in the background (after any autosave still running); the
+        # canvas stays editable meanwhile
+        canvas.save_file(on_done=saved)
 
     def on_save_as_file(self):
         active_sub = self.mdi_area.currentSubWindow()
@@ -1,12 +1,11 @@
 import os
 import csv
 import json
-import requests
 import src.app_state as app_state
 from src.theme_manager import theme_manager
 from src import api_client
 from src.flow_layout import FlowLayout
-from PyQt5.QtCore import Qt, QMimeData, QSize, QTimer, QPropertyAnimation, QEasingCurve, QEvent, pyqtSignal
+from PyQt5.QtCore import Qt, QMimeData, QSize, QStandardPaths, QTimer, QPropertyAnimation, QEasingCurve, QEvent, pyqtSignal
 from PyQt5.QtGui import QIcon, QDrag, QMovie, QPixmap, QPalette
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLineEdit, QFrame, QSizePolicy,
@@ -311,112 +310,88 @@ class ComponentLibrary(QWidget):
 
     def _sync_components_with_backend(self):
         """
-        Fetch components from backend, append new ones to CSV,
-        and download PNG/SVG exactly as backend provides.
+        Bring the local CSV and PNG/SVG files up to date with the backend.
+
+        The first sync appends the components the CSV doesn't have yet. After
+        that only what changed since the previous sync is fetched (?since=),
+        and updated or deleted components are rewritten in / dropped from the CSV.
         """
         try:
-            api_components = api_client.get_components()
-            if not api_components:
+            state = self._sync_state()
+
+            # Nothing changed on the backend since the last sync: skip the download
+            version = api_client.get_components_version()
+            if version and version == state.get("version"):
+                return
+
+            since = state.get("since")
+            changes = api_client.get_component_changes(since or "1970-01-01T00:00:00+00:00")
+            if changes is None:
                 return
 
+            # An older backend ignores ?since= and sends the full list without a cursor
+            cursor = changes.get("since")
+            is_delta = bool(since) and cursor is not None
+
             csv_path = os.path.join("ui", "assets", "Component_Details.csv")
 
-            # Get existing S. No list
-            existing = set()
+            fieldnames = self.CSV_FIELDS
+            rows = []
             if os.path.exists(csv_path):
                 with open(csv_path, "r", encoding="utf-8-sig") as f:
-                    for r in csv.DictReader(f):
-                        if r.get("s_no"):
-                            existing.add(r["s_no"].strip())
+                    reader = csv.DictReader(f)
+                    fieldnames = reader.fieldnames or self.CSV_FIELDS
+                    rows = list(reader)
+
+            rewrite = False
+
+            # Deletions first: a component may be deleted and re-created in one delta
+            if is_delta:
+                deleted = {str(d.get("s_no", "")).strip() for d in changes.get("deleted", [])}
+                kept = [r for r in rows if (r.get("s_no") or "").strip() not in deleted]
+                rewrite = len(kept) != len(rows)
+                rows = kept
+
+            # S. No -> index into rows
+            existing = {}
+            for i, r in enumerate(rows):
+                if r.get("s_no"):
+                    existing[r["s_no"].strip()] = i
 
             new_rows = []
 
-            for comp in api_components:
+            for comp in changes.get("components", []):
                 s_no = str(comp.get("s_no", "")).strip()
-                if not s_no or s_no in existing:
+                if not s_no:
                     continue
 
-                # print(f"[SYNC] NEW component detected: s_no={s_no}, name={comp.get('name')}")
+                if s_no in existing:
+                    # Full sync keeps the rows we already have; a delta means it changed
+                    if is_delta and existing[s_no] is not None:
+                        rows[existing[s_no]] = self._component_csv_row(comp)
+                        rewrite = True
+                    continue
 
-                parent = comp.get("parent", "").strip()
-                name = comp.get("name", "").strip()
-                obj = comp.get("object", "").strip()
-
-                png_url = comp.get("png_url") or comp.get("png")
-                svg_url = comp.get("svg_url") or comp.get("svg")
-
-                # Prepare folders
-                parent_folder = self.FOLDER_MAP.get(parent, parent)
-                png_dir = os.path.join("ui", "assets", "png", parent_folder)
-                svg_dir = os.path.join("ui", "assets", "svg", parent_folder)
-                os.makedirs(png_dir, exist_ok=True)
-                os.makedirs(svg_dir, exist_ok=True)
-
-                png_filename = ""
-                svg_filename = ""
-
-                # --- Download PNG ---
-                if png_url:
-                    if not png_url.startswith("http"):
-                        png_url = f"{app_state.BACKEND_BASE_URL}{png_url}"
-
-                    png_filename = os.path.basename(png_url)
-                    png_path = os.path.join(png_dir, png_filename)
-
-                    try:
-                        res = requests.get(png_url, timeout=5)
-                        if res.status_code == 200:
-                            with open(png_path, "wb") as f:
-                                f.write(res.content)
-                            # print(f"[SYNC] PNG saved → {png_path}")
-                        else:
-                            print("[SYNC] PNG download failed:", png_url)
-                    except Exception as e:
-                        print("[SYNC ERROR] PNG failed:", e)
-
-                # --- Download SVG ---
-                if svg_url:
-                    if not svg_url.startswith("http"):
-                        svg_url = f"{app_state.BACKEND_BASE_URL}{svg_url}"
-
-                    svg_filename = os.path.basename(svg_url)
-                    svg_path = os.path.join(svg_dir, svg_filename)
-
-                    try:
-                        res = requests.get(svg_url, timeout=5)
-                        if res.status_code == 200:
-                            with open(svg_path, "wb") as f:
-                                f.write(res.content)
-                            # print(f"[SYNC] SVG saved → {svg_path}")
-                    except Exception as e:
-                        print("[SYNC ERROR] SVG failed:", e)
+                # print(f"[SYNC] NEW component detected: s_no={s_no}, name={comp.get('name')}")
+                new_rows.append(self._component_csv_row(comp))
+                existing[s_no] = None
 
                 # Add to new_snos set
                 self.new_snos.add(s_no)
                 # print(f"[SYNC] Added s_no={s_no} to new_snos set")
-                
-                # CSV row with exact backend filenames
-                new_rows.append({   
-                    "s_no": s_no,
-                    "parent": parent,
-                    "name": name,
-                    "legend": comp.get("legend", ""),
-                    "suffix": comp.get("suffix", ""),
-                    "object": obj,
-                    "svg": svg_filename,
-                    "png": png_filename,
-                    "grips": comp.get("grips", "")
-                })
+
+            if rewrite:
+                with open(csv_path, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+                    writer.writeheader()
+                    writer.writerows(rows + new_rows)
 
             # Append to CSV
-            if new_rows:
+            elif new_rows:
                 file_exists = os.path.exists(csv_path)
 
                 with open(csv_path, "a", newline="", encoding="utf-8") as f:
-                    writer = csv.DictWriter(f, fieldnames=[
-                        "s_no", "parent", "name", "legend", "suffix",
-                        "object", "svg", "png", "grips"
-                    ])
+                    writer = csv.DictWriter(f, fieldnames=self.CSV_FIELDS)
 
                     if not file_exists:
                         writer.writeheader()
@@ -427,9 +402,93 @@ class ComponentLibrary(QWidget):
                 # print(f"[SYNC] Added {len(new_rows)} new components to CSV.")
                 # print(f"[SYNC] new_snos now contains: {self.new_snos}")
 
+            self._store_sync_state({"version": version, "since": cursor})
+
         except Exception as e:
             print("[SYNC CRITICAL ERROR]", e)
 
+    CSV_FIELDS = ["s_no", "parent", "name", "legend", "suffix", "object", "svg", "png", "grips"]
+
+    def _component_csv_row(self, comp):
+        """Download a backend component's PNG/SVG and build its CSV row."""
+        parent = comp.get("parent", "").strip()
+        parent_folder = self.FOLDER_MAP.get(parent, parent)
+
+        png_url = comp.get("png_url") or comp.get("png")
+        svg_url = comp.get("svg_url") or comp.get("svg")
+
+        # CSV row with exact backend filenames
+        return {
+            "s_no": str(comp.get("s_no", "")).strip(),
+            "parent": parent,
+            "name": comp.get("name", "").strip(),
+            "legend": comp.get("legend", ""),
+            "suffix": comp.get("suffix", ""),
+            "object": comp.get("object", "").strip(),
+            "svg": self._download_asset(svg_url, os.path.join("ui", "assets", "svg", parent_folder)),
+            "png": self._download_asset(png_url, os.path.join("ui", "assets", "png", parent_folder)),
+            "grips": comp.get("grips", "")
+        }
+
+    def _download_asset(self, url, folder):
+        """Save a backend file into folder; returns its file name ("" if none)."""
+        if not url:
+            return ""
+        if not url.startswith("http"):
+            url = f"{app_state.BACKEND_BASE_URL}{url}"
+
+        os.makedirs(folder, exist_ok=True)
+        filename = os.path.basename(url)
+        try:
+            res = api_client.get_session().get(url, timeout=5)
+            if res.status_code == 200:
+                with open(os.path.join(folder, filename), "wb") as f:
+                    f.write(res.content)
+            else:
+                print("[SYNC] Download failed:", url)
+        except Exception as e:
+            print("[SYNC ERROR] Download failed:", e)
+        return filename
+
+    # Catalogue version and ?since= cursor of the last completed sync, per
+    # backend and user (private components make each user's catalogue differ).
+    # Kept in the user's data directory, not next to the shipped assets.
+    SYNC_STATE_FILE = "catalogue_sync.json"
+
+    @classmethod
+    def _sync_state_path(cls):
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+        if not data_dir:
+            data_dir = os.path.join(os.path.expanduser("~"), ".chemical-pfd")
+        return os.path.join(data_dir, cls.SYNC_STATE_FILE)
+
+    @staticmethod
+    def _sync_state_key():
+        return f"{app_state.current_user or ''}@{app_state.BACKEND_BASE_URL}"
+
+    def _sync_state(self):
+        try:
+            with open(self._sync_state_path(), "r", encoding="utf-8") as f:
+                state = json.load(f).get(self._sync_state_key())
+        except (OSError, ValueError, AttributeError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _store_sync_state(self, state):
+        path = self._sync_state_path()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                states = json.load(f)
+        except (OSError, ValueError):
+            states = {}
+        states[self._sync_state_key()] = state
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(states, f)
+        except OSError as e:
+            print("[SYNC] Could not store sync state:", e)
+
 
     def _populate_icons(self):
         for i in reversed(range(self.scroll_layout.count())):
@@ -589,7 +648,7 @@ class ComponentLibrary(QWidget):
             backend_url = f"{app_state.BACKEND_BASE_URL}/media/components/{backend_png_filename}"
 
             try:
-                r = requests.get(backend_url, timeout=5)
+                r = api_client.get_session().get(backend_url, timeout=5)
                 if r.status_code == 200:
                     with open(local_path, "wb") as f:
                         f.write(r.content)
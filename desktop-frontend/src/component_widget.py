@@ -1,17 +1,22 @@
-import os
-import csv 
 import json
 from PyQt5.QtWidgets import QWidget
 from PyQt5.QtSvg import QSvgRenderer
 from PyQt5.QtCore import Qt, QRectF, QPoint, QPointF
 from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QColor, QPen
 
+from src.symbols import get_renderer, draw_symbol
+from src import grips as grip_registry
+
+# (svg path, logical width, logical height, label pad) -> logical SVG rect as (x, y, w, h)
+_logical_svg_frames = {}
+
 class ComponentWidget(QWidget):
     def __init__(self, svg_path, parent=None, config=None):
         super().__init__(parent)
         self.svg_path = svg_path
         self.config = config or {}
-        self.renderer = QSvgRenderer(svg_path)
+        # Parsed once per symbol and shared by every instance
+        self.renderer = get_renderer(svg_path)
 
         # Standard component size
         self.setFixedSize(120, 100)
@@ -28,8 +33,18 @@ class ComponentWidget(QWidget):
         # Initialize from current geometry or valid defaults
         self.logical_rect = QRectF(self.x(), self.y(), 120, 100)
 
+        # Bumped whenever the logical geometry changes; attached connections
+        # compare it to decide whether their cached route is stale
+        self.geometry_version = 0
+        self._versioned_rect = None
+
+        # Database id of the matching canvas item (None until first saved)
+        self.backend_id = None
+
         # Cache for grips to prevent file reading lag during paint events
         self._cached_grips = None
+        # Offsets table for those grips (shared with same-grip instances)
+        self._cached_grip_offsets = None
         
         # Cache for actual SVG render rectangle
         self._cached_svg_rect = None
@@ -37,7 +52,13 @@ class ComponentWidget(QWidget):
         self.setAttribute(Qt.WA_Hover, True)
         self.setMouseTracking(True)
 
-    def get_content_rect(self):
+    def setVisible(self, visible):
+        # In scene mode the canvas draws components; the widget stays hidden
+        if visible and getattr(self.parent(), "scene_mode", False):
+            visible = False
+        super().setVisible(visible)
+
+    def get_content_rect(self, size=None):
         # Scale margins by zoom level to ensure linear scaling of geometry
         zoom = 1.0
         if self.parent() and hasattr(self.parent(), "zoom_level"):
@@ -55,8 +76,9 @@ class ComponentWidget(QWidget):
         p_r = pad_right * zoom
         p_b = pad_bottom * zoom
         
-        w = max(1, self.width() - m_x - p_r)
-        h = max(1, self.height() - m_y - p_b)
+        size = size or self.size()
+        w = max(1, size.width() - m_x - p_r)
+        h = max(1, size.height() - m_y - p_b)
         
         return QRectF(m_x, m_y, w, h)
     
@@ -130,168 +152,55 @@ class ComponentWidget(QWidget):
     
     def _should_invert_y_axis(self):
         """
-        Detect if Y-axis should be inverted based on grip coordinates.
-        
-        COORDINATE SYSTEM RULES:
-        
-        LEGACY JSON (needs inversion):
-        - Y=100 or Y>90 → Visual TOP
-        - Y=0 or Y<10 → Visual BOTTOM
-        - Y=50 → Visual MIDDLE
-        
-        MODERN GRIP EDITOR (no inversion):
-        - Y=0 or Y<10 → Visual TOP
-        - Y=100 or Y>90 → Visual BOTTOM
-        - Y=50 → Visual MIDDLE
-        
-        DETECTION STRATEGY:
-        1. If we have grips with Y≈100 marked as "top" → INVERT (legacy)
-        2. If we have grips with Y≈0 marked as "top" → DON'T INVERT (modern)
-        3. If we have grips with Y≈0 marked as "bottom" → INVERT (legacy)
-        4. Otherwise use average: avg Y > 50 → INVERT
+        Whether this symbol's grips use the legacy (inverted) Y convention.
+        Decided once per set of grips by the grip registry.
         """
-        grips = self.get_grips()
-        
-        if not grips:
-            return False
-        
-        # Check for side hints (most reliable)
-        for grip in grips:
-            y = grip.get("y", 50)
-            side = grip.get("side", "")
-            
-            # Legacy format: Y=100 with side="top"
-            if y >= 80 and side == "top":
-                return True
-            
-            # Legacy format: Y=0 with side="bottom"
-            if y <= 20 and side == "bottom":
-                return True
-            
-            # Modern format: Y=0 with side="top"
-            if y <= 20 and side == "top":
-                return False
-            
-            # Modern format: Y=100 with side="bottom"
-            if y >= 80 and side == "bottom":
-                return False
-        
-        # Fallback: Check average Y
-        y_values = [g.get("y", 50) for g in grips]
-        avg_y = sum(y_values) / len(y_values)
-        
-        # If average is exactly 50, check for extreme values
-        if 45 <= avg_y <= 55:
-            has_high = any(y >= 90 for y in y_values)
-            has_low = any(y <= 10 for y in y_values)
-            
-            # If we have both high and low extremes, it's likely legacy format
-            if has_high and has_low:
-                return True
-        
-        should_invert = avg_y > 50
-        
-        # Debug output for problematic components
-        comp_name = self.config.get("name", "Unknown")
-        debug_components = ["Butterfly Valve", "Float Valve", "Separators for Liquids, Decanter", 
-                          "Fixed Roof Tank", "Jaw Crusher"]
-        
-        if any(name in comp_name for name in debug_components):
-            print(f"[INVERT] {comp_name}:")
-            print(f"  Grips: {[(g.get('x'), g.get('y'), g.get('side')) for g in grips]}")
-            print(f"  Avg Y: {avg_y:.1f}, Should Invert: {should_invert}")
-        
-        return should_invert
-    
+        return grip_registry.should_invert_y_axis(self.get_grips(), self.config.get("name", "Unknown"))
+
+    def grip_offsets(self):
+        """Normalized grip table [u0, v0, u1, v1, ...] shared by every instance with the same grips."""
+        if self._cached_grip_offsets is None:
+            self._cached_grip_offsets = grip_registry.grip_offsets(
+                self.get_grips(), self.config.get("name", "Unknown"))
+        return self._cached_grip_offsets
+
+    def _visual_svg_rect(self):
+        # Rect from the last paint if available, otherwise calculate
+        if self._cached_svg_rect:
+            return self._cached_svg_rect
+        return self.calculate_svg_rect(self.get_content_rect())
+
+    def _logical_svg_frame(self):
+        """Logical SVG rect (x, y, w, h), computed once per symbol and logical size."""
+        l_w = self.logical_rect.width()
+        l_h = self.logical_rect.height()
+        bottom_pad = 25 if self.config.get('default_label') else 10
+        key = (self.svg_path, l_w, l_h, bottom_pad)
+        frame = _logical_svg_frames.get(key)
+        if frame is None:
+            # Replicate get_content_rect logic but using logical size
+            w = max(1, l_w - 20)
+            h = max(1, l_h - 10 - bottom_pad)
+            rect = self.calculate_svg_rect(QRectF(10, 10, w, h))
+            frame = _logical_svg_frames[key] = (rect.x(), rect.y(), rect.width(), rect.height())
+        return frame
+
     def load_grips_from_csv(self):
         """
         Load grips from Component_Details.csv using s_no for unique matching.
         Falls back to object name if s_no is not available.
         Returns a list, None, or False (False means "checked CSV but no valid grips").
         """
-        # Priority 1: Match by s_no (most specific)
         s_no = self.config.get("s_no", "").strip()
         object_name = self.config.get("object", "").strip()
-        
-        if not s_no and not object_name:
-            return None
-
-        csv_path = os.path.join("ui", "assets", "Component_Details.csv")
-        if not os.path.exists(csv_path):
-            return None
-
-        try:
-            with open(csv_path, "r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    matched = False
-                    
-                    # Try matching by s_no first (unique identifier)
-                    if s_no and row.get("s_no", "").strip() == s_no:
-                        matched = True
-                    # Fallback: match by object name
-                    elif not s_no and object_name and row.get("object", "").strip() == object_name:
-                        matched = True
-                    
-                    if matched:
-                        grips_str = row.get("grips", "").strip()
-                        
-                        # Check if grips field is empty or just "[]"
-                        if not grips_str or grips_str == "[]" or grips_str == "":
-                            print(f"[CSV] No grips for {self.config.get('name')} - will try JSON")
-                            return False  # Signal: "CSV checked, but no valid grips"
-                        
-                        # Try to parse valid grips
-                        try:
-                            parsed = json.loads(grips_str.replace("'", '"'))
-                            if isinstance(parsed, list) and len(parsed) > 0:
-                                print(f"[CSV] ✓ Loaded grips for {self.config.get('name')} from CSV")
-                                return parsed
-                            else:
-                                print(f"[CSV] Empty grips list for {self.config.get('name')} - will try JSON")
-                                return False
-                        except:
-                            print(f"[CSV] Invalid JSON for {self.config.get('name')} - will try JSON")
-                            return False
-                            
-        except Exception as e:
-            print("[CSV ERROR]", e)
-
-        return None  # Component not found in CSV
-
+        return grip_registry.csv_grips(s_no, object_name, self.config.get("name"))
 
     def load_grips_from_json(self):
         """
         Load grips from grips.json.
         Used for standard components where CSV might be empty or missing grips.
         """
-        json_path = os.path.join("ui", "assets", "grips.json")
-        
-        if not os.path.exists(json_path):
-            return None
-
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                
-            # Match current component name to 'component' field in JSON
-            current_name = self.config.get("name", "").strip()
-
-            for entry in data:
-                if entry.get("component") == current_name:
-                    grips = entry.get("grips")
-                    if isinstance(grips, list) and len(grips) > 0:
-                        print(f"[JSON] ✓ Loaded grips for {current_name} from grips.json")
-                        return grips
-                    else:
-                        print(f"[JSON] Empty grips for {current_name}")
-                        return None
-                        
-        except Exception as e:
-            print("[GRIPS JSON ERROR]", e)
-            return None
-        
-        return None
+        return grip_registry.json_grips(self.config.get("name", "").strip())
 
     def get_grips(self):
         """
@@ -363,18 +272,25 @@ class ComponentWidget(QWidget):
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
+        # Cache it for grip calculations
+        self._cached_svg_rect = self.paint_symbol(painter, self.size())
 
+    def paint_symbol(self, painter, size):
+        """
+        Draw the component (border, symbol, label, ports) at visual `size`
+        with its top-left at the painter origin. Used by paintEvent and by
+        the canvas' scene mode. Returns the SVG render rect.
+        """
         # Selection Border
         if self.is_selected:
             painter.setPen(QPen(QColor("#60a5fa"), 2))
             painter.setBrush(Qt.NoBrush)
-            painter.drawRoundedRect(self.rect().adjusted(1, 1, -1, -1), 8, 8)
+            painter.drawRoundedRect(QRectF(0, 0, size.width(), size.height()).adjusted(1, 1, -1, -1), 8, 8)
 
-        content_rect = self.get_content_rect()
+        content_rect = self.get_content_rect(size)
 
         # Calculate actual SVG render rectangle
         svg_rect = self.calculate_svg_rect(content_rect)
-        self._cached_svg_rect = svg_rect  # Cache it for grip calculations
 
         # DARK MODE ADAPTATION: Draw background plate if needed
         # Import inside method to avoid circular imports if any, or rely on global import
@@ -388,25 +304,28 @@ class ComponentWidget(QWidget):
             bg_rect = svg_rect.adjusted(-5, -5, 5, 5)
             painter.drawRoundedRect(bg_rect, 6, 6)
 
-        # Render SVG
-        self.renderer.render(painter, svg_rect)
+        # Render SVG (blitted from the shared rasterization cache)
+        zoom = getattr(self.parent(), "zoom_level", 1.0)
+        draw_symbol(painter, self.svg_path, svg_rect, zoom)
 
         # Label
         if self.config.get('default_label'):
             label_color = Qt.white if app_state.current_theme == "dark" else Qt.black
             painter.setPen(QPen(label_color))
-            text_rect = QRectF(0, content_rect.bottom() + 2, self.width(), 20)
+            text_rect = QRectF(0, content_rect.bottom() + 2, size.width(), 20)
             painter.drawText(text_rect, Qt.AlignCenter, self.config['default_label'])
 
         # Draw Ports using SVG coordinate mapping
         grips = self.get_grips()
         for idx, grip in enumerate(grips):
             self.draw_dynamic_port(painter, grip, idx, svg_rect)
+        return svg_rect
 
     def draw_dynamic_port(self, painter, grip, idx, svg_rect):
         """Draw port based on SVG viewBox coordinate mapping"""
-        pos = self.map_svg_to_widget_coords(grip["x"], grip["y"], svg_rect)
-        center = QPoint(int(pos.x()), int(pos.y()))
+        offsets = self.grip_offsets()
+        center = QPoint(int(svg_rect.x() + offsets[2 * idx] * svg_rect.width()),
+                        int(svg_rect.y() + offsets[2 * idx + 1] * svg_rect.height()))
 
         radius = 6 if self.hover_port == idx else 4
         color = QColor("#22c55e") if self.hover_port == idx else QColor("cyan")
@@ -429,47 +348,22 @@ class ComponentWidget(QWidget):
 
     def get_grip_position(self, idx):
         """Get grip position using SVG coordinate mapping"""
-        grips = self.get_grips()
+        offsets = self.grip_offsets()
 
-        if 0 <= idx < len(grips):
-            grip = grips[idx]
-            
-            # Use cached SVG rect if available, otherwise calculate
-            if self._cached_svg_rect:
-                svg_rect = self._cached_svg_rect
-            else:
-                content_rect = self.get_content_rect()
-                svg_rect = self.calculate_svg_rect(content_rect)
-            
-            pos = self.map_svg_to_widget_coords(grip["x"], grip["y"], svg_rect)
-            return QPoint(int(pos.x()), int(pos.y()))
+        if 0 <= idx < len(offsets) // 2:
+            svg_rect = self._visual_svg_rect()
+            return QPoint(int(svg_rect.x() + offsets[2 * idx] * svg_rect.width()),
+                          int(svg_rect.y() + offsets[2 * idx + 1] * svg_rect.height()))
 
         return QPoint(0, 0)
 
     def get_logical_grip_position(self, idx):
         """Get grip position in LOGICAL coordinates (unscaled)."""
-        grips = self.get_grips()
+        offsets = self.grip_offsets()
 
-        if 0 <= idx < len(grips):
-            grip = grips[idx]
-            
-            # Calculate Logical Content Rect
-            # Replicate get_content_rect logic but using logical size
-            l_w = self.logical_rect.width()
-            l_h = self.logical_rect.height()
-            
-            bottom_pad = 25 if self.config.get('default_label') else 10
-            w = max(1, l_w - 20)
-            h = max(1, l_h - 10 - bottom_pad)
-            
-            logical_content_rect = QRectF(10, 10, w, h)
-            
-            # Calculate Logical SVG Rect
-            logical_svg_rect = self.calculate_svg_rect(logical_content_rect)
-            
-            # Map to coordinates
-            pos = self.map_svg_to_widget_coords(grip["x"], grip["y"], logical_svg_rect)
-            return QPointF(pos.x(), pos.y())
+        if 0 <= idx < len(offsets) // 2:
+            x, y, w, h = self._logical_svg_frame()
+            return QPointF(x + offsets[2 * idx] * w, y + offsets[2 * idx + 1] * h)
 
         return QPointF(0, 0)
 
@@ -536,18 +430,12 @@ class ComponentWidget(QWidget):
         prev = self.hover_port
         self.hover_port = None
 
-        grips = self.get_grips()
-        
-        # Use cached SVG rect if available
-        if self._cached_svg_rect:
-            svg_rect = self._cached_svg_rect
-        else:
-            content_rect = self.get_content_rect()
-            svg_rect = self.calculate_svg_rect(content_rect)
+        offsets = self.grip_offsets()
+        svg_rect = self._visual_svg_rect()
+        x, y, w, h = svg_rect.x(), svg_rect.y(), svg_rect.width(), svg_rect.height()
 
-        for idx, grip in enumerate(grips):
-            grip_pos = self.map_svg_to_widget_coords(grip["x"], grip["y"], svg_rect)
-            center = QPoint(int(grip_pos.x()), int(grip_pos.y()))
+        for idx in range(len(offsets) // 2):
+            center = QPoint(int(x + offsets[2 * idx] * w), int(y + offsets[2 * idx + 1] * h))
 
             if (pos - center).manhattanLength() < 10:
                 self.hover_port = idx
@@ -564,8 +452,10 @@ class ComponentWidget(QWidget):
             parent = self.parent()
             if parent and hasattr(parent, "components"):
                 # move all selected
+                moved = []
                 for comp in parent.components:
                     if comp.is_selected:
+                        moved.append(comp)
                         # Update LOGICAL position
                         # new_pos is visual. Convert to logical.
                         z = parent.zoom_level if hasattr(parent, "zoom_level") else 1.0
@@ -582,7 +472,10 @@ class ComponentWidget(QWidget):
                         # Auto-Expand
                         if hasattr(parent, "expand_to_contain"):
                             parent.expand_to_contain(comp.logical_rect)
-                        
+
+                # Re-route the attached pipes once for the whole selection
+                if hasattr(parent, "reroute_components"):
+                    parent.reroute_components(moved)
                 parent.update()
             else:
                  # Single item move (fallback)
@@ -642,9 +535,20 @@ class ComponentWidget(QWidget):
         v_w = int(self.logical_rect.width() * zoom_level)
         v_h = int(self.logical_rect.height() * zoom_level)
         
-        # Apply
-        self.setFixedSize(v_w, v_h)
-        self.move(v_x, v_y)
+        # Apply (in scene mode the canvas draws the component itself and
+        # the hidden widget's geometry isn't used)
+        if not getattr(self.parent(), "scene_mode", False):
+            self.setFixedSize(v_w, v_h)
+            self.move(v_x, v_y)
+
+        # Every logical move/resize ends up here: flag attached routes dirty
+        if self.logical_rect != self._versioned_rect:
+            self._versioned_rect = QRectF(self.logical_rect)
+            self.geometry_version += 1
+            # Re-file in the canvas' spatial index
+            index = getattr(self.parent(), "component_index", None)
+            if index is not None:
+                index.move(self)
 
     # ---------------------- SERIALIZATION ----------------------
     def to_dict(self):
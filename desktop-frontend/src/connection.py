@@ -2,6 +2,8 @@ from PyQt5.QtCore import QPoint, QPointF, QRectF, Qt, QLineF, QSizeF
 from PyQt5.QtGui import QPainterPath, QColor, QPen, QBrush, QPolygonF
 import math
 
+from src.router import SearchBudget, route_around_obstacles, refresh_obstacles
+
 class Connection:
     def __init__(self, start_component, start_grip_index, start_side):
         self.start_component = start_component
@@ -28,6 +30,26 @@ class Connection:
         self.start_adjust = 0.0 # Moves the start stub (ns)
         self.end_adjust = 0.0 # Moves the end stub (pe)
 
+        # Database id of the matching backend connection (None until saved)
+        self.backend_id = None
+
+        # Route cache: inputs the current self.path was computed from and a
+        # counter bumped on every re-route. The jump arcs in painter_path
+        # remember the connection order, route version and path they were
+        # built for (see refresh_connection_paths)
+        self._route_key = None
+        self.route_version = 0
+        self._jump_order = None
+        self._jump_route_version = None
+        self._jumped_path = []
+        # Obstacle routing: corridor searched, ids of the components in it,
+        # and the component list it was last checked against (src/router.py)
+        self._route_corridor = None
+        self._route_obstacles = frozenset()
+        self._route_members = None
+        # Blocked route still waiting for its obstacle search (see SearchBudget)
+        self._route_deferred = False
+
     def set_end_grip(self, component, grip_index, side):
         self.end_component = component
         self.end_grip_index = grip_index
@@ -88,10 +110,12 @@ class Connection:
                         return i
         return -1
 
-    def calculate_path(self, obstacles=None):
+    def calculate_path(self, obstacles=None, budget=None):
         """
         Ports the Rule-Based Orthogonal Routing logic from the reference project.
         Determines the path points based on start/end positions and grip directions.
+        `obstacles` (a component list or ComponentIndex) enables routing around
+        equipment, limited by `budget` (a router.SearchBudget) if given.
         """
         self.path = [] # Reset
         start_point = QPointF(self.get_start_pos())
@@ -288,6 +312,13 @@ class Connection:
         points.append(end_point)
         self.path = points
 
+        # Finished pipes steer around equipment instead of cutting through it
+        if obstacles is not None and self.end_component is not None:
+            self.path, self._route_corridor, self._route_obstacles = route_around_obstacles(
+                self, points, ns, pe, target_side, obstacles, budget
+            )
+            self._route_members = None
+
 
 
     def _guess_approach_side(self, start, end):
@@ -307,16 +338,57 @@ class Connection:
         2. Generate visual path with Jumps (QPainterPath)
         """
         self.calculate_path(components)
+        self._route_key = self._route_inputs()
+        self.route_version += 1
         self._generate_jump_path(other_connections)
 
-    def _generate_jump_path(self, other_connections):
+    def _route_inputs(self):
+        """Everything calculate_path depends on, as a comparable key."""
+        def endpoint(comp):
+            if comp is None:
+                return None
+            return (id(comp), getattr(comp, "geometry_version", 0))
+
+        # Without an end/snap component the route follows the mouse
+        free_end = None
+        if self.end_component is None and self.snap_component is None:
+            free_end = (self.current_pos.x(), self.current_pos.y())
+
+        return (
+            endpoint(self.start_component), self.start_grip_index, self.start_side,
+            endpoint(self.end_component), self.end_grip_index, self.end_side,
+            endpoint(self.snap_component), self.snap_grip_index, self.snap_side,
+            free_end, self.path_offset, self.start_adjust, self.end_adjust,
+        )
+
+    def refresh_route(self, components, budget=None):
+        """Re-run calculate_path only if its inputs changed. Returns True if it did."""
+        key = self._route_inputs()
+        if key == self._route_key and not self._route_deferred:
+            return False
+        self._route_deferred = False
+        self.calculate_path(components, budget)
+        self._route_key = key
+        self.route_version += 1
+        return True
+
+    def invalidate_route(self):
+        """Force a re-route on the next paint (e.g. after grips changed)."""
+        self._route_key = None
+        self._route_corridor = None
+
+    def _generate_jump_path(self, other_connections, index=None):
         """
         Converts self.path (points) into self.painter_path (QPainterPath)
         with semi-circle jumps over intersecting connections.
+        `index` is a SegmentIndex over other_connections; pass one when
+        regenerating many connections so it is built once.
         """
         self.painter_path = QPainterPath()
         if not self.path:
             return
+        if index is None:
+            index = SegmentIndex(other_connections)
 
         self.painter_path.moveTo(self.path[0])
         
@@ -339,40 +411,13 @@ class Connection:
             # We collect (distance_from_p1, intersection_point)
             intersections = []
             
-            current_seg = QLineF(p1, p2)
-            
-            for other in other_connections:
-                if other == self: continue
-
-                # Order-Based Jump Logic:
-                # If I am older (lower index) than the other connection, I go straight (don't detect intersection).
-                if self in other_connections:
-                     my_index = other_connections.index(self)
-                     # other is guaranteed to be in other_connections because we are iterating it
-                     other_index = other_connections.index(other) # No try/except needed hopefully
-                     
-                     if my_index < other_index:
-                         continue
-                # iterate other's segments
-                # We use raw points from other.path to be robust
-                if not other.path: continue
-                for j in range(len(other.path) - 1):
-                    op1 = other.path[j]
-                    op2 = other.path[j+1]
-                    other_seg = QLineF(op1, op2)
-                    
-                    # Intersect?
-                    intersection_point = QPointF()
-                    type_ = current_seg.intersect(other_seg, intersection_point)
-                    
-                    if type_ == QLineF.BoundedIntersection:
-                        # Check if it's a real crossing, not just touching endpoints
-                        # and not collinear overlaps
-                        dist = math.sqrt((intersection_point.x() - p1.x())**2 + (intersection_point.y() - p1.y())**2)
-                        
-                        # Filter out hits too close to start/end of segment (corners)
-                        if r < dist < (length - r):
-                            intersections.append(dist)
+            # Order-Based Jump Logic:
+            # If I am older (lower index) than the other connection, I go straight
+            # (don't detect intersection): only crossings with older pipes count.
+            for dist in index.crossing_distances(self, p1, p2):
+                # Filter out hits too close to start/end of segment (corners)
+                if r < dist < (length - r):
+                    intersections.append(dist)
 
             intersections.sort()
             
@@ -565,3 +610,215 @@ class Connection:
             "start_adjust": self.start_adjust,
             "end_adjust": self.end_adjust
         }
+
+
+def refresh_connection_paths(connections, components, index=None, changed=None, moved=None,
+                             obstacles=None, searches=None):
+    """
+    Paint-time update for all finished connections: re-route only those whose
+    inputs changed, then rebuild jump arcs only where they can have changed.
+
+    A pipe jumps over the older pipes (earlier in the list) it crosses. While
+    the list keeps its order, a re-routed pipe can only add or remove jumps of
+    pipes lying in the grid cells of its old or new route; adding, removing
+    or reordering pipes rebuilds every jump.
+
+    `index` is a SegmentIndex kept between calls by the caller; it is synced
+    here instead of being rebuilt. When the caller knows what moved (a drag),
+    `changed` limits re-routing to those connections and `moved` limits the
+    obstacle check to those components; anything else is picked up by the
+    next full refresh.
+
+    `obstacles` is the canvas' ComponentIndex (defaults to scanning
+    `components`). `searches` caps the obstacle searches run by this call;
+    pipes over the cap keep their rule-based route until a later call has
+    searches to spare. Returns how many are still waiting, so a paint can
+    schedule another frame.
+    """
+    invalidated = refresh_obstacles(connections, components, moved)
+    if changed is None:
+        candidates = connections
+    else:
+        candidates = set(changed)
+        candidates.update(invalidated)
+    budget = SearchBudget(searches) if searches is not None else None
+    if obstacles is None:
+        obstacles = components
+    for conn in candidates:
+        if conn._route_deferred and budget is not None and budget.searches <= 0:
+            # Still waiting: keep drawing its rule-based route as is
+            budget.deferred.append(conn)
+            continue
+        conn.refresh_route(obstacles, budget)
+    deferred = budget.deferred if budget is not None else []
+    for conn in deferred:
+        conn._route_deferred = True
+
+    order = hash(tuple(map(id, connections)))
+    stale = [
+        conn for conn in candidates
+        if conn._jump_order != order or conn._jump_route_version != conn.route_version
+    ]
+    # Routes still waiting for a search will change again on the next calls:
+    # with a kept index, the jumps of pipes around the changed routes are
+    # rebuilt once they have all settled instead of after every batch
+    settling = bool(deferred) and index is not None
+    flush = index is not None and not deferred and bool(index.unsettled_cells)
+    if not stale and not flush:
+        return len(deferred)
+
+    if index is None:
+        index = SegmentIndex(connections)
+    else:
+        index.sync(connections, order)
+    if any(conn._jump_order != order for conn in stale):
+        targets = connections
+        index.unsettled_cells = set()
+    else:
+        cells = set()
+        for conn in stale:
+            cells.update(index.path_cells(conn._jumped_path))
+            cells.update(index.path_cells(conn.path))
+        targets = set(stale)
+        if settling:
+            index.unsettled_cells.update(cells)
+        else:
+            cells.update(index.unsettled_cells)
+            index.unsettled_cells = set()
+            nearby = {seg[0] for cell in cells for seg in index.cells.get(cell, ())}
+            targets.update(connections[ordinal] for ordinal in nearby)
+
+    for conn in targets:
+        conn._generate_jump_path(connections, index)
+        conn._jump_order = order
+        conn._jump_route_version = conn.route_version
+        conn._jumped_path = conn.path
+    return len(deferred)
+
+
+class SegmentIndex:
+    """
+    Uniform grid over the route segments of a list of connections, plus each
+    connection's position in the list (its ordinal: older pipes come first).
+    Lets jump detection look only at segments near a given one instead of
+    every segment of every other connection.
+    """
+
+    CELL = 100.0  # logical px
+
+    def __init__(self, connections=()):
+        self.ordinals = {}
+        self.cells = {}
+        # Path each ordinal was indexed with, for sync()
+        self.paths = []
+        # Cells whose pipes' jumps wait for deferred routes to settle
+        self.unsettled_cells = set()
+        self.order = hash(tuple(map(id, connections)))
+        for ordinal, conn in enumerate(connections):
+            self.ordinals.setdefault(conn, ordinal)
+            self.paths.append(conn.path)
+            self._add(ordinal, conn.path)
+
+    def _add(self, ordinal, path):
+        for j in range(len(path) - 1):
+            p1, p2 = path[j], path[j + 1]
+            seg = (ordinal, p1.x(), p1.y(), p2.x(), p2.y())
+            for cell in self._cells(p1.x(), p1.y(), p2.x(), p2.y()):
+                self.cells.setdefault(cell, []).append(seg)
+
+    def _remove(self, ordinal, path):
+        for cell in self.path_cells(path):
+            segs = self.cells.get(cell)
+            if segs:
+                segs[:] = [seg for seg in segs if seg[0] != ordinal]
+
+    def sync(self, connections, order=None):
+        """
+        Catch up with re-routed connections (a route is replaced, never edited
+        in place). A changed connection list means new ordinals: rebuild.
+        """
+        if order is None:
+            order = hash(tuple(map(id, connections)))
+        if order != self.order:
+            self.__init__(connections)
+            return
+        for ordinal, conn in enumerate(connections):
+            if conn.path is not self.paths[ordinal]:
+                self._remove(ordinal, self.paths[ordinal])
+                self._add(ordinal, conn.path)
+                self.paths[ordinal] = conn.path
+
+    def _cells(self, x1, y1, x2, y2):
+        size = self.CELL
+        x0, x1 = (x1, x2) if x1 <= x2 else (x2, x1)
+        y0, y1 = (y1, y2) if y1 <= y2 else (y2, y1)
+        for cx in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for cy in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                yield (cx, cy)
+
+    def ordinals_near(self, x, y, radius):
+        """Ordinals (ascending) of connections with a segment within radius of (x, y)."""
+        found = set()
+        for cell in self._cells(x - radius, y - radius, x + radius, y + radius):
+            for ordinal, x1, y1, x2, y2 in self.cells.get(cell, ()):
+                if (min(x1, x2) - radius <= x <= max(x1, x2) + radius
+                        and min(y1, y2) - radius <= y <= max(y1, y2) + radius):
+                    found.add(ordinal)
+        return sorted(found)
+
+    def path_cells(self, path):
+        cells = set()
+        for j in range(len(path) - 1):
+            p1, p2 = path[j], path[j + 1]
+            cells.update(self._cells(p1.x(), p1.y(), p2.x(), p2.y()))
+        return cells
+
+    def _candidates(self, conn, x1, y1, x2, y2):
+        """
+        Segments near (x1, y1)-(x2, y2) that conn may have to jump over: those
+        of connections listed before conn, or of all others if conn isn't
+        listed (e.g. the connection being drawn).
+        """
+        mine = self.ordinals.get(conn)
+        seen = set()
+        for cell in self._cells(x1, y1, x2, y2):
+            for seg in self.cells.get(cell, ()):
+                if mine is not None and seg[0] >= mine:
+                    continue
+                if id(seg) in seen:
+                    continue
+                seen.add(id(seg))
+                yield seg
+
+    def crossing_distances(self, conn, p1, p2):
+        """Distances from p1 at which segment p1-p2 crosses older segments."""
+        x1, y1, x2, y2 = p1.x(), p1.y(), p2.x(), p2.y()
+        horizontal = y1 == y2
+        vertical = x1 == x2
+        current_seg = None
+        distances = []
+
+        for _, ox1, oy1, ox2, oy2 in self._candidates(conn, x1, y1, x2, y2):
+            # Routes are orthogonal: a horizontal/vertical pair crosses iff
+            # each one's fixed coordinate lies within the other's span
+            if horizontal and ox1 == ox2:
+                if min(x1, x2) <= ox1 <= max(x1, x2) and min(oy1, oy2) <= y1 <= max(oy1, oy2):
+                    distances.append(abs(ox1 - x1))
+                continue
+            if vertical and oy1 == oy2:
+                if min(y1, y2) <= oy1 <= max(y1, y2) and min(ox1, ox2) <= x1 <= max(ox1, ox2):
+                    distances.append(abs(oy1 - y1))
+                continue
+            if (horizontal and oy1 == oy2) or (vertical and ox1 == ox2):
+                # Parallel (or collinear overlap): not a crossing
+                continue
+
+            # Slanted segment (free end while drawing): general case
+            if current_seg is None:
+                current_seg = QLineF(p1, p2)
+            intersection_point = QPointF()
+            type_ = current_seg.intersect(QLineF(ox1, oy1, ox2, oy2), intersection_point)
+            if type_ == QLineF.BoundedIntersection:
+                distances.append(math.sqrt((intersection_point.x() - x1)**2 + (intersection_point.y() - y1)**2))
+
+        return distances
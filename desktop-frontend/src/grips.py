@@ -0,0 +1,243 @@
+"""
+Grip registry: symbol grip definitions from Component_Details.csv and
+grips.json, parsed once per process instead of once per placed component.
+
+The CSV is indexed by s_no and by object name, grips.json by component name.
+Each lookup checks the files' modification times, so edits (e.g. saved from
+the grip editor) are picked up by components created afterwards.
+
+The decision whether grip Y coordinates are in the legacy (inverted)
+convention is cached here too, together with a flat table of normalized grip
+offsets: a grip's position is then one affine transform of its (u, v) pair
+into the symbol's SVG rect. Both are keyed on the grip values, so every
+instance with the same grips shares them wherever its grip list came from.
+"""
+import csv
+import json
+import os
+from array import array
+
+CSV_PATH = os.path.join("ui", "assets", "Component_Details.csv")
+JSON_PATH = os.path.join("ui", "assets", "grips.json")
+
+
+class _WatchedFile:
+    """A parsed file, re-parsed when its mtime changes."""
+
+    def __init__(self, path, parse):
+        self.path = path
+        self.parse = parse
+        self.mtime = None
+        self.data = None
+
+    def get(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self.mtime, self.data = None, None
+            return None
+        if mtime != self.mtime:
+            self.data = self.parse(self.path)
+            self.mtime = mtime
+            _parsed_grips.clear()
+            _invert_cache.clear()
+            _offset_cache.clear()
+        return self.data
+
+
+def _parse_csv(path):
+    """{"s_no": {s_no: grips string}, "object": {object: grips string}}, first row wins."""
+    by_s_no, by_object = {}, {}
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                grips_str = row.get("grips", "").strip()
+                s_no = row.get("s_no", "").strip()
+                object_name = row.get("object", "").strip()
+                if s_no:
+                    by_s_no.setdefault(s_no, grips_str)
+                if object_name:
+                    by_object.setdefault(object_name, grips_str)
+    except Exception as e:
+        print("[CSV ERROR]", e)
+    return {"s_no": by_s_no, "object": by_object}
+
+
+def _parse_json(path):
+    """{component name: grips}, first entry wins."""
+    by_name = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for entry in data:
+            by_name.setdefault(entry.get("component"), entry.get("grips"))
+    except Exception as e:
+        print("[GRIPS JSON ERROR]", e)
+    return by_name
+
+
+_csv = _WatchedFile(CSV_PATH, _parse_csv)
+_json = _WatchedFile(JSON_PATH, _parse_json)
+# CSV grips string -> parsed list (shared, treat as read-only)
+_parsed_grips = {}
+# grips_key(grips) -> invert decision / offsets table
+_invert_cache = {}
+_offset_cache = {}
+
+
+def csv_grips(s_no, object_name, name=None):
+    """
+    Grips from Component_Details.csv, matched by s_no, or by object name when
+    there is no s_no. Returns a list, None (not in the CSV) or False (in the
+    CSV without valid grips).
+    """
+    if not s_no and not object_name:
+        return None
+    index = _csv.get()
+    if index is None:
+        return None
+
+    if s_no:
+        grips_str = index["s_no"].get(s_no)
+    else:
+        grips_str = index["object"].get(object_name)
+    if grips_str is None:
+        return None
+
+    # Check if grips field is empty or just "[]"
+    if not grips_str or grips_str == "[]":
+        print(f"[CSV] No grips for {name} - will try JSON")
+        return False
+    parsed = _parsed_grips.get(grips_str)
+    if parsed is None:
+        try:
+            parsed = json.loads(grips_str.replace("'", '"'))
+        except ValueError:
+            print(f"[CSV] Invalid JSON for {name} - will try JSON")
+            return False
+        _parsed_grips[grips_str] = parsed
+    if isinstance(parsed, list) and len(parsed) > 0:
+        print(f"[CSV] ✓ Loaded grips for {name} from CSV")
+        return parsed
+    print(f"[CSV] Empty grips list for {name} - will try JSON")
+    return False
+
+
+def json_grips(name):
+    """Grips from grips.json for a component name, or None."""
+    index = _json.get()
+    if index is None or name not in index:
+        return None
+    grips = index[name]
+    if isinstance(grips, list) and len(grips) > 0:
+        print(f"[JSON] ✓ Loaded grips for {name} from grips.json")
+        return grips
+    print(f"[JSON] Empty grips for {name}")
+    return None
+
+
+def grips_key(grips):
+    """Hashable key for a grip list: the values the invert decision and offsets depend on."""
+    return tuple((grip.get("x"), grip.get("y", 50), grip.get("side", "")) for grip in grips)
+
+
+def should_invert_y_axis(grips, name="Unknown"):
+    """Cached detect_inverted_y(grips)."""
+    key = grips_key(grips)
+    invert = _invert_cache.get(key)
+    if invert is None:
+        invert = _invert_cache[key] = detect_inverted_y(grips, name)
+    return invert
+
+
+def grip_offsets(grips, name="Unknown"):
+    """
+    Flat array [u0, v0, u1, v1, ...] of the grips as fractions of the SVG
+    rect, Y already flipped for legacy grips. Grip i of a symbol drawn into
+    rect (x, y, w, h) sits at (x + u_i * w, y + v_i * h).
+    """
+    key = grips_key(grips)
+    offsets = _offset_cache.get(key)
+    if offsets is not None:
+        return offsets
+    invert = should_invert_y_axis(grips, name)
+    offsets = array("d")
+    for grip in grips:
+        v = grip["y"] / 100.0
+        offsets.append(grip["x"] / 100.0)
+        offsets.append(1.0 - v if invert else v)
+    _offset_cache[key] = offsets
+    return offsets
+
+
+def detect_inverted_y(grips, name="Unknown"):
+    """
+    Detect if Y-axis should be inverted based on grip coordinates.
+
+    COORDINATE SYSTEM RULES:
+
+    LEGACY JSON (needs inversion):
+    - Y=100 or Y>90 → Visual TOP
+    - Y=0 or Y<10 → Visual BOTTOM
+    - Y=50 → Visual MIDDLE
+
+    MODERN GRIP EDITOR (no inversion):
+    - Y=0 or Y<10 → Visual TOP
+    - Y=100 or Y>90 → Visual BOTTOM
+    - Y=50 → Visual MIDDLE
+
+    DETECTION STRATEGY:
+    1. If we have grips with Y≈100 marked as "top" → INVERT (legacy)
+    2. If we have grips with Y≈0 marked as "top" → DON'T INVERT (modern)
+    3. If we have grips with Y≈0 marked as "bottom" → INVERT (legacy)
+    4. Otherwise use average: avg Y > 50 → INVERT
+    """
+    if not grips:
+        return False
+
+    # Check for side hints (most reliable)
+    for grip in grips:
+        y = grip.get("y", 50)
+        side = grip.get("side", "")
+
+        # Legacy format: Y=100 with side="top"
+        if y >= 80 and side == "top":
+            return True
+
+        # Legacy format: Y=0 with side="bottom"
+        if y <= 20 and side == "bottom":
+            return True
+
+        # Modern format: Y=0 with side="top"
+        if y <= 20 and side == "top":
+            return False
+
+        # Modern format: Y=100 with side="bottom"
+        if y >= 80 and side == "bottom":
+            return False
+
+    # Fallback: Check average Y
+    y_values = [g.get("y", 50) for g in grips]
+    avg_y = sum(y_values) / len(y_values)
+
+    # If average is exactly 50, check for extreme values
+    if 45 <= avg_y <= 55:
+        has_high = any(y >= 90 for y in y_values)
+        has_low = any(y <= 10 for y in y_values)
+
+        # If we have both high and low extremes, it's likely legacy format
+        if has_high and has_low:
+            return True
+
+    should_invert = avg_y > 50
+
+    # Debug output for problematic components
+    debug_components = ["Butterfly Valve", "Float Valve", "Separators for Liquids, Decanter",
+                        "Fixed Roof Tank", "Jaw Crusher"]
+
+    if any(debug_name in name for debug_name in debug_components):
+        print(f"[INVERT] {name}:")
+        print(f"  Grips: {[(g.get('x'), g.get('y'), g.get('side')) for g in grips]}")
+        print(f"  Avg Y: {avg_y:.1f}, Should Invert: {should_invert}")
+
+    return should_invert
@@ -9,6 +9,7 @@ from src.theme import apply_theme_to_screen
 from src.theme_manager import theme_manager
 from src.navigation import slide_to_index
 from src import api_client
+from src.api_worker import run_async
 from datetime import datetime
 import src.app_state as app_state
 
@@ -249,13 +250,34 @@ class LandingPage(QWidget):
             return ""
         
     def load_recent_projects(self):
-        """Load recent projects from backend API."""
+        """Load recent projects from backend API (in the background)."""
+        self._clear_recent()
+
+        loading = QLabel("Loading projects...")
+        loading.setAlignment(Qt.AlignCenter)
+        loading.setObjectName("emptyRecent")
+        self.recent_layout.addWidget(loading)
+
+        # Only the latest request may fill the list
+        if getattr(self, "_projects_task", None):
+            self._projects_task.cancel()
+        self._projects_task = run_async(
+            api_client.get_projects,
+            on_success=self._show_recent_projects,
+            on_error=lambda _msg: self._show_recent_projects([]),
+        )
+
+    def _clear_recent(self):
         while self.recent_layout.count():
             item = self.recent_layout.takeAt(0)
             if item.widget():
                 item.widget().deleteLater()
 
-        projects = api_client.get_projects()
+    def _show_recent_projects(self, projects):
+        self._projects_task = None
+        self._clear_recent()
+
+        projects = projects or []
         print(f"[DEBUG] Got {len(projects)} projects")
         print(f"[DEBUG] First project: {projects[0] if projects else 'None'}")
 
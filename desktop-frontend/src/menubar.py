@@ -20,6 +20,8 @@ class MenuBarManager(QObject):
     
     generate_excel_clicked = pyqtSignal()
     generate_report_clicked = pyqtSignal()
+
+    lightweight_rendering_toggled = pyqtSignal(bool)
     
     logout_clicked = pyqtSignal()
 
@@ -85,6 +87,14 @@ class MenuBarManager(QObject):
         add_symbols_action.triggered.connect(self.add_symbols_clicked.emit)
         edit_menu.addAction(add_symbols_action)
 
+        # --- View Menu ---
+        view_menu = menubar.addMenu("View")
+
+        self.lightweight_action = QAction("Lightweight Rendering", self.main_window)
+        self.lightweight_action.setCheckable(True)
+        self.lightweight_action.toggled.connect(self.lightweight_rendering_toggled.emit)
+        view_menu.addAction(self.lightweight_action)
+
         # --- Generate Menu ---
         generate_menu = menubar.addMenu("Generate")
 
@@ -0,0 +1,368 @@
+"""
+Obstacle-aware orthogonal routing for connections.
+
+Connection.calculate_path first builds its rule-based route (fixed patterns
+over start/end sides). If that route doesn't cut through any equipment it is
+kept as is; that's the common case and costs one rectangle test per segment
+and nearby component. Otherwise the pipe is routed with A* over a sparse
+orthogonal grid whose lines are the edges of the nearby components (grown by
+ROUTE_MARGIN), the stub points and the corridor bounds, minimising length
+plus a fixed cost per bend.
+
+Only components in a corridor around the route are considered, and the
+corridor is remembered with the route so refresh_obstacles() can tell which
+cached routes a moved component may affect.
+
+Searches are the expensive part, so a paint only runs SEARCHES_PER_FRAME of
+them (see SearchBudget): pipes over the budget are drawn with their
+rule-based route for now and routed on the following frames.
+"""
+import bisect
+import heapq
+import math
+
+from PyQt5.QtCore import QPointF, QRectF
+
+# Clearance kept between pipes and equipment
+ROUTE_MARGIN = 15.0
+# Extra room around the direct route where detours are searched first
+CORRIDOR_MARGIN = 150.0
+# A bend costs as much as this many px of pipe
+BEND_COST = 40.0
+# How often a failed search retries with a wider corridor
+CORRIDOR_RETRIES = 2
+# Give up on a search (keep the rule-based route) after this many nodes
+MAX_EXPANSIONS = 4000
+# A* searches one canvas paint may run
+SEARCHES_PER_FRAME = 8
+
+# Directions: unit steps in x/y
+RIGHT, LEFT, DOWN, UP = (1, 0), (-1, 0), (0, 1), (0, -1)
+SIDE_OUT = {"right": RIGHT, "left": LEFT, "bottom": DOWN, "top": UP}
+# Direction of travel when entering a grip on the given side
+SIDE_IN = {"left": RIGHT, "right": LEFT, "top": DOWN, "bottom": UP}
+
+
+class SearchBudget:
+    """
+    Caps the A* searches of one refresh. Routes over the cap keep their
+    rule-based path and are listed in `deferred` for a later refresh.
+    """
+
+    def __init__(self, searches=SEARCHES_PER_FRAME):
+        self.searches = searches
+        self.deferred = []
+
+
+def _nearby(obstacles, corridor):
+    """Components intersecting corridor; obstacles is a list or a ComponentIndex."""
+    within = getattr(obstacles, "within", None)
+    if within is not None:
+        return list(within(corridor))
+    return [c for c in obstacles if c.logical_rect.intersects(corridor)]
+
+
+def _bounds(points, rects):
+    xs = [p.x() for p in points] + [r.left() for r in rects] + [r.right() for r in rects]
+    ys = [p.y() for p in points] + [r.top() for r in rects] + [r.bottom() for r in rects]
+    return QRectF(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+
+def _strictly_inside(x, y, rect):
+    return rect.left() < x < rect.right() and rect.top() < y < rect.bottom()
+
+
+def _segment_hits(p1, p2, rect):
+    """Whether axis-aligned segment p1-p2 passes through the interior of rect."""
+    if p1.y() == p2.y():
+        y = p1.y()
+        lo, hi = sorted((p1.x(), p2.x()))
+        return rect.top() < y < rect.bottom() and lo < rect.right() and hi > rect.left()
+    if p1.x() == p2.x():
+        x = p1.x()
+        lo, hi = sorted((p1.y(), p2.y()))
+        return rect.left() < x < rect.right() and lo < rect.bottom() and hi > rect.top()
+    # Not orthogonal: test the bounding box
+    return _bounds([p1, p2], []).intersects(rect)
+
+
+def path_is_clear(path, obstacles, start_rect, end_rect):
+    """
+    True if no segment of path crosses equipment (a component list or a
+    ComponentIndex, which is asked only about each segment's surroundings).
+    The first and last segments leave/enter their own component, so those
+    two rects are exempt there.
+    """
+    within = getattr(obstacles, "within", None)
+    last = len(path) - 2
+    for i in range(len(path) - 1):
+        p1, p2 = path[i], path[i + 1]
+        # (grown: Qt never reports a zero-height/width rect as intersecting)
+        nearby = obstacles if within is None else within(_bounds([p1, p2], []).adjusted(-1, -1, 1, 1))
+        for comp in nearby:
+            rect = comp.logical_rect
+            if i == 0 and rect is start_rect:
+                continue
+            if i == last and rect is end_rect:
+                continue
+            if _segment_hits(p1, p2, rect):
+                return False
+    return True
+
+
+class _Grid:
+    """
+    Sparse orthogonal grid (Hanan grid) over obstacle edges. Every rect edge
+    is a grid line, so blocking is worked out once per cell: a cell is
+    occupied if it lies inside an obstacle, and a node or edge is blocked
+    when all cells around it are occupied.
+    """
+
+    def __init__(self, corridor, rects, points):
+        xs = {corridor.left(), corridor.right()}
+        ys = {corridor.top(), corridor.bottom()}
+        for rect in rects:
+            xs.update((rect.left(), rect.right()))
+            ys.update((rect.top(), rect.bottom()))
+        for p in points:
+            xs.add(p.x())
+            ys.add(p.y())
+
+        self.xs = sorted(x for x in xs if corridor.left() <= x <= corridor.right())
+        self.ys = sorted(y for y in ys if corridor.top() <= y <= corridor.bottom())
+        self.x_index = {x: i for i, x in enumerate(self.xs)}
+        self.y_index = {y: j for j, y in enumerate(self.ys)}
+
+        # cells[i + 1][j + 1]: cell between xs[i]..xs[i+1] and ys[j]..ys[j+1],
+        # padded with a free border so lookups need no bounds checks
+        nx, ny = len(self.xs), len(self.ys)
+        self.cells = [[False] * (ny + 1) for _ in range(nx + 1)]
+        for rect in rects:
+            i0 = bisect.bisect_left(self.xs, rect.left())
+            i1 = min(bisect.bisect_left(self.xs, rect.right()), nx - 1)
+            j0 = bisect.bisect_left(self.ys, rect.top())
+            j1 = min(bisect.bisect_left(self.ys, rect.bottom()), ny - 1)
+            for i in range(i0, i1):
+                column = self.cells[i + 1]
+                for j in range(j0 + 1, j1 + 1):
+                    column[j] = True
+
+    def node_blocked(self, i, j):
+        left, right = self.cells[i], self.cells[i + 1]
+        return left[j] and right[j] and left[j + 1] and right[j + 1]
+
+    def edge_blocked(self, i, j, di, dj):
+        cells = self.cells
+        if dj == 0:
+            column = cells[min(i, i + di) + 1]
+            return column[j] and column[j + 1]
+        k = min(j, j + dj) + 1
+        return cells[i][k] and cells[i + 1][k]
+
+
+def _astar(grid, start, goal, start_dir, goal_dir):
+    """Cheapest orthogonal node path from start to goal (grid indices) or None."""
+    xs, ys = grid.xs, grid.ys
+    gx, gy = xs[goal[0]], ys[goal[1]]
+
+    def heuristic(i, j):
+        return abs(xs[i] - gx) + abs(ys[j] - gy)
+
+    origin = (start[0], start[1], start_dir)
+    best = {origin: 0.0}
+    came_from = {}
+    queue = [(heuristic(*start), 0.0, origin)]
+    expanded = 0
+    grid.capped = False
+
+    while queue:
+        _, cost, state = heapq.heappop(queue)
+        i, j, direction = state
+        if cost > best.get(state, math.inf):
+            continue
+        expanded += 1
+        if expanded > MAX_EXPANSIONS:
+            # Dense diagram: not worth stalling the paint for
+            grid.capped = True
+            return None
+        if (i, j) == goal:
+            nodes = [(i, j)]
+            while state in came_from:
+                state = came_from[state]
+                nodes.append((state[0], state[1]))
+            return list(reversed(nodes))
+
+        for step in (RIGHT, LEFT, DOWN, UP):
+            if step == (-direction[0], -direction[1]):
+                continue
+            ni, nj = i + step[0], j + step[1]
+            if not (0 <= ni < len(xs) and 0 <= nj < len(ys)):
+                continue
+            if grid.edge_blocked(i, j, step[0], step[1]):
+                continue
+            if (ni, nj) != goal and grid.node_blocked(ni, nj):
+                continue
+
+            new_cost = cost + abs(xs[ni] - xs[i]) + abs(ys[nj] - ys[j])
+            if step != direction:
+                new_cost += BEND_COST
+            if (ni, nj) == goal and step != goal_dir:
+                # Arriving sideways into the grip costs one more bend
+                new_cost += BEND_COST
+            new_state = (ni, nj, step)
+            if new_cost < best.get(new_state, math.inf):
+                best[new_state] = new_cost
+                came_from[new_state] = state
+                heapq.heappush(queue, (new_cost + heuristic(ni, nj), new_cost, new_state))
+    return None
+
+
+def simplify(points):
+    """Drop repeated and collinear points."""
+    result = []
+    for p in points:
+        if result and p == result[-1]:
+            continue
+        if len(result) >= 2:
+            a, b = result[-2], result[-1]
+            # b lies on the way from a to p: it isn't a corner
+            straight_x = a.x() == b.x() == p.x() and min(a.y(), p.y()) <= b.y() <= max(a.y(), p.y())
+            straight_y = a.y() == b.y() == p.y() and min(a.x(), p.x()) <= b.x() <= max(a.x(), p.x())
+            if straight_x or straight_y:
+                result[-1] = p
+                continue
+        result.append(p)
+    return result
+
+
+def _clear_stub(point, direction, rect):
+    """Extend a stub point along direction until it clears rect by ROUTE_MARGIN."""
+    dx, dy = direction
+    if dx > 0:
+        return QPointF(max(point.x(), rect.right() + ROUTE_MARGIN), point.y())
+    if dx < 0:
+        return QPointF(min(point.x(), rect.left() - ROUTE_MARGIN), point.y())
+    if dy > 0:
+        return QPointF(point.x(), max(point.y(), rect.bottom() + ROUTE_MARGIN))
+    return QPointF(point.x(), min(point.y(), rect.top() - ROUTE_MARGIN))
+
+
+def _apply_offset(points, offset):
+    """
+    Shift the middle interior segment sideways by offset, the way path_offset
+    moves the middle segment of rule-based routes.
+    """
+    if not offset or len(points) < 4:
+        return points
+    k = (len(points) - 2) // 2
+    a, b = points[k], points[k + 1]
+    before, after = points[k - 1], points[k + 2]
+    points = list(points)
+    if a.y() == b.y() and before.x() == a.x() and after.x() == b.x():
+        points[k] = QPointF(a.x(), a.y() + offset)
+        points[k + 1] = QPointF(b.x(), b.y() + offset)
+    elif a.x() == b.x() and before.y() == a.y() and after.y() == b.y():
+        points[k] = QPointF(a.x() + offset, a.y())
+        points[k + 1] = QPointF(b.x() + offset, b.y())
+    return points
+
+
+def route_around_obstacles(conn, path, ns, pe, target_side, obstacles, budget=None):
+    """
+    Check conn's rule-based `path` against the components in `obstacles` and
+    reroute it around them if needed. ns/pe are the stub points next to the
+    start and end grips. With a SearchBudget that is used up, a blocked path
+    is returned unchanged and conn is added to budget.deferred. Returns
+    (path, corridor, ids of the components considered).
+    """
+    start_rect = conn.start_component.logical_rect
+    end_rect = conn.end_component.logical_rect
+    # Search between stub ends that clear their own component
+    start_dir = SIDE_OUT.get(conn.start_side, RIGHT)
+    goal_dir = SIDE_IN.get(target_side, RIGHT)
+    first = _clear_stub(ns, start_dir, start_rect)
+    last = _clear_stub(pe, (-goal_dir[0], -goal_dir[1]), end_rect)
+
+    corridor = _bounds(path + [first, last], [start_rect, end_rect]).adjusted(
+        -CORRIDOR_MARGIN, -CORRIDOR_MARGIN, CORRIDOR_MARGIN, CORRIDOR_MARGIN
+    )
+
+    # A clear route stays valid until something moves into its corridor
+    if path_is_clear(path, obstacles, start_rect, end_rect):
+        return path, corridor, frozenset()
+    if budget is not None:
+        if budget.searches <= 0:
+            budget.deferred.append(conn)
+            return path, corridor, frozenset()
+        budget.searches -= 1
+
+    for attempt in range(CORRIDOR_RETRIES + 1):
+        nearby = _nearby(obstacles, corridor)
+        used = frozenset(id(c) for c in nearby)
+
+        rects = [c.logical_rect for c in nearby]
+
+        grown = [r.adjusted(-ROUTE_MARGIN, -ROUTE_MARGIN, ROUTE_MARGIN, ROUTE_MARGIN) for r in rects]
+        # A stub end squeezed into a neighbour's clearance must still get out
+        grown = [
+            r for r in grown
+            if not _strictly_inside(first.x(), first.y(), r) and not _strictly_inside(last.x(), last.y(), r)
+        ]
+        grid = _Grid(corridor, grown, [first, last])
+        start = (grid.x_index[first.x()], grid.y_index[first.y()])
+        goal = (grid.x_index[last.x()], grid.y_index[last.y()])
+
+        nodes = _astar(grid, start, goal, start_dir, goal_dir)
+        if nodes:
+            middle = [QPointF(grid.xs[i], grid.ys[j]) for i, j in nodes]
+            routed = simplify([path[0], ns] + middle + [pe, path[-1]])
+            return _apply_offset(routed, conn.path_offset), corridor, used
+
+        if grid.capped:
+            break
+        # Boxed in: look further out
+        grow = CORRIDOR_MARGIN * 2 ** (attempt + 1)
+        corridor = corridor.adjusted(-grow, -grow, grow, grow)
+
+    # No way around: keep the rule-based route
+    return path, corridor, used
+
+
+def refresh_obstacles(connections, components, moved=None):
+    """
+    Invalidate cached routes that a component move, addition or removal may
+    affect: those whose corridor overlaps the component's old or new rect, or
+    that were routed around a component that's gone. Pass `moved` when the
+    caller knows which components may have moved, to skip checking the rest.
+    Returns the invalidated connections.
+    """
+    changed_rects = []
+    for comp in (components if moved is None else moved):
+        if getattr(comp, "_routed_version", None) != comp.geometry_version:
+            old_rect = getattr(comp, "_routed_rect", None)
+            if old_rect is not None:
+                changed_rects.append(old_rect)
+            changed_rects.append(QRectF(comp.logical_rect))
+            comp._routed_version = comp.geometry_version
+            comp._routed_rect = QRectF(comp.logical_rect)
+
+    invalidated = []
+    members_key = hash(tuple(map(id, components)))
+    members = None
+    for conn in connections:
+        corridor = conn._route_corridor
+        if corridor is None:
+            continue
+        if changed_rects and any(corridor.intersects(rect) for rect in changed_rects):
+            conn.invalidate_route()
+            invalidated.append(conn)
+            continue
+        if conn._route_members != members_key:
+            if members is None:
+                members = {id(c) for c in components}
+            if conn._route_obstacles <= members:
+                conn._route_members = members_key
+            else:
+                conn.invalidate_route()
+                invalidated.append(conn)
+    return invalidated
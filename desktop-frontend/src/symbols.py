@@ -0,0 +1,121 @@
+"""
+Process-wide cache of parsed and rasterized SVG symbols.
+
+Every placed component of the same symbol shares one QSvgRenderer, so a
+diagram with hundreds of copies of a pump parses its SVG file once.
+
+Painting a component blits a pre-rasterized QPixmap instead of re-rendering
+the vector SVG. Rasterizations are keyed by (svg path, logical size, zoom
+bucket) and kept in an LRU bounded by PIXMAP_CACHE_BYTES. Zoom levels are
+rounded up to a few steps per doubling, so zooming in and out reuses a
+handful of rasterizations per symbol; rounding up means a cached pixmap is
+only ever scaled down when drawn.
+"""
+import math
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QPainter, QPaintEngine, QPixmap
+from PyQt5.QtSvg import QSvgRenderer
+
+# Memory budget for cached rasterizations
+PIXMAP_CACHE_BYTES = 64 * 1024 * 1024
+ZOOM_STEPS_PER_DOUBLING = 4
+# Logical sizes are rounded to this many px for the cache key
+SIZE_STEP = 0.5
+
+_renderers = {}
+
+
+def get_renderer(svg_path):
+    """Shared renderer for svg_path (parsed on first use)."""
+    renderer = _renderers.get(svg_path)
+    if renderer is None:
+        renderer = _renderers[svg_path] = QSvgRenderer(svg_path)
+    return renderer
+
+
+class PixmapCache:
+    """LRU of rasterized symbols with a byte budget."""
+
+    def __init__(self, max_bytes=PIXMAP_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        pixmap = self.entries.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return pixmap
+
+    def put(self, key, pixmap):
+        size = pixmap.width() * pixmap.height() * 4
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.width() * old.height() * 4
+        self.entries[key] = pixmap
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.width() * evicted.height() * 4
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+
+pixmap_cache = PixmapCache()
+
+
+def zoom_bucket(scale):
+    """Round scale up to the next of ZOOM_STEPS_PER_DOUBLING steps per power of two."""
+    steps = math.ceil(math.log2(max(scale, 1e-3)) * ZOOM_STEPS_PER_DOUBLING - 1e-9)
+    return 2 ** (steps / ZOOM_STEPS_PER_DOUBLING)
+
+
+def draw_symbol(painter, svg_path, target, zoom=1.0):
+    """
+    Draw svg_path into target (a rect in painter coordinates that stands for
+    a symbol drawn at `zoom`). Raster devices get a cached pixmap; printers,
+    pictures and other vector devices get the SVG itself.
+    """
+    renderer = get_renderer(svg_path)
+    engine = painter.paintEngine()
+    if engine is None or engine.type() != QPaintEngine.Raster or target.isEmpty():
+        renderer.render(painter, target)
+        return
+
+    # Device pixels per logical px: zoom, painter scaling (exports) and HiDPI
+    device = painter.device()
+    ratio = device.devicePixelRatioF() if device is not None else 1.0
+    scale = zoom * abs(painter.worldTransform().m11()) * ratio
+    bucket = zoom_bucket(scale)
+
+    step = SIZE_STEP
+    logical_w = round(target.width() / zoom / step) * step
+    logical_h = round(target.height() / zoom / step) * step
+    key = (svg_path, logical_w, logical_h, bucket)
+
+    pixmap = pixmap_cache.get(key)
+    if pixmap is None:
+        pixmap = QPixmap(max(1, math.ceil(logical_w * bucket)), max(1, math.ceil(logical_h * bucket)))
+        pixmap.fill(Qt.transparent)
+        p = QPainter(pixmap)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setRenderHint(QPainter.SmoothPixmapTransform)
+        renderer.render(p, QRectF(pixmap.rect()))
+        p.end()
+        pixmap_cache.put(key, pixmap)
+
+    painter.save()
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+    painter.restore()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Add project root to path
+sys.path.append(ROOT)
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(autouse=True)
+def project_cwd(monkeypatch):
+    # Assets (ui/assets, grips, icons) are looked up relative to the project root
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture(autouse=True)
+def journal_store(monkeypatch, tmp_path):
+    # Keep canvases with a project id from writing to the user's crash journal
+    from src.canvas import journal
+    store = journal.JournalStore(str(tmp_path / journal.JOURNAL_FILE))
+    monkeypatch.setattr(journal, "_store", store)
+    yield store
+    store.db.close()
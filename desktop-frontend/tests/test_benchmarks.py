@@ -0,0 +1,395 @@
+"""
+Large-canvas scenarios. Timings are printed for information (run with -s to
+see them).
+"""
+import os
+import shutil
+import time
+import random
+
+from PyQt5.QtCore import QPoint, QPointF, QRectF
+from PyQt5.QtGui import QImage, QPainter
+
+from src import router
+from src.canvas import painter as canvas_painter
+from src.canvas.commands import DeleteCommand, MoveCommand
+from src.canvas.widget import CanvasWidget
+from src.connection import Connection
+
+SIDES = ["left", "right", "top", "bottom"]
+
+
+def build_canvas(connection_count, component_count=None, local=False):
+    """
+    Components on a grid, each pipe joining two random components or, with
+    `local`, a component and a random one at most three cells away.
+    """
+    random.seed(connection_count)
+    canvas = CanvasWidget()
+    component_count = component_count or max(20, connection_count // 2)
+    columns = 40
+    for i in range(component_count):
+        pos = QPoint((i % columns) * 160, (i // columns) * 140)
+        canvas.create_component_command("Centrifugal Compressor", pos, {})
+
+    for _ in range(connection_count):
+        if local:
+            a = random.randrange(component_count)
+            while True:
+                row = a // columns + random.randint(-3, 3)
+                col = a % columns + random.randint(-3, 3)
+                b = row * columns + col
+                if 0 <= col < columns and 0 <= b < component_count and b != a:
+                    break
+            a, b = canvas.components[a], canvas.components[b]
+        else:
+            a, b = random.sample(canvas.components, 2)
+        conn = Connection(a, 0, random.choice(SIDES))
+        conn.set_end_grip(b, 0, random.choice(SIDES))
+        canvas.connections.append(conn)
+        canvas.link_connection(conn)
+    return canvas
+
+
+def timed(fn, repeat=1):
+    """(result of the last call, mean seconds per call)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def frame_time(canvas, image):
+    """Connection work of one canvas paint: (seconds, routes still waiting for a search)."""
+    qp = QPainter(image)
+    pending, elapsed = timed(lambda: canvas_painter.draw_connections(
+        qp, canvas.connections, canvas.components, index=canvas.segment_index,
+        obstacles=canvas.component_index, searches=router.SEARCHES_PER_FRAME,
+    ))
+    qp.end()
+    return elapsed, pending
+
+
+def test_connection_frame_time(monkeypatch):
+    searches = []
+    astar = router._astar
+    monkeypatch.setattr(router, "_astar", lambda *args: searches.append(args) or astar(*args))
+
+    image = QImage(1600, 1200, QImage.Format_ARGB32)
+    for local in (False, True):
+        for count in (100, 500, 2000):
+            canvas = build_canvas(count, local=local)
+            assert len(canvas.components) >= 20
+
+            # Every pipe gets a route on the first frame, but obstacle
+            # searches are capped; the rest keep their rule-based route
+            del searches[:]
+            first, pending = frame_time(canvas, image)
+            assert len(searches) <= router.SEARCHES_PER_FRAME
+            assert all(conn.path for conn in canvas.connections)
+
+            versions = {conn: conn.route_version for conn in canvas.connections}
+            second, pending = frame_time(canvas, image)
+            changed = [conn for conn in canvas.connections if conn.route_version != versions[conn]]
+            assert len(changed) <= router.SEARCHES_PER_FRAME
+
+            frames = 2
+            if count <= 500:
+                while pending:
+                    _, pending = frame_time(canvas, image)
+                    frames += 1
+
+                # Settled: an idle frame re-routes nothing
+                versions = {conn: conn.route_version for conn in canvas.connections}
+                idle, pending = frame_time(canvas, image)
+                assert not pending
+                assert all(conn.route_version == versions[conn] for conn in canvas.connections)
+
+                comp = canvas.components[0]
+                old_pos = comp.logical_rect.topLeft()
+                canvas.undo_stack.push(MoveCommand(comp, old_pos, old_pos + QPointF(40, 20)))
+                moved, pending = frame_time(canvas, image)
+                attached = canvas.attached_connections([comp])
+                assert all(conn.route_version != versions[conn] for conn in attached)
+                idle_info = f", idle {idle * 1000:.1f} ms, after a move {moved * 1000:.1f} ms"
+            else:
+                idle_info = ""
+
+            print(f"\n[BENCH] {count} {'local' if local else 'random'} connections: "
+                  f"first frame {first * 1000:.1f} ms, next {second * 1000:.1f} ms, "
+                  f"{frames} frames to route{idle_info}")
+
+
+def test_drag_reroute_time():
+    image = QImage(1600, 1200, QImage.Format_ARGB32)
+    for count in (100, 2000):
+        canvas = build_canvas(count, local=True)
+        while frame_time(canvas, image)[1]:
+            pass
+
+        selection = canvas.components[:3]
+        versions = {conn: conn.route_version for conn in canvas.connections}
+
+        def drag_step():
+            for comp in selection:
+                comp.logical_rect.translate(5, 3)
+                comp.update_visuals(canvas.zoom_level)
+            canvas.reroute_components(selection)
+        _, step = timed(drag_step, repeat=10)
+
+        rerouted = [conn for conn in canvas.connections if conn.route_version != versions[conn]]
+        print(f"\n[BENCH] {count} connections: drag step {step * 1000:.1f} ms, "
+              f"{len(rerouted)} pipes re-routed")
+
+        # Only pipes near the selection are touched
+        assert len(rerouted) < count / 2
+        # ...and the paint after the drag has nothing left to re-route but
+        # the detours over a drag step's search budget
+        assert all(conn._route_deferred or not conn.refresh_route(canvas.component_index)
+                   for conn in canvas.connections)
+
+
+def test_hit_lookup_time(monkeypatch):
+    canvas = build_canvas(5000, component_count=5000)
+    for conn in canvas.connections:
+        # Rule-based routes are enough for hit testing
+        conn.calculate_path()
+
+    random.seed(0)
+    points = [QPointF(random.uniform(0, 6400), random.uniform(0, 17500)) for _ in range(100)]
+    # ...and points right on pipes, so lookups also have something to find
+    for conn in random.sample(canvas.connections, 100):
+        p1, p2 = conn.path[1], conn.path[2]
+        points.append((p1 + p2) / 2)
+
+    tested = []
+    hit_test = Connection.hit_test
+    monkeypatch.setattr(Connection, "hit_test", lambda conn, *args: tested.append(conn) or hit_test(conn, *args))
+
+    def linear_connection_at(pos):
+        for conn in canvas.connections:
+            idx = conn.hit_test(pos)
+            if idx != -1:
+                return conn, idx
+        return None, -1
+
+    def linear_near(pos):
+        return [c for c in canvas.components if c.logical_rect.adjusted(-30, -30, 30, 30).contains(pos)]
+
+    def indexed_lookups(points=points):
+        return [(canvas.connection_at(p), set(canvas.component_index.near(p, 30))) for p in points]
+
+    def linear_lookups(points=points):
+        return [(linear_connection_at(p), set(linear_near(p))) for p in points]
+
+    indexed, indexed_time = timed(indexed_lookups)
+    indexed_tests = len(tested)
+    del tested[:]
+    linear, linear_time = timed(linear_lookups)
+
+    print(f"\n[BENCH] 5000 components: {len(points)} lookups indexed {indexed_time * 1000:.1f} ms "
+          f"({indexed_tests} pipe hit tests), linear scan {linear_time * 1000:.1f} ms ({len(tested)})")
+
+    assert indexed == linear
+    assert sum(hit is not None for (hit, _), _ in indexed) >= 100
+    # Only pipes passing near each point are hit tested
+    assert indexed_tests * 20 < len(tested)
+
+    # The indexes follow moves, deletes and undo/redo
+    moved = random.sample(canvas.components, 5)
+    old_centers = [comp.logical_rect.center() for comp in moved]
+
+    def check():
+        # Where the edited components are and were, and along their pipes
+        nearby = [comp.logical_rect.center() for comp in moved] + old_centers
+        for conn in canvas.attached_connections(moved):
+            conn.calculate_path()
+            nearby.append((conn.path[1] + conn.path[2]) / 2)
+        assert indexed_lookups(nearby) == linear_lookups(nearby)
+
+    for comp in moved:
+        old = comp.logical_rect.topLeft()
+        canvas.undo_stack.push(MoveCommand(comp, old, old + QPointF(random.uniform(-300, 300),
+                                                                    random.uniform(-300, 300))))
+    check()
+    canvas.undo_stack.push(DeleteCommand(canvas, moved, canvas.attached_connections(moved)))
+    check()
+    canvas.undo_stack.undo()
+    check()
+    for _ in moved:
+        canvas.undo_stack.undo()
+    check()
+    for _ in moved:
+        canvas.undo_stack.redo()
+    check()
+
+
+def test_scene_mode_render_and_zoom(monkeypatch):
+    from src.canvas.export import get_content_rect, render_to_image
+    from src.component_widget import ComponentWidget
+
+    canvas = build_canvas(100, component_count=2000)
+    for conn in canvas.connections:
+        conn.calculate_path()
+
+    # Both modes draw the same picture (once grips and routes are loaded)
+    rect = get_content_rect(canvas)
+    rect.setHeight(min(rect.height(), 600))
+    render_to_image(canvas, rect)
+    assert render_to_image(canvas, rect, scene=False) == render_to_image(canvas, rect, scene=True)
+
+    resized = []
+    set_fixed_size = ComponentWidget.setFixedSize
+    monkeypatch.setattr(ComponentWidget, "setFixedSize",
+                        lambda comp, *args: resized.append(comp) or set_fixed_size(comp, *args))
+
+    def zoom_in_and_out():
+        for _ in range(5):
+            canvas.zoom_in()
+        for _ in range(5):
+            canvas.zoom_out()
+
+    timings, geometry_updates = {}, {}
+    for scene in (False, True):
+        canvas.set_scene_mode(scene)
+        del resized[:]
+        timings[scene] = timed(zoom_in_and_out)[1] / 10
+        geometry_updates[scene] = len(resized)
+
+    print(f"\n[BENCH] 2000 components: zoom step widget mode {timings[False] * 1000:.1f} ms, "
+          f"scene mode {timings[True] * 1000:.1f} ms")
+    # Widget mode lays out every component per zoom step; scene mode only repaints
+    assert geometry_updates == {False: 10 * len(canvas.components), True: 0}
+    assert not any(comp.isVisibleTo(canvas) for comp in canvas.components)
+
+    # Zoomed in scene mode, then back: widgets pick up the current zoom
+    canvas.zoom_in()
+    canvas.set_scene_mode(False)
+    zoom = canvas.zoom_level
+    for comp in canvas.components:
+        r = comp.logical_rect
+        assert (comp.x(), comp.y(), comp.width()) == (int(r.x() * zoom), int(r.y() * zoom), int(r.width() * zoom))
+
+
+def test_symbol_cache():
+    from src import symbols
+    from src.canvas.export import get_content_rect, render_to_image
+
+    cache = symbols.pixmap_cache
+    cache.clear()
+    canvas = build_canvas(20, component_count=400)
+    rect = get_content_rect(canvas)
+
+    cache.hits = cache.misses = 0
+    cold_image, cold = timed(lambda: render_to_image(canvas, rect))
+    # Rasterized once, then every other copy is a hit
+    assert cache.misses == 1
+    assert cache.hits == len(canvas.components) - 1
+
+    warm_image, warm = timed(lambda: render_to_image(canvas, rect))
+    assert cache.misses == 1
+    assert cache.hits == 2 * len(canvas.components) - 1
+    assert warm_image == cold_image
+
+    svg_path = canvas.components[0].svg_path
+    print(f"\n[BENCH] 400 copies of one symbol: first render {cold * 1000:.1f} ms, "
+          f"cached {warm * 1000:.1f} ms, {len(cache.entries)} pixmap(s), {cache.bytes / 1024:.0f} KiB")
+
+    # One parse and one rasterization shared by every copy
+    assert all(comp.renderer is symbols.get_renderer(svg_path) for comp in canvas.components)
+    assert len(cache.entries) == 1
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_grip_registry(monkeypatch, tmp_path):
+    from src import grips as grip_registry
+
+    # Watch a copy so the tracked CSV is never touched
+    path = tmp_path / os.path.basename(grip_registry.CSV_PATH)
+    shutil.copyfile(grip_registry.CSV_PATH, path)
+    parses = []
+    watched = grip_registry._WatchedFile(
+        str(path), lambda path: parses.append(path) or grip_registry._parse_csv(path))
+    monkeypatch.setattr(grip_registry, "_csv", watched)
+
+    def place():
+        canvas = build_canvas(0, component_count=300)
+        for comp in canvas.components:
+            comp.get_logical_grip_position(0)
+        return canvas
+    canvas, elapsed = timed(place)
+    print(f"\n[BENCH] 300 components with grips: {elapsed * 1000:.1f} ms, "
+          f"{len(parses)} CSV parse(s)")
+    assert len(parses) <= 1
+
+    config = canvas.components[0].config
+    lookup = lambda: grip_registry.csv_grips(config.get("s_no", ""), config.get("object", ""))
+    lookup()
+    lookup()
+    assert len(parses) == 1
+
+    # Editing the CSV invalidates the registry
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    lookup()
+    lookup()
+    assert len(parses) == 2
+
+
+def test_grip_offset_table(monkeypatch):
+    from src import grips as grip_registry
+    from src.component_widget import ComponentWidget
+
+    grip_registry._invert_cache.clear()
+    grip_registry._offset_cache.clear()
+    detections = []
+    detect = grip_registry.detect_inverted_y
+    monkeypatch.setattr(grip_registry, "detect_inverted_y",
+                        lambda grips, name="Unknown": detections.append(name) or detect(grips, name))
+
+    canvas = build_canvas(0, component_count=200)
+    comps = canvas.components
+    grip_count = len(comps[0].get_grips())
+
+    def lookups():
+        for comp in comps:
+            for idx in range(grip_count):
+                comp.get_logical_grip_position(idx)
+    _, elapsed = timed(lookups, repeat=20)
+    print(f"\n[BENCH] {len(comps) * grip_count} logical grip lookups: {elapsed * 1000:.1f} ms")
+
+    # One table per symbol, built once and matching the SVG viewBox mapping
+    assert len(detections) == 1
+    assert len(grip_registry._offset_cache) == 1
+    assert all(comp.grip_offsets() is comps[0].grip_offsets() for comp in comps)
+    assert len(comps[0].grip_offsets()) == 2 * grip_count
+    comp = comps[0]
+    content = QRectF(10, 10, comp.logical_rect.width() - 20,
+                     comp.logical_rect.height() - 10 - (25 if comp.config.get("default_label") else 10))
+    svg_rect = comp.calculate_svg_rect(content)
+    for idx, grip in enumerate(comp.get_grips()):
+        expected = comp.map_svg_to_widget_coords(grip["x"], grip["y"], svg_rect)
+        actual = comp.get_logical_grip_position(idx)
+        assert abs(expected.x() - actual.x()) < 1e-9 and abs(expected.y() - actual.y()) < 1e-9
+
+    # Grips from config or the defaults are a new list per instance; the
+    # table still follows the grip values, not the list or the config keys
+    legacy = '[{"x": 50, "y": 100, "side": "top"}, {"x": 50, "y": 0, "side": "bottom"}]'
+    modern = '[{"x": 50, "y": 0, "side": "top"}, {"x": 50, "y": 100, "side": "bottom"}]'
+    make = lambda config: ComponentWidget(comp.svg_path, canvas, config)
+    from_config = [make({"grips": legacy}), make({"grips": legacy}), make({"grips": modern})]
+    defaults = [make({"name": "No Grips"}), make({"name": "No Grips"})]
+    assert from_config[0].get_grips() is not from_config[1].get_grips()
+    assert defaults[0].get_grips() is not defaults[1].get_grips()
+
+    for _ in range(3):
+        for other in from_config + defaults:
+            other.grip_offsets()
+    assert from_config[0].grip_offsets() is from_config[1].grip_offsets()
+    assert defaults[0].grip_offsets() is defaults[1].grip_offsets()
+    assert list(from_config[0].grip_offsets()) == [0.5, 0.0, 0.5, 1.0]
+    assert list(from_config[2].grip_offsets()) == [0.5, 0.0, 0.5, 1.0]
+    assert from_config[0]._should_invert_y_axis() and not from_config[2]._should_invert_y_axis()
+    # One more detection per distinct grip set: legacy, modern, defaults
+    assert len(detections) == 4
+    assert len(grip_registry._offset_cache) == 4
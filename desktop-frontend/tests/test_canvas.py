@@ -0,0 +1,118 @@
+from PyQt5.QtCore import QEvent, QPoint, QPointF, Qt
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication
+
+from src.canvas.widget import CanvasWidget
+
+
+def send_mouse(canvas, kind, pos, button=Qt.LeftButton):
+    buttons = Qt.NoButton if kind == QEvent.MouseButtonRelease else Qt.LeftButton
+    QApplication.sendEvent(canvas, QMouseEvent(kind, QPointF(pos), button, buttons, Qt.NoModifier))
+
+
+def grip_pos(canvas, comp, idx):
+    """Visual (zoomed) canvas position of a grip."""
+    p = comp.logical_rect.topLeft() + comp.get_logical_grip_position(idx)
+    return QPoint(round(p.x() * canvas.zoom_level), round(p.y() * canvas.zoom_level))
+
+
+def test_scene_mode_connects_to_grips_after_zoom():
+    canvas = CanvasWidget()
+    for x in (0, 300):
+        canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+    start, target = canvas.components
+    canvas.set_scene_mode(True)
+    canvas.zoom_level = 2.0
+    canvas.apply_zoom()
+
+    grips = range(len(target.get_grips()))
+    assert [canvas.snap_target(target.logical_rect.topLeft() + target.get_logical_grip_position(i))[:2]
+            for i in grips] == [(target, i) for i in grips]
+
+    for idx in grips:
+        # Drag a pipe from the first component's grip 0 onto each grip
+        send_mouse(canvas, QEvent.MouseButtonPress, grip_pos(canvas, start, 0))
+        assert canvas.active_connection is not None
+        send_mouse(canvas, QEvent.MouseMove, grip_pos(canvas, target, idx), Qt.NoButton)
+        send_mouse(canvas, QEvent.MouseButtonRelease, grip_pos(canvas, target, idx))
+
+        conn = canvas.connections[-1]
+        assert (conn.start_component, conn.start_grip_index) == (start, 0)
+        assert (conn.end_component, conn.end_grip_index) == (target, idx)
+    assert len(canvas.connections) == len(grips)
+
+
+def expected_adjacency(canvas):
+    """Component -> attached connections, worked out from the canvas lists."""
+    adjacency = {}
+    for conn in canvas.connections:
+        for comp in (conn.start_component, conn.end_component):
+            adjacency.setdefault(comp, set()).add(conn)
+    return adjacency
+
+
+def assert_adjacency(canvas):
+    assert {comp: set(conns) for comp, conns in canvas.adjacency.items()} == expected_adjacency(canvas)
+    for comp in canvas.components:
+        assert set(canvas.attached_connections([comp])) == expected_adjacency(canvas).get(comp, set())
+
+
+def test_adjacency_follows_edits_undo_redo_and_load(tmp_path):
+    from src.canvas.commands import AddConnectionCommand, DeleteCommand
+    from src.canvas.export import load_canvas_from_project, load_from_pfd, save_to_pfd
+    from src.connection import Connection
+
+    canvas = CanvasWidget()
+    for x in (0, 300, 600, 900):
+        canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+    a, b, c, d = canvas.components
+    for start, end in ((a, b), (b, c), (c, d), (a, c), (b, d)):
+        conn = Connection(start, 0, "right")
+        conn.set_end_grip(end, 0, "left")
+        canvas.undo_stack.push(AddConnectionCommand(canvas, conn))
+    assert_adjacency(canvas)
+    assert len(canvas.attached_connections([b])) == 3
+
+    # Deleting components takes their pipes along
+    b.is_selected = c.is_selected = True
+    canvas.delete_selected_components()
+    assert canvas.connections == []
+    assert_adjacency(canvas)
+
+    # Deleting a single pipe
+    canvas.undo_stack.undo()
+    assert len(canvas.connections) == 5
+    assert_adjacency(canvas)
+    b.is_selected = c.is_selected = False
+    canvas.undo_stack.push(DeleteCommand(canvas, [], [canvas.connections[0]]))
+    assert_adjacency(canvas)
+
+    # Walk the whole history back and forth
+    steps = canvas.undo_stack.index()
+    for _ in range(steps):
+        canvas.undo_stack.undo()
+        assert_adjacency(canvas)
+    assert canvas.adjacency == {}
+    for _ in range(steps):
+        canvas.undo_stack.redo()
+        assert_adjacency(canvas)
+    assert len(canvas.connections) == 4
+
+    path = str(tmp_path / "plant.pfd")
+    save_to_pfd(canvas, path)
+    loaded = CanvasWidget()
+    load_from_pfd(loaded, path)
+    assert len(loaded.connections) == 4
+    assert_adjacency(loaded)
+
+    # Reloading a backend project over it starts the map over
+    ids = {comp: i for i, comp in enumerate(canvas.components, 1)}
+    project_data = {"canvas_state": {
+        "items": [{"id": i, "name": "Centrifugal Compressor", "svg": comp.svg_path, "x": comp.logical_rect.x()}
+                  for comp, i in ids.items()],
+        "connections": [{"id": n, "sourceItemId": ids[conn.start_component], "targetItemId": ids[conn.end_component]}
+                        for n, conn in enumerate(canvas.connections[:2], 1)],
+    }}
+    assert load_canvas_from_project(loaded, project_data)
+    assert len(loaded.connections) == 2
+    assert_adjacency(loaded)
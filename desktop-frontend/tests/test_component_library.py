@@ -0,0 +1,26 @@
+import os
+
+import src.app_state as app_state
+from src.component_library import ComponentLibrary
+
+
+def test_sync_cursor_is_per_user_and_outside_assets(monkeypatch, tmp_path):
+    assets = os.path.abspath(os.path.join("ui", "assets"))
+    assert not os.path.abspath(ComponentLibrary._sync_state_path()).startswith(assets)
+
+    path = tmp_path / ComponentLibrary.SYNC_STATE_FILE
+    monkeypatch.setattr(ComponentLibrary, "_sync_state_path", classmethod(lambda cls: str(path)))
+    monkeypatch.setattr(app_state, "BACKEND_BASE_URL", "http://backend")
+    # The sync helpers don't touch the widget; skip building the whole library
+    library = ComponentLibrary.__new__(ComponentLibrary)
+
+    monkeypatch.setattr(app_state, "current_user", "alice")
+    library._store_sync_state({"version": "a1", "since": "2026-01-01T00:00:00+00:00"})
+    monkeypatch.setattr(app_state, "current_user", "bob")
+    assert library._sync_state() == {}
+    library._store_sync_state({"version": "b1", "since": None})
+
+    monkeypatch.setattr(app_state, "current_user", "alice")
+    assert library._sync_state() == {"version": "a1", "since": "2026-01-01T00:00:00+00:00"}
+    monkeypatch.setattr(app_state, "BACKEND_BASE_URL", "http://other")
+    assert library._sync_state() == {}
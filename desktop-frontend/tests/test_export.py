@@ -0,0 +1,44 @@
+from PyQt5.QtCore import QPoint
+
+from src.canvas import export
+from src.canvas.widget import CanvasWidget
+from src.connection import Connection
+
+
+def connect(canvas, a, b):
+    conn = Connection(a, 0, "right")
+    conn.set_end_grip(b, 0, "left")
+    canvas.connections.append(conn)
+    return conn
+
+
+def test_full_save_keeps_pipes_on_first_unsaved_component(monkeypatch):
+    canvas = CanvasWidget()
+    canvas.autosaver.enabled = False
+    for x in (0, 300, 600):
+        canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+    first, second, third = canvas.components
+    connect(canvas, first, second)
+    connect(canvas, second, third)
+    monkeypatch.setattr(export, "get_component_id_map",
+                        lambda: {str(comp.config.get("s_no", "")): 42 for comp in canvas.components})
+
+    state = export.serialize_canvas_state(canvas)
+
+    # The first new item gets placeholder id -1, which must not read as "missing"
+    assert [item["id"] for item in state["items"]] == [-1, -2, -3]
+    assert [(conn["sourceItemId"], conn["targetItemId"]) for conn in state["connections"]] == [(-1, -2), (-2, -3)]
+
+
+def test_full_save_skips_pipes_to_unknown_components(monkeypatch):
+    canvas = CanvasWidget()
+    canvas.autosaver.enabled = False
+    for x in (0, 300):
+        canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+    connect(canvas, *canvas.components)
+    monkeypatch.setattr(export, "get_component_id_map", lambda: {})
+
+    state = export.serialize_canvas_state(canvas)
+
+    assert state["items"] == []
+    assert state["connections"] == []
@@ -0,0 +1,155 @@
+from PyQt5.QtCore import QPoint, QPointF
+from PyQt5.QtWidgets import QMessageBox
+
+from src.canvas import journal
+from src.canvas.commands import AddConnectionCommand, DeleteCommand, MoveCommand
+from src.canvas.widget import CanvasWidget
+from src.connection import Connection
+
+PROJECT_ID = 7
+
+
+def project_canvas(xs=()):
+    canvas = CanvasWidget()
+    canvas.autosaver.enabled = False
+    canvas.project_id = PROJECT_ID
+    canvas.project_revision = 1
+    for x in xs:
+        canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+    return canvas
+
+
+def loaded_canvas(xs):
+    """Canvas with stored items at xs, as loaded from the backend (not journaled)."""
+    canvas = project_canvas()
+    canvas.project_id = None
+    for x in xs:
+        canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+    for backend_id, comp in enumerate(canvas.components, 1):
+        comp.backend_id = backend_id
+    canvas.project_id = PROJECT_ID
+    canvas.dirty_objects.clear()
+    canvas.undo_stack.clear()
+    return canvas
+
+
+def connect(canvas, a, b):
+    conn = Connection(a, 0, "right")
+    conn.set_end_grip(b, 0, "left")
+    canvas.undo_stack.push(AddConnectionCommand(canvas, conn))
+    return conn
+
+
+def move(comp, dx, dy):
+    old = comp.logical_rect.topLeft()
+    comp.parent().undo_stack.push(MoveCommand(comp, old, old + QPointF(dx, dy)))
+
+
+def snapshot(canvas):
+    """Order-independent picture of what the canvas holds."""
+    items = sorted((c.backend_id or 0, c.to_dict()["x"], c.to_dict()["y"], c.rotation_angle, c.config.get("name"))
+                   for c in canvas.components)
+    where = {c: (c.to_dict()["x"], c.to_dict()["y"]) for c in canvas.components}
+    conns = sorted((where[c.start_component], c.start_grip_index, where[c.end_component], c.end_grip_index)
+                   for c in canvas.connections)
+    return items, conns
+
+
+def restart(journal_store, monkeypatch):
+    """The app died without saving: a new process opens the same journal file."""
+    store = journal.JournalStore(journal_store.path)
+    monkeypatch.setattr(journal, "_store", store)
+    return store
+
+
+# ---------------------- STORE ----------------------
+
+def test_append_and_load_round_trip(journal_store):
+    journal_store.append(PROJECT_ID, 3, [("a", "item", {"x": 1}), ("b", "connection", {"y": [1, 2]})])
+    journal_store.append(PROJECT_ID, 3, [("a", "item", {"x": 2})])
+    journal_store.append(PROJECT_ID + 1, 9, [("c", "item", {"x": 5})])
+
+    # Newest row per key, in the order they were last written
+    assert journal_store.load(PROJECT_ID) == (3, [("b", "connection", {"y": [1, 2]}), ("a", "item", {"x": 2})])
+
+    journal_store.clear(PROJECT_ID)
+    assert journal_store.load(PROJECT_ID) == (None, [])
+    assert journal_store.load(PROJECT_ID + 1) == (9, [("c", "item", {"x": 5})])
+
+
+def test_compaction_bounds_journal_for_1000_edits(journal_store):
+    canvas = project_canvas(range(0, 2000, 200))
+    for i in range(1000):
+        move(canvas.components[i % 10], 1, 0)
+
+    stored = journal_store.db.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+    assert stored < journal.COMPACT_EVERY + 10
+    # Replay cost follows the objects edited, not the edits
+    _, rows = journal_store.load(PROJECT_ID)
+    assert len(rows) == 10
+
+    journal_store.compact(PROJECT_ID)
+    assert journal_store.db.execute("SELECT COUNT(*) FROM journal").fetchone()[0] == 10
+    assert journal_store.load(PROJECT_ID)[1] == rows
+
+
+# ---------------------- RECOVERY ----------------------
+
+def test_replay_after_crash_restores_canvas(journal_store, monkeypatch):
+    canvas = loaded_canvas((0, 300, 600))
+    backend = snapshot(canvas)
+
+    # Unsaved edits: a new item, a move, a delete, pipes between them
+    canvas.create_component_command("Centrifugal Compressor", QPoint(0, 400), {})
+    first, second, third, added = canvas.components
+    move(first, 40, 80)
+    canvas.undo_stack.push(DeleteCommand(canvas, [third], []))
+    connect(canvas, first, added)
+    connect(canvas, added, second)
+    edited = snapshot(canvas)
+
+    store = restart(journal_store, monkeypatch)
+    reopened = loaded_canvas((0, 300, 600))
+    assert snapshot(reopened) == backend
+
+    base_revision, rows = store.load(PROJECT_ID)
+    assert base_revision == 1
+    assert journal.replay_journal(reopened, rows) == len(rows)
+    assert snapshot(reopened) == edited
+    # Not on the backend yet: everything restored is sent by the next save
+    assert len(reopened.dirty_objects) == len(rows)
+
+
+def test_offer_recovery(journal_store, monkeypatch):
+    canvas = project_canvas((0, 300))
+    move(canvas.components[1], 0, 120)
+
+    store = restart(journal_store, monkeypatch)
+    answers = iter([QMessageBox.No, QMessageBox.Yes])
+    monkeypatch.setattr(QMessageBox, "question", lambda *args: next(answers))
+
+    declined = project_canvas()
+    assert journal.offer_recovery(None, declined) is False
+    assert declined.components == []
+    assert store.load(PROJECT_ID) == (None, [])
+
+    # Only edits made after the declined recovery come back
+    move(canvas.components[0], 50, 0)
+    accepted = project_canvas()
+    assert journal.offer_recovery(None, accepted) is True
+    assert snapshot(accepted) == ([(0, 50, 0, 0, "Centrifugal Compressor")], [])
+    assert not accepted.undo_stack.isClean()
+
+
+def test_successful_save_truncates_journal(journal_store):
+    canvas = project_canvas((0, 300))
+    assert len(journal_store.load(PROJECT_ID)[1]) == 2
+
+    canvas.dirty_objects.clear()
+    canvas.mark_saved(canvas.undo_stack.index())
+    assert journal_store.load(PROJECT_ID) == (None, [])
+
+    # Edits still in flight stay journaled
+    move(canvas.components[0], 10, 0)
+    canvas.journal.saved()
+    assert [key for key, _, _ in journal_store.load(PROJECT_ID)[1]] == [canvas.components[0]._journal_key]
@@ -0,0 +1,90 @@
+from PyQt5.QtCore import QPoint, QPointF
+
+from src.canvas.commands import MoveCommand
+from src.canvas.widget import CanvasWidget
+from src.connection import Connection, refresh_connection_paths
+from src.router import path_is_clear
+
+
+def build_row(*xs):
+    """Components in a row at the given x positions."""
+    canvas = CanvasWidget()
+    for x in xs:
+        canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+    return canvas
+
+
+def connect(canvas, a, b):
+    conn = Connection(a, 0, "right")
+    conn.set_end_grip(b, 0, "left")
+    canvas.connections.append(conn)
+    canvas.link_connection(conn)
+    return conn
+
+
+def crosses(conn, blocker):
+    ends = (conn.start_component.logical_rect, conn.end_component.logical_rect)
+    return not path_is_clear(conn.path, [blocker], *ends)
+
+
+def test_route_avoids_blocker_and_follows_it():
+    canvas = build_row(0, 220, 440)
+    start, blocker, end = canvas.components
+    conn = connect(canvas, start, end)
+
+    # The rule-based route runs straight through the middle component
+    conn.calculate_path()
+    assert crosses(conn, blocker)
+
+    refresh_connection_paths(canvas.connections, canvas.components)
+    assert not crosses(conn, blocker)
+    assert conn.path[0] == QPointF(conn.get_start_pos())
+    assert conn.path[-1] == QPointF(conn.get_end_pos())
+
+    # Moving the blocker out of the way re-routes the pipe straight again
+    version = conn.route_version
+    old = blocker.logical_rect.topLeft()
+    canvas.undo_stack.push(MoveCommand(blocker, old, old + QPointF(0, 400)))
+    refresh_connection_paths(canvas.connections, canvas.components)
+    assert conn.route_version > version
+    assert len(conn.path) == 4
+
+    # ...and back into a new spot on the line brings the detour back
+    canvas.undo_stack.push(MoveCommand(blocker, old + QPointF(0, 400), old + QPointF(10, 5)))
+    refresh_connection_paths(canvas.connections, canvas.components)
+    assert not crosses(conn, blocker)
+
+    canvas.undo_stack.undo()
+    canvas.undo_stack.undo()
+    refresh_connection_paths(canvas.connections, canvas.components)
+    assert not crosses(conn, blocker)
+
+
+def test_search_budget_defers_blocked_routes():
+    # Pairs of components with a blocker between them, one row per pair
+    canvas = CanvasWidget()
+    conns = []
+    for row in range(6):
+        for x in (0, 220, 440):
+            canvas.create_component_command("Centrifugal Compressor", QPoint(x, row * 300), {})
+        start, _, end = canvas.components[-3:]
+        conns.append(connect(canvas, start, end))
+
+    pending = refresh_connection_paths(canvas.connections, canvas.components,
+                                       obstacles=canvas.component_index, searches=2)
+    assert pending == 4
+    # Over the budget: drawn with the rule-based route until searched
+    assert sum(len(conn.path) == 4 for conn in conns) == 4
+
+    calls = 1
+    while pending:
+        pending = refresh_connection_paths(canvas.connections, canvas.components,
+                                           obstacles=canvas.component_index, searches=2)
+        calls += 1
+    assert calls == 3
+
+    routed = [list(conn.path) for conn in conns]
+    for conn in conns:
+        conn.invalidate_route()
+    refresh_connection_paths(canvas.connections, canvas.components)
+    assert routed == [conn.path for conn in conns]
@@ -0,0 +1,217 @@
+import threading
+
+import pytest
+from PyQt5.QtCore import QPoint
+
+from src import api_worker
+from src.api_worker import run_async, wait_while
+from src.canvas import autosave, export
+from src.canvas.widget import CanvasWidget
+
+
+class FakeApi:
+    """Stands in for the backend: records each save, answers with `replies`."""
+
+    def __init__(self, monkeypatch):
+        self.plans = []
+        # Queued answers: "ok", "fail" or "conflict"; "ok" once they run out
+        self.replies = []
+        # Cleared to hold saves on the worker thread until set()
+        self.release = threading.Event()
+        self.release.set()
+        monkeypatch.setattr(export, "get_component_id_map", lambda: {})
+        monkeypatch.setattr(export, "send_canvas_save", self.send)
+
+    def send(self, plan):
+        self.plans.append(plan)
+        self.release.wait(10)
+        reply = self.replies.pop(0) if self.replies else "ok"
+        if reply == "fail":
+            return None
+        if reply == "conflict":
+            return {"status": "conflict", "revision": plan["revision"] + 1}
+        return {"status": "success", "revision": plan["revision"] + 1, "id_map": {}}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    yield FakeApi(monkeypatch)
+    api_worker.wait_for_all(10000)
+
+
+def project_canvas():
+    canvas = CanvasWidget()
+    canvas.autosaver.enabled = False
+    canvas.project_id = 1
+    canvas.project_revision = 1
+    return canvas
+
+
+def add_component(canvas, x=0):
+    canvas.create_component_command("Centrifugal Compressor", QPoint(x, 0), {})
+
+
+# ---------------------- API WORKER ----------------------
+
+def test_run_async_delivers_result_on_ui_thread():
+    ui_thread = threading.current_thread()
+    calls = []
+
+    def record(kind):
+        return lambda *args: calls.append((kind, args, threading.current_thread() is ui_thread))
+
+    task = run_async(lambda a, b=0: a + b, 2, b=3,
+                     on_success=record("success"), on_error=record("error"), on_finished=record("finished"))
+    assert wait_while(lambda: len(calls) < 2)
+    assert calls == [("success", (5,), True), ("finished", (), True)]
+    assert not task.cancelled
+
+
+def test_run_async_reports_errors():
+    def boom():
+        raise ValueError("server said no")
+
+    calls = []
+    run_async(boom, on_success=calls.append, on_error=lambda message: calls.append(("error", message)),
+              on_finished=lambda: calls.append("finished"))
+    assert wait_while(lambda: "finished" not in calls)
+    assert calls == [("error", "server said no"), "finished"]
+
+
+def test_cancelled_task_only_finishes():
+    release = threading.Event()
+    calls = []
+    task = run_async(release.wait, 10, on_success=calls.append, on_error=calls.append,
+                     on_finished=lambda: calls.append("finished"))
+    task.cancel()
+    release.set()
+    assert wait_while(lambda: not calls)
+    assert calls == ["finished"]
+
+
+# ---------------------- MANUAL SAVE ----------------------
+
+def test_save_during_autosave_runs_after_it(api):
+    canvas = project_canvas()
+    add_component(canvas)
+    results = []
+
+    api.release.clear()
+    canvas.save_file(on_done=lambda result: results.append(("auto", result)))
+    assert wait_while(lambda: not api.plans)
+    # Edited and saved by hand while the first save is still on the wire
+    add_component(canvas, 200)
+    canvas.save_file(on_done=lambda result: results.append(("manual", result)))
+    api.release.set()
+
+    assert wait_while(lambda: len(results) < 2)
+    assert [kind for kind, _ in results] == ["auto", "manual"]
+    assert all(result["status"] == "success" for _, result in results)
+    assert [len(plan["dirty"]) for plan in api.plans] == [1, 1]
+    assert canvas.project_revision == 3
+    assert canvas.undo_stack.isClean()
+    assert not canvas.dirty_objects
+
+
+def test_queued_save_with_nothing_left_reuses_result(api):
+    canvas = project_canvas()
+    add_component(canvas)
+    results = []
+
+    api.release.clear()
+    canvas.save_file(on_done=lambda result: results.append(("auto", result)))
+    canvas.save_file(on_done=lambda result: results.append(("manual", result)))
+    api.release.set()
+
+    assert wait_while(lambda: len(results) < 2)
+    assert [kind for kind, _ in results] == ["auto", "manual"]
+    assert results[0][1] is results[1][1]
+    assert len(api.plans) == 1
+
+
+def test_queued_save_not_sent_after_conflict(api):
+    canvas = project_canvas()
+    add_component(canvas)
+    add_component(canvas, 200)
+    results = []
+
+    api.replies = ["conflict"]
+    api.release.clear()
+    canvas.save_file(on_done=results.append)
+    canvas.save_file(on_done=results.append)
+    api.release.set()
+
+    assert wait_while(lambda: len(results) < 2)
+    assert results == [None, None]
+    assert len(api.plans) == 1
+    assert canvas.save_conflict
+    assert canvas.save_status == "conflict"
+
+
+# ---------------------- AUTOSAVE ----------------------
+
+def autosaving_canvas(monkeypatch, delay_ms=50, max_delay_s=30, retry_ms=15000):
+    monkeypatch.setattr(autosave, "AUTOSAVE_DELAY_MS", delay_ms)
+    monkeypatch.setattr(autosave, "AUTOSAVE_MAX_DELAY_S", max_delay_s)
+    monkeypatch.setattr(autosave, "AUTOSAVE_RETRY_MS", retry_ms)
+    canvas = project_canvas()
+    canvas.autosaver.enabled = True
+    return canvas
+
+
+def settle(canvas):
+    """Let pending autosave timers fire and their saves land."""
+    assert wait_while(lambda: canvas.autosaver._timer.isActive() or canvas.save_in_flight)
+
+
+def test_autosave_debounces_a_burst(api, monkeypatch):
+    canvas = autosaving_canvas(monkeypatch)
+    for i in range(5):
+        add_component(canvas, i * 200)
+    assert not api.plans
+
+    settle(canvas)
+    assert len(api.plans) == 1
+    assert len(api.plans[0]["dirty"]) == 5
+    assert canvas.undo_stack.isClean()
+
+
+def test_autosave_saves_during_continuous_editing(api, monkeypatch):
+    # The debounce alone would never fire while edits keep coming
+    canvas = autosaving_canvas(monkeypatch, delay_ms=60000, max_delay_s=0)
+    add_component(canvas)
+    add_component(canvas, 200)
+
+    assert wait_while(lambda: not api.plans)
+    assert canvas.autosaver._timer.interval() == 0
+
+
+def test_autosave_retries_after_failure(api, monkeypatch):
+    canvas = autosaving_canvas(monkeypatch, retry_ms=300)
+    # Ops save and its full-save fallback both fail, then the server is back
+    api.replies = ["fail", "fail"]
+    add_component(canvas)
+
+    assert wait_while(lambda: len(api.plans) < 2 or canvas.save_in_flight)
+    assert canvas.save_status == "failed"
+    assert not canvas.undo_stack.isClean()
+
+    settle(canvas)
+    assert len(api.plans) == 3
+    assert canvas.undo_stack.isClean()
+    assert canvas.save_status is None
+
+
+def test_autosave_pauses_on_conflict(api, monkeypatch):
+    canvas = autosaving_canvas(monkeypatch)
+    api.replies = ["conflict"]
+    add_component(canvas)
+    settle(canvas)
+    assert len(api.plans) == 1
+    assert not canvas.autosaver.enabled
+    assert canvas.save_status == "conflict"
+
+    # Further edits are left for the user to resolve
+    add_component(canvas, 200)
+    settle(canvas)
+    assert len(api.plans) == 1
@@ -0,0 +1,141 @@
+"""
+End-to-end checks of the desktop api_client against a live backend.
+
+Both halves of the repository are put on sys.path and the backend runs on a
+test database, so run from the repository root with the requirements of
+backend/ and desktop-frontend/ installed:
+
+    python -m pytest -s tests/integration
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Backend first: the desktop client has an (empty) api package of its own
+for path in (os.path.join(ROOT, "desktop-frontend"), os.path.join(ROOT, "backend")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+
+django.setup()
+
+import requests
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import LiveServerTestCase
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.models import Component, Project
+from api.persistence import replace_canvas_state
+
+_old_db_name = None
+
+
+def setUpModule():
+    global _old_db_name
+    setup_test_environment()
+    _old_db_name = connection.creation.create_test_db(verbosity=0)
+
+
+def tearDownModule():
+    connection.creation.destroy_test_db(_old_db_name, verbosity=0)
+    teardown_test_environment()
+
+
+class _DevServerHandler(QuietWSGIRequestHandler):
+    # Same socket setup as `manage.py runserver`
+    disable_nagle_algorithm = True
+
+
+class _DevServerThread(LiveServerThread):
+    def _create_server(self, connections_override=None):
+        return self.server_class(
+            (self.host, self.port),
+            _DevServerHandler,
+            allow_reuse_address=False,
+            connections_override=connections_override,
+        )
+
+
+def build_canvas(component, count):
+    """Chain of `count` items with a connection between each neighbour."""
+    items = [
+        {
+            "id": -(i + 1),
+            "component_id": component.id,
+            "label": f"P{i:05d}",
+            "x": (i % 100) * 60,
+            "y": (i // 100) * 60,
+            "width": 50,
+            "height": 50,
+            "sequence": i + 1,
+        }
+        for i in range(count)
+    ]
+    connections = [
+        {
+            "sourceItemId": items[i]["id"],
+            "sourceGripIndex": 1,
+            "targetItemId": items[i + 1]["id"],
+            "targetGripIndex": 0,
+            "waypoints": [],
+        }
+        for i in range(count - 1)
+    ]
+    return {"items": items, "connections": connections}
+
+
+class ApiClientLatencyBenchmark(LiveServerTestCase):
+    """100 sequential get_project calls from the desktop api_client against a live server."""
+
+    CALLS = 100
+    server_thread_class = _DevServerThread
+
+    def setUp(self):
+        import src.app_state as app_state
+        from src import api_client
+        self.app_state, self.api_client = app_state, api_client
+
+        user = User.objects.create_user(username="bench", password="bench")
+        component = Component.objects.create(s_no="001", name="Pump", object="Pump", grips=[])
+        self.project = Project.objects.create(name="bench", user=user)
+        replace_canvas_state(self.project, build_canvas(component, 50))
+
+        app_state.BACKEND_BASE_URL = self.live_server_url
+        app_state.access_token, _ = api_client.login("bench", "bench")
+
+    def tearDown(self):
+        self.app_state.access_token = None
+        self.api_client._project_cache.clear()
+        # Drop the keep-alive connection before the live server shuts down
+        self.api_client.get_session().close()
+
+    def _time(self, label, call):
+        start = time.perf_counter()
+        for _ in range(self.CALLS):
+            self.assertIsNotNone(call())
+        elapsed = time.perf_counter() - start
+        print(f"\n[BENCH] {label}: {self.CALLS} get_project calls in {elapsed * 1000:.1f} ms "
+              f"({elapsed * 1000 / self.CALLS:.2f} ms/call)")
+        return elapsed
+
+    def test_get_project_latency(self):
+        url = f"{self.live_server_url}/api/project/{self.project.id}/"
+        headers = {"Authorization": f"Bearer {self.app_state.access_token}"}
+
+        def new_connection():
+            resp = requests.get(url, headers=headers, params={"canvas_format": "compact"}, timeout=5)
+            return resp.json() if resp.status_code == 200 else None
+
+        def pooled():
+            self.api_client._project_cache.clear()
+            return self.api_client.get_project(self.project.id)
+
+        self._time("new connection per call", new_connection)
+        self._time("pooled session", pooled)
+        self._time("pooled session + 304 revalidation", lambda: self.api_client.get_project(self.project.id))